@@ -1,12 +1,20 @@
-import numpy as np
+from functools import lru_cache
 
 class FuzzyLogic():
 
-    FUZZY_RULES_TABLE = np.array([[1, 0, 0], 
-                                  [2, 1, 1],
-                                  [4, 3, 2]])
+    FUZZY_RULES = [[1, 0, 0],
+                   [2, 1, 1],
+                   [4, 3, 2]]
+    # Built from FUZZY_RULES on first use, so numpy is only imported once the
+    # fuzzy engine actually runs
+    FUZZY_RULES_TABLE = None
 
     def __init__(self):
+        import numpy as np
+
+        if FuzzyLogic.FUZZY_RULES_TABLE is None:
+            FuzzyLogic.FUZZY_RULES_TABLE = np.array(FuzzyLogic.FUZZY_RULES)
+
         self.membership_values_table = np.array([[0., 0., 0.],
                                                  [0., 0., 0.],
                                                  [0., 0., 0.]])
@@ -130,6 +138,66 @@ class FuzzyLogic():
         print('____________________________________________________________________')
         return self.final_decision_on_body
 
+@lru_cache(maxsize=1024)
+def classify_body(height, weight, sex):
+    """
+    Run the whole fuzzy pipeline once per distinct (height, weight, sex)
+    """
+    fl = FuzzyLogic()
+    fl.do_fuzzification_of_height(height, sex)
+    fl.do_fuzzification_of_weight(weight, sex)
+    fl.do_fuzzy_inference()
+    return fl.do_defuzzification_of_body()
+
+# (low, middle, high) breakpoints of the three fuzzy sets, by sex, with the
+# same piecewise-linear memberships as do_fuzzification_of_height/_weight
+HEIGHT_BREAKPOINTS = {0: (160, 167.5, 175), 1: (150, 157.5, 165)}
+WEIGHT_BREAKPOINTS = {0: (50, 60, 70), 1: (45, 50, 55)}
+
+def _batch_memberships(values, sexes, breakpoints):
+    import numpy as np
+
+    low, middle, high = (
+        np.where(sexes == 0, breakpoints[0][i], breakpoints[1][i]) for i in range(3)
+    )
+    # Written like the scalar formulas, e.g. (2 * height - 320) / 15, so both
+    # give bit-identical memberships
+    rising = (2 * values - 2 * low) / (2 * (middle - low))
+    falling = (2 * values - 2 * middle) / (2 * (high - middle))
+    return np.stack(
+        (
+            np.clip(1 - rising, 0, 1),
+            np.clip(np.minimum(rising, 1 - falling), 0, 1),
+            np.clip(falling, 0, 1),
+        ),
+        axis=1,
+    )
+
+def classify_bodies(heights, weights, sexes):
+    """
+    classify_body over whole arrays at once, e.g. a member's full history:
+    same decisions, without the per-call prints
+    """
+    import numpy as np
+
+    if FuzzyLogic.FUZZY_RULES_TABLE is None:
+        FuzzyLogic.FUZZY_RULES_TABLE = np.array(FuzzyLogic.FUZZY_RULES)
+    rules = FuzzyLogic.FUZZY_RULES_TABLE
+
+    heights = np.asarray(heights, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    sexes = np.broadcast_to(np.asarray(sexes), heights.shape)
+
+    height_memberships = _batch_memberships(heights, sexes, HEIGHT_BREAKPOINTS)
+    weight_memberships = _batch_memberships(weights, sexes, WEIGHT_BREAKPOINTS)
+    # (N, weight set, height set), as membership_values_table
+    table = np.minimum(weight_memberships[:, :, None], height_memberships[:, None, :])
+    fuzzified = np.stack(
+        [table[:, rules == decision].max(axis=1) for decision in range(5)], axis=1
+    )
+    # argmax keeps the first maximum, like do_defuzzification_of_body
+    return np.argmax(fuzzified, axis=1)
+
 if __name__ == "__main__":
     # Example for testing purpose
     fl = FuzzyLogic()
@@ -0,0 +1,188 @@
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+from algorithm.nutrition_matrix import CALORIES, CARBS, FAT, PROTEIN
+
+MACROS = ("carbs", "fat", "protein")
+
+# Servings are whole or half portions, as in the diet tables
+SERVING_STEP = 0.5
+MAX_SERVINGS = 8.0
+SERVINGS = np.arange(SERVING_STEP, MAX_SERVINGS + SERVING_STEP, SERVING_STEP)
+
+# A swapped meal may be this far from the original: a fraction of its
+# calories, and an absolute difference of its carb share of calories
+CALORIE_TOLERANCE = 0.1
+CARB_TOLERANCE = 0.05
+
+
+class SwapOption(namedtuple("SwapOption", "dishes calories carb_share")):
+    """
+    A re-solved meal: `dishes` are (dish id, servings) pairs in slot order
+    """
+
+    __slots__ = ()
+
+    def to_meal(self):
+        """
+        The option as a diet meal string, e.g. '452:62x2.5;02x1'
+        """
+        return f"{round(self.calories)}:" + ";".join(
+            f"{id}x{servings:g}" for id, servings in self.dishes
+        )
+
+
+def parse_meal(meal):
+    """
+    (calories, [(dish id, servings), ...]) of a diet meal string such as
+    '452:62x2.5;02x1'
+    """
+    calories, dishes = meal.split(":")
+    pairs = []
+    for item in dishes.split(";"):
+        id, servings = item.split("x")
+        pairs.append((id, float(servings)))
+    return float(calories), pairs
+
+
+def build_swap_buckets(matrix):
+    """
+    {macro: [dish id, ...]} grouping the dishes of a NutritionMatrix by the
+    macro that gives most of their calories, each bucket sorted by calories.
+    Dishes without usable nutrition are left out.
+    """
+    valid = np.isfinite(matrix.shares).all(axis=1) & (
+        matrix.values[:, CALORIES] > 0
+    )
+    dominant = np.argmax(np.nan_to_num(matrix.shares, nan=-1), axis=1)
+    buckets = {}
+    for column, macro in enumerate(MACROS):
+        positions = np.flatnonzero(valid & (dominant == column))
+        positions = positions[np.argsort(matrix.values[positions, CALORIES], kind="stable")]
+        buckets[macro] = [matrix.ids[position] for position in positions]
+    return buckets
+
+
+class MealSwapper():
+    """
+    Swaps one dish of a meal for another of the same dominant macro and
+    re-solves both servings, so the meal keeps its calories and carb share
+    within tolerance. Candidates come from precomputed buckets sorted by
+    calories, so only dishes that can fit the calorie target are scanned.
+    """
+
+    def __init__(
+        self,
+        matrix,
+        buckets,
+        calorie_tolerance=CALORIE_TOLERANCE,
+        carb_tolerance=CARB_TOLERANCE,
+    ):
+        self.matrix = matrix
+        self.calorie_tolerance = calorie_tolerance
+        self.carb_tolerance = carb_tolerance
+        self.buckets = {}
+        for macro, ids in buckets.items():
+            ids = [id for id in ids if id in matrix]
+            self.buckets[macro] = (ids, matrix.values[matrix.positions(ids), CALORIES].tolist())
+        self._bucket_of = {
+            id: macro for macro, (ids, _) in self.buckets.items() for id in ids
+        }
+
+    def bucket_of(self, dish_id):
+        return self._bucket_of.get(dish_id)
+
+    def _candidates(self, macro, low, high, skip):
+        """
+        Ids of a bucket whose calories per serving are within [low, high]
+        """
+        ids, calories = self.buckets.get(macro, ([], []))
+        start = bisect_left(calories, low)
+        end = bisect_right(calories, high)
+        return [id for id in ids[start:end] if id not in skip]
+
+    def swap(self, meal, slot, dish_id=None, limit=5):
+        """
+        Options for replacing the dish in `slot` of a meal string, best first.
+        With dish_id, only that dish is tried; otherwise the bucket of the
+        replaced dish is scanned. Empty when nothing fits the tolerances.
+        """
+        calories, dishes = parse_meal(meal)
+        replaced = dishes[slot][0]
+        others = [pair for position, pair in enumerate(dishes) if position != slot]
+        target = self._totals(dishes)
+        target_calories = calories if calories > 0 else target[CALORIES]
+        target_carbs = self._carb_share(target)
+
+        if dish_id is not None:
+            candidates = [dish_id] if dish_id in self.matrix else []
+        else:
+            macro = self.bucket_of(replaced)
+            # The fixed dishes at any serving leave between nothing and the
+            # whole target for the new one, within tolerance
+            high = target_calories * (1 + self.calorie_tolerance) / SERVINGS[0]
+            low = (
+                target_calories * (1 - self.calorie_tolerance)
+                - sum(self.matrix.row(id)[CALORIES] * MAX_SERVINGS for id, _ in others)
+            ) / MAX_SERVINGS
+            candidates = self._candidates(
+                macro, max(low, 0), high, {id for id, _ in dishes}
+            )
+
+        return self._solve(candidates, slot, dishes, target_calories, target_carbs, limit)
+
+    def _totals(self, dishes):
+        return sum(self.matrix.row(id) * servings for id, servings in dishes)
+
+    def _carb_share(self, totals):
+        macro_calories = totals[CARBS] * 4 + totals[FAT] * 9 + totals[PROTEIN] * 4
+        return totals[CARBS] * 4 / macro_calories if macro_calories > 0 else 0.0
+
+    def _solve(self, candidates, slot, dishes, target_calories, target_carbs, limit):
+        """
+        For every candidate at once, the best servings of it and of the dishes
+        kept; returns the `limit` best candidates that fit the tolerances
+        """
+        if not candidates:
+            return []
+        # (candidates, dishes, 4) nutrition of each candidate meal
+        rows = np.repeat(
+            np.stack([self.matrix.row(id) for id, _ in dishes])[None], len(candidates), axis=0
+        ).astype(np.float64)
+        rows[:, slot] = self.matrix.values[self.matrix.positions(candidates)]
+
+        # Every combination of servings, one row per combination
+        grid = np.stack(np.meshgrid(*[SERVINGS] * len(dishes), indexing="ij"), axis=-1)
+        grid = grid.reshape(-1, len(dishes))
+        # (candidates, combinations, 4) totals of every candidate meal
+        totals = grid @ rows
+        macro_calories = totals[:, :, CARBS:] @ np.array([4.0, 9.0, 4.0])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            carb_share = totals[:, :, CARBS] * 4 / macro_calories
+            calorie_error = np.abs(totals[:, :, CALORIES] - target_calories) / target_calories
+        carb_error = np.abs(carb_share - target_carbs)
+        fits = (calorie_error <= self.calorie_tolerance) & (carb_error <= self.carb_tolerance)
+
+        # Closest meal first, then the fewest changed servings of kept dishes
+        kept = [position for position in range(len(dishes)) if position != slot]
+        changes = np.abs(grid[:, kept] - [dishes[position][1] for position in kept]).sum(axis=1)
+        score = np.where(fits, calorie_error + carb_error + 0.01 * changes, np.inf)
+        best = np.argmin(score, axis=1)
+        best_score = score[np.arange(len(candidates)), best]
+
+        options = []
+        for row in np.argsort(best_score, kind="stable")[:limit]:
+            if not np.isfinite(best_score[row]):
+                break
+            combination = best[row]
+            ids = [candidates[row] if position == slot else id for position, (id, _) in enumerate(dishes)]
+            options.append(
+                SwapOption(
+                    tuple(zip(ids, grid[combination].tolist())),
+                    float(totals[row, combination, CALORIES]),
+                    float(carb_share[row, combination]),
+                )
+            )
+        return options
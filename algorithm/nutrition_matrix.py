@@ -0,0 +1,118 @@
+import numpy as np
+
+# Column order of the matrix, the same as the 'cal;carbs;fat;protein' strings
+COLUMNS = ("calories", "carbs", "fat", "protein")
+CALORIES, CARBS, FAT, PROTEIN = range(4)
+SHARES = ("carbs_share", "fat_share", "protein_share")
+
+# kcal per gram of carbs, fat and protein
+MACRO_CALORIES = np.array([4.0, 9.0, 4.0], dtype=np.float32)
+
+
+def parse_nutrition(nutrition):
+    """
+    [calories, carbs, fat, protein] of a 'cal;carbs;fat;protein' string, NaN
+    for a missing or malformed one
+    """
+    try:
+        values = [float(value) for value in nutrition.split(";")]
+    except (AttributeError, ValueError):
+        values = []
+    if len(values) != len(COLUMNS):
+        return [np.nan] * len(COLUMNS)
+    return values
+
+
+class NutritionMatrix():
+    """
+    The nutrition of many dishes or plans as one float32 (N, 4) matrix of
+    calories, carbs, fat and protein, with an id index. The calorie shares of
+    the three macros are computed once, so filters are plain array compares.
+    Both are stored column-major: a filter reads each column contiguously.
+    """
+
+    def __init__(self, ids, values):
+        self.ids = list(ids)
+        # A float32 column-major input, such as the shared catalog's mapped
+        # array, is used as is; anything else is copied once into that layout
+        self.values = np.asarray(values, dtype=np.float32)
+        if (
+            self.values.ndim != 2
+            or self.values.shape[1] != len(COLUMNS)
+            or not self.values.flags.f_contiguous
+        ):
+            self.values = np.asfortranarray(self.values.reshape(-1, len(COLUMNS)))
+        if len(self.ids) != len(self.values):
+            raise ValueError("Expected one row of nutrition per id")
+        self._positions = {id: position for position, id in enumerate(self.ids)}
+
+        macro_calories = self.values[:, CARBS:] * MACRO_CALORIES
+        total = macro_calories.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = np.where(total > 0, macro_calories / total, np.nan)
+        self.shares = np.asfortranarray(shares, dtype=np.float32)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build from (id, 'cal;carbs;fat;protein') rows
+        """
+        rows = list(rows)
+        return cls(
+            [row[0] for row in rows],
+            np.array([parse_nutrition(row[1]) for row in rows], dtype=np.float32),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return id in self._positions
+
+    def position(self, id):
+        return self._positions[id]
+
+    def positions(self, ids):
+        return np.fromiter(
+            (self._positions[id] for id in ids), dtype=np.intp, count=len(ids)
+        )
+
+    def row(self, id):
+        return self.values[self._positions[id]]
+
+    def macro_percentages(self, ids=None):
+        """
+        (N, 3) carbs, fat and protein shares of calories, for every row or for
+        `ids`. NaN where a row has no macros.
+        """
+        if ids is None:
+            return self.shares
+        return self.shares[self.positions(ids)]
+
+    def column(self, name):
+        if name in COLUMNS:
+            return self.values[:, COLUMNS.index(name)]
+        if name in SHARES:
+            return self.shares[:, SHARES.index(name)]
+        raise ValueError(f"Unknown nutrition column: {name}")
+
+    def mask(self, **bounds):
+        """
+        Boolean mask of the rows strictly inside every (low, high) bound, e.g.
+        mask(protein_share=(0.35, None), calories=(None, 400)). Bounds are on
+        calories, carbs, fat, protein or their *_share; None is open.
+        """
+        result = np.ones(len(self.ids), dtype=bool)
+        for name, (low, high) in bounds.items():
+            column = self.column(name)
+            if low is not None:
+                result &= column > low
+            if high is not None:
+                result &= column < high
+        return result
+
+    def where(self, **bounds):
+        """
+        Ids of the rows that pass mask(**bounds), in matrix order
+        """
+        return [self.ids[position] for position in np.flatnonzero(self.mask(**bounds))]
@@ -0,0 +1,238 @@
+from collections import namedtuple
+
+import numpy as np
+
+from algorithm.meal_swap import parse_meal
+from algorithm.nutrition_matrix import (
+    CALORIES,
+    CARBS,
+    COLUMNS,
+    MACRO_CALORIES,
+    parse_nutrition,
+)
+
+# The diet tables, in the order of StandardCalories' columns, and their meals
+PLAN_TABLES = ("LowCarb", "ModerateCarb", "HighCarb")
+MEAL_COLUMNS = ("Breakfast", "Lunch", "Dinner")
+
+# Plans are written with whole and half servings of dishes whose nutrition is
+# rounded, so the stored figures may be this far from the recomputed ones:
+# a fraction of the meal's calories, of the plan's calories, and the calories
+# of each macro as a fraction of the plan's calories
+MEAL_CALORIE_TOLERANCE = 0.02
+PLAN_CALORIE_TOLERANCE = 0.01
+MACRO_CALORIE_TOLERANCE = 0.03
+
+
+class PlanIssue(namedtuple("PlanIssue", "table plan field message")):
+    """
+    One problem of the plan data: the table, the plan's Calories key, the
+    column and what is wrong with it
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.table} {self.plan} {self.field}: {self.message}"
+
+
+class PlanDataError(ValueError):
+    """
+    Raised when the plan data does not pass check_plans; `issues` lists
+    every problem found
+    """
+
+    def __init__(self, issues):
+        self.issues = list(issues)
+        super().__init__(f"{len(self.issues)} problem(s) in the plan data")
+
+
+def _sum_by(groups, values, count):
+    # Row sums of `values` per group, one bincount per column
+    return np.stack(
+        [
+            np.bincount(groups, weights=values[:, column], minlength=count)
+            for column in range(values.shape[1])
+        ],
+        axis=1,
+    )
+
+
+def check_plan_table(dishes, table, rows):
+    """
+    [PlanIssue] of one diet table, from its (Calories, Nutrition, Breakfast,
+    Lunch, Dinner) rows and the NutritionMatrix of every dish. Every meal is
+    parsed once into flat columns, then the meals and plans are totalled
+    with one bincount per nutrition column and compared in one go.
+    """
+    issues = []
+    plan_keys, plan_calories, plan_nutrition, plan_complete = [], [], [], []
+    meal_plan, meal_field, meal_calories, meal_complete = [], [], [], []
+    dish_meal, dish_positions, dish_servings = [], [], []
+
+    for calories, nutrition, *meals in rows:
+        plan = len(plan_keys)
+        plan_keys.append(calories)
+        plan_calories.append(float(calories))
+        plan_nutrition.append(parse_nutrition(nutrition))
+        complete = bool(np.isfinite(plan_nutrition[-1]).all())
+        if not complete:
+            issues.append(
+                PlanIssue(table, calories, "Nutrition", f"unreadable {nutrition!r}")
+            )
+
+        for field, meal in zip(MEAL_COLUMNS, meals):
+            try:
+                declared, pairs = parse_meal(meal)
+            except (AttributeError, ValueError):
+                issues.append(PlanIssue(table, calories, field, f"unreadable {meal!r}"))
+                complete = False
+                continue
+
+            index = len(meal_calories)
+            meal_plan.append(plan)
+            meal_field.append(field)
+            meal_calories.append(declared)
+            meal_complete.append(True)
+            for dish_id, servings in pairs:
+                if dish_id not in dishes:
+                    issues.append(
+                        PlanIssue(table, calories, field, f"dish {dish_id!r} does not exist")
+                    )
+                    meal_complete[index] = False
+                    continue
+                dish_meal.append(index)
+                dish_positions.append(dishes.position(dish_id))
+                dish_servings.append(servings)
+            complete = complete and meal_complete[index]
+        plan_complete.append(complete)
+
+    if not meal_calories:
+        return issues
+
+    dish_meal = np.asarray(dish_meal, dtype=np.intp)
+    dish_positions = np.asarray(dish_positions, dtype=np.intp)
+    meal_plan = np.asarray(meal_plan, dtype=np.intp)
+    meal_complete = np.asarray(meal_complete)
+    plan_complete = np.asarray(plan_complete)
+
+    # Dishes whose nutrition cannot be read leave their meal and plan unchecked
+    unreadable = ~np.isfinite(dishes.values[dish_positions]).all(axis=1)
+    for row in np.flatnonzero(unreadable):
+        index = dish_meal[row]
+        issues.append(
+            PlanIssue(
+                table,
+                plan_keys[meal_plan[index]],
+                meal_field[index],
+                f"dish {dishes.ids[dish_positions[row]]!r} has no nutrition",
+            )
+        )
+        meal_complete[index] = False
+        plan_complete[meal_plan[index]] = False
+
+    # Totals of what the meals hold, from the dishes
+    dish_values = np.where(
+        unreadable[:, None], 0.0, dishes.values[dish_positions].astype(np.float64)
+    ) * np.asarray(dish_servings, dtype=np.float64).reshape(-1, 1)
+    meal_totals = _sum_by(dish_meal, dish_values, len(meal_calories))
+    plan_totals = _sum_by(meal_plan, meal_totals, len(plan_keys))
+
+    meal_calories = np.asarray(meal_calories)
+    meal_wrong = meal_complete & (
+        np.abs(meal_totals[:, CALORIES] - meal_calories)
+        > MEAL_CALORIE_TOLERANCE * meal_calories
+    )
+    for index in np.flatnonzero(meal_wrong):
+        issues.append(
+            PlanIssue(
+                table,
+                plan_keys[meal_plan[index]],
+                meal_field[index],
+                f"stored {meal_calories[index]:g} kcal, "
+                f"dishes add up to {meal_totals[index, CALORIES]:g}",
+            )
+        )
+
+    plan_calories = np.asarray(plan_calories)
+    plan_nutrition = np.asarray(plan_nutrition, dtype=np.float64)
+    complete = plan_complete
+    limit = PLAN_CALORIE_TOLERANCE * plan_calories
+    key_wrong = complete & (np.abs(plan_nutrition[:, CALORIES] - plan_calories) > limit)
+    calories_wrong = complete & (
+        np.abs(plan_totals[:, CALORIES] - plan_nutrition[:, CALORIES]) > limit
+    )
+    macros_wrong = complete[:, None] & (
+        np.abs(plan_totals[:, CARBS:] - plan_nutrition[:, CARBS:]) * MACRO_CALORIES
+        > MACRO_CALORIE_TOLERANCE * plan_calories[:, None]
+    )
+    for plan in np.flatnonzero(key_wrong):
+        issues.append(
+            PlanIssue(
+                table,
+                plan_keys[plan],
+                "Nutrition",
+                f"{plan_nutrition[plan, CALORIES]:g} kcal for a "
+                f"{plan_calories[plan]:g} kcal plan",
+            )
+        )
+    for plan in np.flatnonzero(calories_wrong):
+        issues.append(
+            PlanIssue(
+                table,
+                plan_keys[plan],
+                "Nutrition",
+                f"stored {plan_nutrition[plan, CALORIES]:g} kcal, "
+                f"dishes add up to {plan_totals[plan, CALORIES]:g}",
+            )
+        )
+    for plan, macro in zip(*np.nonzero(macros_wrong)):
+        column = CARBS + macro
+        issues.append(
+            PlanIssue(
+                table,
+                plan_keys[plan],
+                "Nutrition",
+                f"stored {plan_nutrition[plan, column]:g} g of {COLUMNS[column]}, "
+                f"dishes add up to {plan_totals[plan, column]:g}",
+            )
+        )
+    return issues
+
+
+def check_standard_calories(rows, plan_keys):
+    """
+    [PlanIssue] for every StandardCalories row whose diet does not exist.
+    rows: (Stage, Body, Sex, LowCarb, ModerateCarb, HighCarb).
+    plan_keys: {table: set of its Calories}.
+    """
+    issues = []
+    for stage, body, sex, *calories in rows:
+        for table, value in zip(PLAN_TABLES, calories):
+            if value is not None and value not in plan_keys.get(table, ()):
+                issues.append(
+                    PlanIssue(
+                        "StandardCalories",
+                        f"({stage}, {body}, {sex})",
+                        table,
+                        f"no {value} kcal plan",
+                    )
+                )
+    return issues
+
+
+def check_plans(dishes, plans, standard_calories=()):
+    """
+    [PlanIssue] of the whole plan data, empty when it is consistent.
+    dishes: NutritionMatrix of the Dish table.
+    plans: {table: (Calories, Nutrition, Breakfast, Lunch, Dinner) rows}.
+    standard_calories: the StandardCalories rows.
+    """
+    issues = []
+    plan_keys = {}
+    for table, rows in plans.items():
+        rows = list(rows)
+        plan_keys[table] = {row[0] for row in rows}
+        issues.extend(check_plan_table(dishes, table, rows))
+    issues.extend(check_standard_calories(standard_calories, plan_keys))
+    return issues
@@ -0,0 +1,150 @@
+from collections import namedtuple
+
+import numpy as np
+
+# The week of the gym plan: upper/lower twice, three days off
+WEEKLY_SCHEDULE = ("upper", "lower", None, "upper", "lower", None, None)
+
+# Load added once the top of the rep range is reached, in kg
+LOAD_INCREMENTS = {"upper": 2.5, "lower": 5.0}
+# Sessions at one load before it can go up, even when the range is a single
+# number such as '10'
+MIN_SESSIONS_PER_LOAD = 2
+
+
+def parse_rep_range(reps):
+    """
+    (low, high) bounds of a rep scheme such as '8-10' or '10'
+    """
+    bounds = [int(value) for value in str(reps).replace("–", "-").split("-")]
+    if len(bounds) == 1:
+        return bounds[0], bounds[0]
+    low, high = bounds
+    if low > high:
+        raise ValueError(f"Invalid rep range: {reps}")
+    return low, high
+
+
+def sessions_per_week(day_type, schedule=WEEKLY_SCHEDULE):
+    return sum(1 for day in schedule if day == day_type)
+
+
+class Projection(namedtuple("Projection", "exercise_ids weeks load reps volume")):
+    """
+    Result of ProgressionProgram.simulate. `load`, `reps` and `volume` are
+    (members, exercises, weeks) arrays: the load and reps of the last session
+    of each week, and the week's total sets x reps x load.
+    """
+
+    __slots__ = ()
+
+    def weekly_volume(self):
+        """
+        (members, weeks) total volume over every exercise
+        """
+        return self.volume.sum(axis=1)
+
+    def member(self, index):
+        """
+        [{week, exercise, load, reps, volume}] of one member, for a table
+        """
+        return [
+            {
+                "week": int(week),
+                "exercise": exercise_id,
+                "load": float(self.load[index, column, row]),
+                "reps": int(self.reps[index, column, row]),
+                "volume": float(self.volume[index, column, row]),
+            }
+            for row, week in enumerate(self.weeks)
+            for column, exercise_id in enumerate(self.exercise_ids)
+        ]
+
+
+class ProgressionProgram():
+    """
+    Double progression over the exercises of a gym plan: reps climb from the
+    bottom to the top of each range at the same load, then the load goes up
+    and the reps start again from the bottom. Everything is computed in
+    closed form over (members, exercises, weeks) arrays, so a whole cohort is
+    projected in one call.
+    """
+
+    def __init__(self, exercise_ids, day_types, sets, rep_ranges, increments=None):
+        self.exercise_ids = list(exercise_ids)
+        self.day_types = list(day_types)
+        self.sets = np.asarray(sets, dtype=np.float64)
+        bounds = np.array([parse_rep_range(reps) for reps in rep_ranges], dtype=np.float64)
+        self.low = bounds[:, 0]
+        self.high = bounds[:, 1]
+        if increments is None:
+            increments = [LOAD_INCREMENTS[day_type] for day_type in self.day_types]
+        self.increments = np.asarray(increments, dtype=np.float64)
+        self.sessions = np.array(
+            [sessions_per_week(day_type) for day_type in self.day_types], dtype=np.int64
+        )
+
+    @classmethod
+    def from_gym_entries(cls, entries):
+        """
+        Build from GymEntry rows (day, exercise_id, exercise, sets, reps),
+        where day is 'upper' or 'lower'
+        """
+        entries = list(entries)
+        return cls(
+            [entry.exercise_id for entry in entries],
+            [entry.day for entry in entries],
+            [int(entry.sets) for entry in entries],
+            [entry.reps for entry in entries],
+        )
+
+    def __len__(self):
+        return len(self.exercise_ids)
+
+    def simulate(self, start_loads, weeks, rep_gain=1.0):
+        """
+        Project `weeks` weeks for every member.
+
+        start_loads: (members, exercises) working loads in week 1.
+        rep_gain: reps added per session, a scalar or one per member, e.g.
+        0.5 for someone who adds a rep every other session.
+        """
+        start_loads = np.atleast_2d(np.asarray(start_loads, dtype=np.float64))
+        if start_loads.shape[1] != len(self):
+            raise ValueError("Expected one start load per exercise")
+        gain = np.asarray(rep_gain, dtype=np.float64).reshape(-1, 1, 1)
+        if np.any(gain <= 0):
+            raise ValueError("rep_gain must be positive")
+
+        week_numbers = np.arange(1, weeks + 1)
+        # Sessions per load: from the bottom to the top of the range, plus the
+        # session at the top that earns the next increment
+        steps = np.ceil((self.high - self.low)[None, :, None] / gain)
+        cycle = np.maximum(steps + 1, MIN_SESSIONS_PER_LOAD)
+
+        def at_session(session):
+            # Load and reps of (exercises, weeks) session numbers, from 0
+            increments_earned = np.floor(session[None] / cycle)
+            position = session[None] - increments_earned * cycle
+            load = start_loads[:, :, None] + increments_earned * self.increments[None, :, None]
+            reps = np.minimum(
+                self.low[None, :, None] + np.floor(position * gain),
+                self.high[None, :, None],
+            )
+            return load, reps
+
+        first_session = self.sessions[:, None] * (week_numbers[None, :] - 1)
+        volume = 0
+        for index in range(int(self.sessions.max(initial=0))):
+            load, reps = at_session(first_session + index)
+            done = (index < self.sessions)[None, :, None]
+            volume = volume + np.where(done, self.sets[None, :, None] * reps * load, 0)
+
+        load, reps = at_session(first_session + np.maximum(self.sessions[:, None] - 1, 0))
+        return Projection(
+            self.exercise_ids,
+            week_numbers,
+            load,
+            reps.astype(np.int64),
+            volume + np.zeros_like(load),
+        )
@@ -0,0 +1,163 @@
+import re
+
+import numpy as np
+
+# Plural and spelled-out forms of the units found in recipes
+UNIT_ALIASES = {
+    "": "piece",
+    "pieces": "piece",
+    "slices": "slice",
+    "leaves": "leaf",
+    "tubers": "tuber",
+    "teaspoons": "teaspoon",
+    "tsp": "teaspoon",
+    "tablespoons": "tablespoon",
+    "tbsp": "tablespoon",
+    "cups": "cup",
+    "gram": "g",
+    "grams": "g",
+    "ounce": "oz",
+    "ounces": "oz",
+}
+# Units summed as another one: masses in grams, volumes in millilitres
+UNIT_CONVERSIONS = {
+    "oz": ("g", 28.349523125),
+    "teaspoon": ("ml", 4.92892159375),
+    "tablespoon": ("ml", 14.78676478125),
+    "cup": ("ml", 236.5882365),
+}
+
+_QUANTITY_PATTERN = re.compile(
+    r"^\s*(?:(\d+)\s+)?(\d+(?:\.\d+)?)(?:\s*/\s*(\d+))?\s*([^\d\s].*)?$"
+)
+
+
+def parse_quantity(text):
+    """
+    (quantity, unit) of a recipe amount such as '1/2 cup', '0.5 oz', '3g' or
+    '1 1/2 cups', in grams, millilitres or a count unit. None if unreadable.
+    """
+    match = _QUANTITY_PATTERN.match(text)
+    if match is None:
+        return None
+    whole, number, denominator, unit = match.groups()
+    quantity = float(number)
+    if denominator is not None:
+        if float(denominator) == 0:
+            return None
+        quantity /= float(denominator)
+    if whole is not None:
+        quantity += float(whole)
+
+    unit = (unit or "").strip().casefold().rstrip(".")
+    unit = UNIT_ALIASES.get(unit, unit)
+    if unit in UNIT_CONVERSIONS:
+        unit, factor = UNIT_CONVERSIONS[unit]
+        quantity *= factor
+    return quantity, unit
+
+
+def format_quantity(quantity, unit):
+    if unit in ("g", "ml"):
+        return f"{quantity:,.0f} {unit}" if quantity >= 10 else f"{quantity:.1f} {unit}"
+    return f"{quantity:g} {unit}" if quantity == round(quantity, 2) else f"{quantity:.2f} {unit}"
+
+
+class IngredientTable():
+    """
+    Every recipe parsed once into parallel columns of (dish, ingredient,
+    unit, quantity per serving). A shopping list is then one weighted
+    bincount over the rows, however many dishes and servings it covers.
+    """
+
+    def __init__(self, dish_ids, keys, dish_column, key_column, quantities, unparsed=()):
+        """
+        `keys` are the (ingredient name, unit) pairs that key_column indexes
+        """
+        self.dish_ids = list(dish_ids)
+        self.keys = [tuple(key) for key in keys]
+        self.dish_column = np.asarray(dish_column, dtype=np.int64)
+        self.key_column = np.asarray(key_column, dtype=np.int64)
+        self.quantities = np.asarray(quantities, dtype=np.float64)
+        # (dish id, ingredient, amount) rows that could not be read
+        self.unparsed = [tuple(row) for row in unparsed]
+        self._dish_positions = {id: position for position, id in enumerate(self.dish_ids)}
+
+    @classmethod
+    def from_recipes(cls, rows):
+        """
+        Build from (dish id, 'name: amount; ...') rows
+        """
+        dish_ids = []
+        keys = {}
+        names = {}
+        dish_column, key_column, quantities, unparsed = [], [], [], []
+        for dish_id, recipe in rows:
+            position = len(dish_ids)
+            dish_ids.append(dish_id)
+            for item in (recipe or "").split(";"):
+                if not item.strip():
+                    continue
+                name, _, amount = item.partition(":")
+                name = name.strip()
+                parsed = parse_quantity(amount)
+                if parsed is None:
+                    unparsed.append((dish_id, name, amount.strip()))
+                    continue
+                quantity, unit = parsed
+                # One entry per ingredient whatever its capitalisation, shown
+                # as first written
+                name = names.setdefault(name.casefold(), name)
+                key = keys.setdefault((name, unit), len(keys))
+                dish_column.append(position)
+                key_column.append(key)
+                quantities.append(quantity)
+        return cls(dish_ids, list(keys), dish_column, key_column, quantities, unparsed)
+
+    def to_dict(self):
+        return {
+            "dish_ids": self.dish_ids,
+            "keys": self.keys,
+            "dish_column": self.dish_column.tolist(),
+            "key_column": self.key_column.tolist(),
+            "quantities": self.quantities.tolist(),
+            "unparsed": self.unparsed,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["dish_ids"],
+            data["keys"],
+            data["dish_column"],
+            data["key_column"],
+            data["quantities"],
+            data.get("unparsed", ()),
+        )
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def servings_vector(self, servings):
+        """
+        {dish id: servings} as one entry per dish of the table; unknown dishes
+        are ignored
+        """
+        vector = np.zeros(len(self.dish_ids))
+        for dish_id, amount in servings.items():
+            position = self._dish_positions.get(dish_id)
+            if position is not None:
+                vector[position] += float(amount)
+        return vector
+
+    def aggregate(self, servings):
+        """
+        [(ingredient, unit, quantity)] for {dish id: servings}, summed per
+        ingredient and unit, in alphabetical order
+        """
+        weights = self.servings_vector(servings)[self.dish_column] * self.quantities
+        totals = np.bincount(self.key_column, weights=weights, minlength=len(self.keys))
+        used = np.flatnonzero(totals > 0)
+        items = [(self.keys[key][0], self.keys[key][1], float(totals[key])) for key in used]
+        items.sort(key=lambda item: (item[0].casefold(), item[1]))
+        return items
@@ -0,0 +1,117 @@
+import numpy as np
+
+from algorithm.nutrition_matrix import CALORIES
+
+# Queries are compared against the whole catalog this many at a time, so the
+# (block, dishes) distance matrix stays small however many slots are asked for
+SUBSTITUTE_BLOCK_SIZE = 256
+DEFAULT_SUBSTITUTES = 3
+
+
+def parse_ingredients(recipe):
+    """
+    Casefolded ingredient names of a 'name: quantity; ...' recipe string
+    """
+    if not recipe:
+        return set()
+    return {
+        item.split(":", 1)[0].strip().casefold()
+        for item in recipe.split(";")
+        if item.strip()
+    }
+
+
+class SubstituteIndex():
+    """
+    Nearest-neighbour search over dishes in nutrition space: per-serving
+    calories and the carbs, fat and protein shares of calories, each scaled to
+    unit variance so no single axis dominates. Searches are blocked brute
+    force, and ingredient exclusions are a boolean dish x ingredient matrix.
+    """
+
+    def __init__(self, matrix, ingredients):
+        """
+        `matrix` is a NutritionMatrix of the dishes and `ingredients` the
+        ingredient-name set of each of them, in the same order
+        """
+        if len(ingredients) != len(matrix):
+            raise ValueError("Expected one ingredient set per dish")
+        self.ids = matrix.ids
+        self._matrix = matrix
+
+        features = np.column_stack(
+            (matrix.values[:, CALORIES], matrix.shares)
+        ).astype(np.float32)
+        self.valid = np.isfinite(features).all(axis=1)
+        scale = np.nanstd(features[self.valid], axis=0) if self.valid.any() else 1
+        features = features / np.where(scale > 0, scale, 1)
+        self.features = np.where(self.valid[:, None], features, 0).astype(np.float32)
+        self._norms = (self.features**2).sum(axis=1)
+
+        self.vocabulary = sorted(set().union(*ingredients)) if ingredients else []
+        columns = {name: column for column, name in enumerate(self.vocabulary)}
+        self.contains = np.zeros((len(ingredients), len(self.vocabulary)), dtype=bool)
+        for row, names in enumerate(ingredients):
+            self.contains[row, [columns[name] for name in names]] = True
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return id in self._matrix
+
+    def excluded(self, exclude_ingredients=(), exclude_ids=()):
+        """
+        Boolean mask of the dishes that can never be a substitute: those
+        without valid nutrition, listed in exclude_ids, or with an ingredient
+        containing one of exclude_ingredients (so "egg" also drops "egg white")
+        """
+        mask = ~self.valid
+        terms = [term.strip().casefold() for term in exclude_ingredients if term.strip()]
+        if terms:
+            columns = [
+                column
+                for column, name in enumerate(self.vocabulary)
+                if any(term in name for term in terms)
+            ]
+            if columns:
+                mask = mask | self.contains[:, columns].any(axis=1)
+        for id in exclude_ids:
+            if id in self._matrix:
+                mask[self._matrix.position(id)] = True
+        return mask
+
+    def nearest(self, ids, k=DEFAULT_SUBSTITUTES, exclude_ingredients=(), exclude_ids=()):
+        """
+        The k closest substitutes of each dish in `ids`, as one list of
+        (id, distance) pairs per query, closest first. A dish is never its own
+        substitute; unknown ids get an empty list.
+        """
+        excluded = self.excluded(exclude_ingredients, exclude_ids)
+        count = min(k, len(self.ids))
+        results = []
+        for start in range(0, len(ids), SUBSTITUTE_BLOCK_SIZE):
+            block = list(ids[start : start + SUBSTITUTE_BLOCK_SIZE])
+            known = [id for id in block if id in self]
+            neighbours = {}
+            if count > 0 and known:
+                positions = self._matrix.positions(known)
+                # |q - x|^2 = |q|^2 + |x|^2 - 2 q.x, one matrix product per block
+                distances = (
+                    self._norms[positions, None]
+                    + self._norms[None, :]
+                    - 2 * self.features[positions] @ self.features.T
+                )
+                distances[:, excluded] = np.inf
+                distances[np.arange(len(positions)), positions] = np.inf
+
+                nearest = np.argpartition(distances, count - 1, axis=1)[:, :count]
+                for row, id in enumerate(known):
+                    order = nearest[row][np.argsort(distances[row, nearest[row]])]
+                    neighbours[id] = [
+                        (self.ids[position], float(np.sqrt(max(distances[row, position], 0))))
+                        for position in order
+                        if np.isfinite(distances[row, position])
+                    ]
+            results.extend(neighbours.get(id, []) for id in block)
+        return results
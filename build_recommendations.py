@@ -0,0 +1,60 @@
+import argparse
+import sys
+
+from algorithm.plan_integrity import PlanDataError
+from services.recommendation_pages import (
+    BUILD_DIR,
+    build_all_recommendation_pages,
+    check_plan_data,
+)
+
+
+def report_issues(issues):
+    for issue in issues:
+        print(f"❌ {issue}")
+    print(f"💡 {len(issues)} problem(s) in the plan data, fix them and build again")
+
+
+def main():
+    """
+    Prebuild the recommendation page of every (stage, body, sex) profile.
+    Run it from the project root after any change to the database. The build
+    fails when a diet plan refers to a missing dish or its calories and
+    nutrition do not match its dishes.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild even if the catalog is unchanged"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="only check the plan data, build nothing"
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        print("🔍 Checking the plan data")
+        print("=" * 40)
+        issues = check_plan_data()
+        if issues:
+            report_issues(issues)
+            sys.exit(1)
+        print("✅ Every plan matches its dishes")
+        return
+
+    print("🔧 Building recommendation pages")
+    print("=" * 40)
+
+    try:
+        version, built = build_all_recommendation_pages(force=args.force)
+    except PlanDataError as e:
+        report_issues(e.issues)
+        sys.exit(1)
+
+    if built:
+        print(f"✅ Built pages for catalog version {version} in {BUILD_DIR / version}")
+    else:
+        print(f"✅ Catalog version {version} is already built, nothing to do")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+
+from services.exercise_pages import LOCAL_POSTER_DIR, fetch_exercise_posters
+
+
+def main():
+    """
+    Download the poster frame of every exercise video, so the Exercise Browser
+    can show it in place of the player until the user presses play.
+    Run it from the project root after any change to the exercises.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--force", action="store_true", help="download posters that are already cached"
+    )
+    args = parser.parse_args()
+
+    print("🖼️ Fetching exercise posters")
+    print("=" * 40)
+
+    results = fetch_exercise_posters(force=args.force)
+    for exercise_id, result in results.items():
+        icon = "⚠️" if result.startswith("failed") or result == "no video" else "✅"
+        print(f"{icon} {exercise_id}: {result}")
+
+    print(f"💡 Posters are in {LOCAL_POSTER_DIR}")
+
+
+if __name__ == "__main__":
+    main()
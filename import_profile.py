@@ -0,0 +1,109 @@
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ENTRY_POINTS = [
+    Path("main.py"),
+    Path("pages/2_🍱_eat.py"),
+    Path("pages/3_🏋️‍♂️_fit.py"),
+]
+
+# Modules we want to keep off the import path of a page until they are used
+HEAVY_MODULES = ("numpy", "pandas", "matplotlib", "sqlalchemy", "PIL")
+
+
+def import_statements(script):
+    """
+    The top-level import statements of a script, as source code
+    """
+    tree = ast.parse(script.read_text(encoding="utf-8"))
+    return "\n".join(
+        ast.unparse(node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+
+def profile_imports(script):
+    """
+    Run the imports of `script` in a fresh interpreter with -X importtime.
+    Returns {module: (self_us, cumulative_us)} in import order, where nested
+    imports keep their indentation.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", import_statements(script)],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        # Drop the separator space but keep the indentation of nested imports
+        timings[name[1:]] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def summarize(timings, top):
+    # Top-level packages are the entries without leading spaces
+    packages = {
+        name: cumulative
+        for name, (_, cumulative) in timings.items()
+        if not name.startswith(" ")
+    }
+    loaded = {name.strip().split(".")[0] for name in timings}
+    return {
+        "total_ms": round(sum(packages.values()) / 1000, 1),
+        "heavy_modules": [module for module in HEAVY_MODULES if module in loaded],
+        "slowest": [
+            (name, round(cumulative / 1000, 1))
+            for name, cumulative in sorted(
+                packages.items(), key=lambda item: item[1], reverse=True
+            )[:top]
+        ],
+    }
+
+
+def main():
+    """
+    Report how long each entry point of the app takes to import its
+    dependencies, and which heavy modules it loads before doing any work.
+    Run it from the project root.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list")
+    parser.add_argument("--json", type=Path, help="also save the report as JSON")
+    args = parser.parse_args()
+
+    report = {}
+    for script in ENTRY_POINTS:
+        print(f"⏱️ {script}")
+        print("=" * 40)
+        try:
+            summary = summarize(profile_imports(script), args.top)
+        except RuntimeError as e:
+            print(f"❌ Import failed: {e}\n")
+            continue
+
+        report[str(script)] = summary
+        print(f"📦 Total import time: {summary['total_ms']} ms")
+        heavy = ", ".join(summary["heavy_modules"]) or "none"
+        print(f"🐘 Heavy modules loaded at import: {heavy}")
+        for name, ms in summary["slowest"]:
+            print(f"   {ms:>8} ms  {name}")
+        print()
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, indent=2))
+        print(f"💾 Saved report to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
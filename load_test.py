@@ -0,0 +1,278 @@
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from services.catalog import NAME_SEARCH_PAGE_SIZE, get_name_index
+from services.memory_guard import current_rss_bytes
+
+MAIN_SCRIPT = Path(__file__).resolve().parent / "main.py"
+EAT_SCRIPT = MAIN_SCRIPT.parent / "pages" / "2_🍱_eat.py"
+FIT_SCRIPT = MAIN_SCRIPT.parent / "pages" / "3_🏋️‍♂️_fit.py"
+
+RESULTS_DIR = Path("benchmarks")
+RERUN_TIMEOUT = 60
+PERCENTILES = (50, 95, 99)
+
+# AppTest swaps a process-wide mock Runtime in and out around every run, so
+# two runs cannot overlap. Sessions queue for this lock instead, much like
+# script threads queue for the GIL in a real server process: the latency of
+# a rerun includes the wait, its service time does not.
+RUN_LOCK = threading.Lock()
+
+SEXES = ("Male", "Female")
+STAGES = ("Yes, I'm a beginner", "No, I'm an intermediate")
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class SimulatedSession():
+    """
+    One browser session: submits random body parameters on the main page,
+    then searches and opens dishes and exercises. Every rerun is timed.
+    """
+
+    def __init__(self, rng, think_time):
+        self.rng = rng
+        self.think_time = think_time
+        self.latencies = []
+        self.errors = 0
+        self.main = AppTest.from_file(str(MAIN_SCRIPT), default_timeout=RERUN_TIMEOUT)
+        self.eat = AppTest.from_file(str(EAT_SCRIPT), default_timeout=RERUN_TIMEOUT)
+        self.fit = AppTest.from_file(str(FIT_SCRIPT), default_timeout=RERUN_TIMEOUT)
+        self.dishes = get_name_index("Dish")
+        self.exercises = get_name_index("Exercise")
+
+    def _rerun(self, page, action, run):
+        requested = time.perf_counter()
+        with RUN_LOCK:
+            started = time.perf_counter()
+            app = run()
+            finished = time.perf_counter()
+        failed = len(app.exception) > 0
+        if failed:
+            self.errors += 1
+        self.latencies.append(
+            (page, action, finished - requested, finished - started, failed)
+        )
+
+    def start(self):
+        self._rerun("main", "open", self.main.run)
+        self._rerun("eat", "open", self.eat.run)
+        self._rerun("fit", "open", self.fit.run)
+
+    def submit_body_parameters(self):
+        app = self.main
+        app.radio[0].set_value(self.rng.choice(SEXES))
+        app.sidebar.number_input[0].set_value(round(self.rng.uniform(130.0, 220.0), 1))
+        app.sidebar.number_input[1].set_value(round(self.rng.uniform(30.0, 150.0), 1))
+        app.selectbox[0].set_value(self.rng.choice(STAGES))
+        submit = next(button for button in app.button if button.label == "Submit")
+        self._rerun("main", "submit", submit.click().run)
+
+    def browse(self, app, page, key, index):
+        # Type the start of a random name, then pick one of the visible results
+        name = index.names[self.rng.randrange(len(index))]
+        query = name[: self.rng.randint(1, min(4, len(name)))]
+        self._rerun(page, "search", app.text_input(key=f"{key}_query").input(query).run)
+
+        matches, _ = index.search(query, 0, NAME_SEARCH_PAGE_SIZE)
+        if matches:
+            selected = self.rng.choice(matches)[0]
+            results = app.selectbox(key=f"{key}_selected")
+            self._rerun(page, "select", results.set_value(selected).run)
+
+    def step(self):
+        if self.think_time > 0:
+            time.sleep(self.rng.expovariate(1 / self.think_time))
+        action = self.rng.random()
+        if action < 0.4:
+            self.submit_body_parameters()
+        elif action < 0.75:
+            self.browse(self.eat, "eat", "dish_search", self.dishes)
+        else:
+            self.browse(self.fit, "fit", "exercise_search", self.exercises)
+
+
+def run_session(seed, steps, think_time, results, lock):
+    session = SimulatedSession(random.Random(seed), think_time)
+    try:
+        session.start()
+        for _ in range(steps):
+            session.step()
+    except Exception as e:
+        print(f"❌ Session {seed} stopped: {e}")
+        session.errors += 1
+    with lock:
+        results.append(session)
+
+
+def summarize(latencies):
+    values = sorted(entry[2] for entry in latencies)
+    service = [entry[3] for entry in latencies]
+    summary = {"reruns": len(values)}
+    for p in PERCENTILES:
+        value = percentile(values, p)
+        summary[f"p{p}_ms"] = None if value is None else round(value * 1000, 2)
+    summary["mean_ms"] = round(sum(values) / len(values) * 1000, 2) if values else None
+    summary["mean_service_ms"] = (
+        round(sum(service) / len(service) * 1000, 2) if service else None
+    )
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_load_test(sessions, steps, seed, think_time):
+    results = []
+    lock = threading.Lock()
+    rss_before = current_rss_bytes()
+    started = time.perf_counter()
+
+    threads = [
+        threading.Thread(
+            target=run_session, args=(seed + i, steps, think_time, results, lock)
+        )
+        for i in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    wall_time = time.perf_counter() - started
+    rss_after = current_rss_bytes()
+
+    latencies = [entry for session in results for entry in session.latencies]
+    by_page = {}
+    for entry in latencies:
+        by_page.setdefault(f"{entry[0]}/{entry[1]}", []).append(entry)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "sessions": sessions,
+        "steps": steps,
+        "seed": seed,
+        "think_time_s": think_time,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(len(latencies) / wall_time, 2) if wall_time else None,
+        "errors": sum(session.errors for session in results),
+        "memory": {
+            "rss_before_mb": round(rss_before / 2**20, 1),
+            "rss_after_mb": round(rss_after / 2**20, 1),
+            "growth_mb": round((rss_after - rss_before) / 2**20, 1),
+        },
+        "overall": summarize(latencies),
+        "pages": {name: summarize(entries) for name, entries in sorted(by_page.items())},
+    }
+
+
+def print_report(report, baseline=None):
+    print(
+        f"📊 {report['sessions']} sessions, {report['overall']['reruns']} reruns "
+        f"in {report['wall_time_s']} s ({report['throughput_rps']} reruns/s), "
+        f"{report['errors']} errors"
+    )
+    print(
+        f"🧠 RSS {report['memory']['rss_before_mb']} MB -> "
+        f"{report['memory']['rss_after_mb']} MB "
+        f"(+{report['memory']['growth_mb']} MB)"
+    )
+    print("=" * 72)
+    print(
+        f"{'rerun':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'service ms':>12}"
+    )
+    rows = [("overall", report["overall"])] + list(report["pages"].items())
+    for name, summary in rows:
+        print(
+            f"{name:<16}{summary['reruns']:>8}"
+            + "".join(f"{summary[f'p{p}_ms']:>10}" for p in PERCENTILES)
+            + f"{summary['mean_service_ms']:>12}"
+        )
+
+    if baseline is not None:
+        print("=" * 72)
+        print(f"🔁 Compared with {baseline.get('revision')} ({baseline.get('timestamp')})")
+        for name, summary in rows:
+            before = (
+                baseline["overall"]
+                if name == "overall"
+                else baseline.get("pages", {}).get(name)
+            )
+            if not before:
+                continue
+            deltas = []
+            for p in PERCENTILES:
+                old, new = before.get(f"p{p}_ms"), summary[f"p{p}_ms"]
+                if old and new is not None:
+                    deltas.append(f"p{p} {(new - old) / old * 100:+.1f}%")
+            print(f"{name:<16}" + ", ".join(deltas))
+
+
+def main():
+    """
+    Drive main.py, the eat page and the fit page with concurrent simulated
+    sessions in this process and report rerun latency, throughput and memory
+    growth. Run it from the project root.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--steps", type=int, default=20, help="actions per session")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first session")
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=1.0,
+        help="mean pause in seconds between the actions of a session",
+    )
+    parser.add_argument(
+        "--output", type=Path, help="where to save the JSON report (default: benchmarks/)"
+    )
+    parser.add_argument("--compare", type=Path, help="earlier JSON report to compare with")
+    args = parser.parse_args()
+
+    print(f"🚦 Load test: {args.sessions} sessions x {args.steps} actions")
+    report = run_load_test(args.sessions, args.steps, args.seed, args.think_time)
+
+    baseline = None
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+    print_report(report, baseline)
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"load_test-{report['revision'] or 'local'}-{stamp}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"💾 Saved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -50,17 +50,22 @@ class NutritionDetail():
         self.fat = fat
         self.protein = protein
 
+    def get_macro_calories(self):
+        return self.carbs * 4 + self.fat * 9 + self.protein * 4
+
+    def get_macro_percentages(self):
+        # One denominator for the three shares
+        total = self.get_macro_calories()
+        return self.carbs * 4 / total, self.fat * 9 / total, self.protein * 4 / total
+
     def get_carbs_percentage(self):
-        c = self.carbs * 4 / (self.carbs * 4 + self.fat * 9 + self.protein * 4)
-        return c
+        return self.get_macro_percentages()[0]
 
     def get_fat_percentage(self):
-        f = self.fat * 9 / (self.carbs * 4 + self.fat * 9 + self.protein * 4)
-        return f
+        return self.get_macro_percentages()[1]
 
     def get_protein_percentage(self):
-        p = self.protein * 4 / (self.carbs * 4 + self.fat * 9 + self.protein * 4)
-        return p
+        return self.get_macro_percentages()[2]
 
 class DietDetail():
     def __init__(self, calories, id1, amount1, id2, amount2):
@@ -71,14 +76,28 @@ class DietDetail():
         self.amount2 = amount2
 
 class Dish():
-    def __init__(self, id, name, image, nutrition, recipe, steps):
+    def __init__(self, id, name, image, nutrition, recipe, steps, image_loader=None):
         self.id = id
         self.name = name
-        self.image = image
+        self._image = image
+        # Called with the dish id on first access of `image` when no image was given
+        self._image_loader = image_loader
         self.nutrition = nutrition
         self.recipe = recipe
         self.steps = steps
 
+    @property
+    def image(self):
+        if self._image is None and self._image_loader is not None:
+            self._image = self._image_loader(self.id)
+            self._image_loader = None
+        return self._image
+
+    @image.setter
+    def image(self, value):
+        self._image = value
+        self._image_loader = None
+
     def get_nutrition_detail(self):
         tmp = self.nutrition.split(';')
         return NutritionDetail(float(tmp[0]), float(tmp[1]), float(tmp[2]), float(tmp[3]))
@@ -1,56 +1,37 @@
 import streamlit as st
-import sqlalchemy
 from models.eat import *
-import base64
-import matplotlib
-import matplotlib.pyplot as plt
-from pathlib import Path
+from services import rendering
+from services.catalog import fetch_dish, get_engine, get_name_index
+from services.charts import render_macro_pie
+from services.image_server import dish_image_url, get_dish_image_data
+from services.metrics import span, start_rerun
+from services.ui import catalog_search, timing_panel
+from services.warmup import start_warmup
 
 st.set_page_config(page_title="DietExercise Companion - Food", page_icon="🍱")
 
+timer = start_rerun("eat")
 
-def load_local_image(dish_id):
-    """
-    Try to load image from local file system
-    """
-    try:
-        # Possible image paths and formats
-        image_paths = [
-            Path(f"images/dishes/{dish_id.zfill(2)}.jpg"),
-            Path(f"images/dishes/{dish_id}.jpg"),
-            Path(f"images/dishes/{dish_id.zfill(2)}.png"),
-            Path(f"images/dishes/{dish_id}.png"),
-            Path(f"images/dishes/{dish_id.zfill(2)}.jpeg"),
-            Path(f"images/dishes/{dish_id}.jpeg"),
-        ]
-
-        for image_path in image_paths:
-            if image_path.exists():
-                with open(image_path, "rb") as img_file:
-                    return img_file.read()
-
-        return None
-
-    except Exception as e:
-        print(f"Error loading local image for dish {dish_id}: {e}")
-        return None
+# Fills the caches in the background on the first rerun of a process; a no-op
+# when the server was started through serve.py, which warms up before serving
+start_warmup()
 
 
 def display_dish_image(dish, width="100%"):
     """
     Display dish image with proper fallback handling
     """
-    # Try to get image from database first
-    image_data = dish.image
+    # Prefer a URL on the image server so the browser can cache the picture
+    image_url = dish_image_url(dish)
+    if image_url is not None:
+        st.image(image_url, width=350, caption=f"Image of {dish.name}")
+        return True
 
-    # If no image in database, try to load from local files
-    if image_data is None or (isinstance(image_data, bytes) and len(image_data) == 0):
-        image_data = load_local_image(dish.id)
+    image_data = get_dish_image_data(dish)
 
     # If we have image data, display it
-    if image_data is not None and len(image_data) > 0:
+    if image_data is not None:
         try:
-            image_b64 = base64.b64encode(image_data).decode("utf-8")
             st.image(image_data, width=350, caption=f"Image of {dish.name}")
             return True
         except Exception as e:
@@ -119,14 +100,9 @@ st.markdown(
 
 # Database connection with error handling
 try:
-    engine = sqlalchemy.create_engine("sqlite:///database/dietexercise_companion.db")
-    with engine.connect() as conn:
-        all_dish_results = conn.execute("SELECT * FROM Dish").fetchall()
-
-    dish_keywords = [""]
-    for d in all_dish_results:
-        dish = Dish(*d)
-        dish_keywords.append(dish.name)
+    engine = get_engine()
+    # Warm the name index so a broken database is reported before the layout
+    get_name_index("Dish")
 
 except Exception as e:
     st.error(f"❌ Database connection error: {str(e)}")
@@ -143,114 +119,91 @@ with col2:
         """,
         unsafe_allow_html=True,
     )
-    dish_keyword = st.selectbox("**Search**", tuple(dish_keywords))
+    dish_id = catalog_search("Dish", key="dish_search")
 
-if dish_keyword != "":
+if dish_id is not None:
     try:
-        with engine.connect() as conn:
-            dish_result = conn.execute(
-                "SELECT * FROM Dish WHERE Name = :name", {"name": dish_keyword}
-            ).fetchone()
-
-            if dish_result is None:
-                st.error(f"❌ Dish '{dish_keyword}' not found in database")
-                st.info("This might be due to database synchronization issues.")
-                st.stop()
-
-            dish = Dish(*dish_result)
-
-        # Dish title
-        st.markdown(
-            f"""
-            <div style="text-align: center; margin: 2rem 0;">
-                <h2 style="color: #2E86AB; font-size: 2.2rem; font-weight: 600;">
-                    {dish.name}
-                </h2>
-                <div style="width: 100px; height: 3px; 
-                           background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                           margin: 10px auto; border-radius: 2px;"></div>
-            </div>
-        """,
-            unsafe_allow_html=True,
-        )
-
-        # Main content layout
-        col1, col2 = st.columns([1.5, 1])
+        with span("sql"):
+            with engine.connect() as conn:
+                dish = fetch_dish(conn, dish_id)
 
-        # Image column
-        with col1:
-            display_dish_image(dish)
+        if dish is None:
+            st.error(f"❌ Dish '{dish_id}' not found in database")
+            st.info("This might be due to database synchronization issues.")
+            st.stop()
 
-        # Nutrition column
-        with col2:
+        with span("parse"):
             nutrition_detail = dish.get_nutrition_detail()
+            recipe_detail = dish.get_recipe_detail()
+            steps_detail = dish.get_steps_detail()
 
-            # Create a simple nutrition info box
-            st.markdown("#### 📊 Nutrition Facts")
-
-            # Display nutrition info in a clean format
-            nutrition_col1, nutrition_col2 = st.columns(2)
-
-            with nutrition_col1:
-                st.metric("Calories", f"{round(nutrition_detail.calories)}")
-                st.metric("Carbs", f"{nutrition_detail.carbs} g")
-
-            with nutrition_col2:
-                st.metric("Fat", f"{nutrition_detail.fat} g")
-                st.metric("Protein", f"{nutrition_detail.protein} g")
-
-            # Pie chart
-            st.markdown("#### 📈 Calorie Distribution")
-
-            matplotlib.rcParams.update({"font.size": 10})
-            labels = ["Carbs", "Fat", "Protein"]
-            colors = ["#F7D300", "#38BC56", "#D35454"]
-            data = [
-                nutrition_detail.get_carbs_percentage(),
-                nutrition_detail.get_fat_percentage(),
-                nutrition_detail.get_protein_percentage(),
-            ]
-
-            fig, ax = plt.subplots(figsize=(4, 4))
-            wedges, texts, autotexts = ax.pie(
-                data,
-                labels=labels,
-                colors=colors,
-                explode=(0.05, 0.05, 0.05),
-                autopct="%1.1f%%",
-                startangle=90,
-                textprops={"fontweight": "bold", "fontsize": 10},
+        chart_svg = render_macro_pie(nutrition_detail, "dish")
+
+        with span("emit"):
+            # Dish title
+            st.markdown(
+                f"""
+                <div style="text-align: center; margin: 2rem 0;">
+                    <h2 style="color: #2E86AB; font-size: 2.2rem; font-weight: 600;">
+                        {rendering.escape(dish.name)}
+                    </h2>
+                    <div style="width: 100px; height: 3px; 
+                               background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                               margin: 10px auto; border-radius: 2px;"></div>
+                </div>
+            """,
+                unsafe_allow_html=True,
             )
 
-            for autotext in autotexts:
-                autotext.set_color("white")
-                autotext.set_fontweight("bold")
+            # Main content layout
+            col1, col2 = st.columns([1.5, 1])
 
-            st.pyplot(fig)
+            # Image column
+            with col1:
+                display_dish_image(dish)
 
-        # Recipe and Steps sections
-        st.markdown("<br/>", unsafe_allow_html=True)
+            # Nutrition column
+            with col2:
+                # Create a simple nutrition info box
+                st.markdown("#### 📊 Nutrition Facts")
 
-        col1, col2 = st.columns([1, 1.5])
+                # Display nutrition info in a clean format
+                nutrition_col1, nutrition_col2 = st.columns(2)
 
-        # Recipe column
-        with col1:
-            st.markdown("#### 🛒 Ingredients")
-            recipe_detail = dish.get_recipe_detail()
+                with nutrition_col1:
+                    st.metric("Calories", f"{round(nutrition_detail.calories)}")
+                    st.metric("Carbs", f"{nutrition_detail.carbs} g")
 
-            for ingredient, amount in recipe_detail.ingredients.items():
-                st.markdown(f"**{ingredient}:** {amount}")
+                with nutrition_col2:
+                    st.metric("Fat", f"{nutrition_detail.fat} g")
+                    st.metric("Protein", f"{nutrition_detail.protein} g")
 
-        # Steps column
-        with col2:
-            st.markdown("#### 👨‍🍳 Cooking Instructions")
-            steps_detail = dish.get_steps_detail()
+                # Pie chart
+                st.markdown(
+                    rendering.heading("📈 Calorie Distribution") + chart_svg,
+                    unsafe_allow_html=True,
+                )
 
-            step_number = 1
-            for step, detail in steps_detail.steps.items():
-                st.markdown(f"**Step {step_number}:** {detail}")
-                step_number += 1
+            # Recipe and Steps sections
+            st.markdown("<br/>", unsafe_allow_html=True)
+
+            col1, col2 = st.columns([1, 1.5])
+
+            # Recipe column
+            with col1:
+                st.markdown(
+                    rendering.ingredients_block(recipe_detail.ingredients),
+                    unsafe_allow_html=True,
+                )
+
+            # Steps column
+            with col2:
+                st.markdown(
+                    rendering.steps_block(steps_detail.steps), unsafe_allow_html=True
+                )
 
     except Exception as e:
         st.error(f"❌ Error loading dish data: {str(e)}")
         st.info("There might be an issue with the database connection or data format.")
+
+timing_panel(timer)
@@ -1,9 +1,61 @@
 import streamlit as st
-import sqlalchemy
 from models.fit import *
+from services import rendering
+from services.exercise_pages import autoplay_link, get_exercise_page
+from services.image_server import exercise_poster_url
+from services.metrics import span, start_rerun
+from services.ui import catalog_search, timing_panel
+from services.warmup import start_warmup
 
 st.set_page_config(page_title="DietExercise Companion - Fitness", page_icon="🏋️‍♂️")
 
+timer = start_rerun("fit")
+
+# Fills the caches in the background on the first rerun of a process; a no-op
+# when the server was started through serve.py, which warms up before serving
+start_warmup()
+
+
+def play_video(exercise_id):
+    st.session_state.playing_video = exercise_id
+
+
+def display_video(page):
+    """
+    Show the poster of the video with a play button; the third-party player
+    is only embedded once the button is pressed
+    """
+    if st.session_state.get("playing_video") == page["id"]:
+        st.markdown(
+            f"""
+                <iframe width="100%" height="500px" allow="autoplay; fullscreen;" src="{rendering.escape(autoplay_link(page["link"]))}"></iframe>
+            """,
+            unsafe_allow_html=True,
+        )
+        return
+
+    poster_url = exercise_poster_url(page["id"])
+    if poster_url is not None:
+        st.image(poster_url, caption=f"Video of {page['name']}")
+    else:
+        st.markdown(
+            f"""
+                <div style="aspect-ratio: 16 / 9; display: flex; align-items: center; justify-content: center;
+                            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                            color: white; border-radius: 15px; font-size: 1.5rem;">
+                    🎬 {rendering.escape(page["name"])}
+                </div>
+            """,
+            unsafe_allow_html=True,
+        )
+    st.button(
+        "▶️ Play video",
+        key=f"play_{page['id']}",
+        on_click=play_video,
+        args=(page["id"],),
+    )
+
+
 # A workaround using st.markdown() to apply some style sheets to the page
 st.markdown(
     f"""
@@ -65,16 +117,6 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-engine = sqlalchemy.create_engine("sqlite:///database/dietexercise_companion.db")
-with engine.connect() as conn:
-    all_exercise_results = conn.execute("SELECT * FROM Exercise").fetchall()
-exercise_keywords = [
-    "",
-]
-for e in all_exercise_results:
-    exercise = Exercise(*e)
-    exercise_keywords.append(exercise.name)
-
 col1, col2, col3 = st.columns([0.4, 1.2, 0.4])
 with col2:
     st.markdown(
@@ -83,47 +125,28 @@ with col2:
         """,
         unsafe_allow_html=True,
     )
-    exercise_keyword = st.selectbox("**Search**", tuple(exercise_keywords))
-
-if exercise_keyword != "":
-    with engine.connect() as conn:
-        exercise_result = conn.execute(
-            "SELECT * FROM Exercise WHERE Name = :name", {"name": exercise_keyword}
-        ).fetchone()
-        exercise = Exercise(*exercise_result)
-        st.markdown(
-            f"""
-                <h2 style="text-align: center">{exercise.name}</h2>
-            """,
-            unsafe_allow_html=True,
-        )
-
-    col1, col2, col3 = st.columns([0.15, 1.7, 0.15])
-    with col2:
-        st.markdown(
-            f"""
-                <iframe width="100%" height="500px" allow="fullscreen;" src="{exercise.link}"></iframe>
-            """,
-            unsafe_allow_html=True,
-        )
-        st.subheader("I. Overview")
-
-        overview_builder = ""
-
-        for p in exercise.get_overview_paragraph():
-            overview_builder += f"<p style='padding-left: 22px'>{p}</p>"
-
-        st.markdown(overview_builder, unsafe_allow_html=True)
-
-        st.subheader("II. Instructions")
-
-        instructions_builder = (
-            "<ul style='list-style-type: decimal; padding-left: 22px'>"
-        )
-
-        for li in exercise.get_introductions_detail():
-            instructions_builder += f"<li>{li}</li>"
-
-        instructions_builder += "</ul>"
-
-        st.markdown(instructions_builder, unsafe_allow_html=True)
+    exercise_id = catalog_search("Exercise", key="exercise_search")
+
+if exercise_id is not None:
+    # Every exercise is rendered once per database version, so a selection is
+    # a dictionary lookup
+    with span("parse"):
+        page = get_exercise_page(exercise_id)
+
+    if page is None:
+        st.error(f"❌ Exercise '{exercise_id}' not found in database")
+        st.stop()
+
+    with span("emit"):
+        st.markdown(page["title_html"], unsafe_allow_html=True)
+
+        col1, col2, col3 = st.columns([0.15, 1.7, 0.15])
+        with col2:
+            # The video slot is reserved above the text, but the text is sent
+            # first so it shows before any poster or player
+            video = st.container()
+            st.markdown(page["body_html"], unsafe_allow_html=True)
+            with video:
+                display_video(page)
+
+timing_panel(timer)
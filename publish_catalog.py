@@ -0,0 +1,38 @@
+import argparse
+import sys
+
+from algorithm.plan_integrity import PlanDataError
+from services.shared_catalog import SHARED_CATALOG_DIR, publish_shared_catalog
+
+
+def main():
+    """
+    Publish the catalog as a single memory-mapped file that every app worker
+    on this host can share. Start the workers with SHARED_CATALOG=1 to read
+    from it. Run it from the project root after any change to the database.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--no-images",
+        action="store_true",
+        help="leave dish images out; workers then read them from SQLite",
+    )
+    args = parser.parse_args()
+
+    print("📦 Publishing the shared catalog")
+    print("=" * 40)
+
+    try:
+        path = publish_shared_catalog(images=not args.no_images)
+    except PlanDataError as e:
+        for issue in e.issues:
+            print(f"❌ {issue}")
+        print("💡 Run build_recommendations.py --check, fix the plan data and publish again")
+        sys.exit(1)
+
+    print(f"✅ Published {path.stat().st_size / 2**20:.1f} MB to {path}")
+    print(f"💡 Workers follow {SHARED_CATALOG_DIR / 'current.json'}")
+
+
+if __name__ == "__main__":
+    main()
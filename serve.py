@@ -0,0 +1,35 @@
+import sys
+
+from streamlit.web import cli as streamlit_cli
+
+from services.catalog import USE_SHARED_CATALOG, shared_catalog
+from services.warmup import warm_up
+
+
+def main():
+    """
+    Warm the catalog and caches, then start the Streamlit server in the same
+    process, so the first user does not pay for them. Extra arguments go to
+    `streamlit run`, e.g. `python serve.py --server.port 8501`.
+    Run it from the project root.
+    """
+    # The first worker publishes the shared catalog, the others attach to it
+    if USE_SHARED_CATALOG and shared_catalog() is None:
+        from services.shared_catalog import publish_shared_catalog
+
+        print(f"📦 Published the shared catalog to {publish_shared_catalog()}")
+
+    print("🔥 Warming up")
+    print("=" * 40)
+    for step, result in warm_up().items():
+        if isinstance(result, str):
+            print(f"⚠️ {step}: {result}")
+        else:
+            print(f"✅ {step}: {result * 1000:.1f} ms")
+
+    sys.argv = ["streamlit", "run", "main.py", *sys.argv[1:]]
+    sys.exit(streamlit_cli.main())
+
+
+if __name__ == "__main__":
+    main()
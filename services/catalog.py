@@ -0,0 +1,233 @@
+import os
+from functools import lru_cache
+
+from models.eat import Dish
+from models.fit import Exercise
+
+DATABASE_PATH = "database/dietexercise_companion.db"
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+
+# Columns needed to build a Dish without touching the Image pages.
+# The image itself is fetched lazily through dish_images.load_dish_image().
+DISH_FIELDS = ("Id", "Name", "Nutrition", "Recipe", "Steps")
+DISH_COLUMNS = ", ".join(DISH_FIELDS)
+
+# Tables that can be browsed by name, with the query that feeds their index
+NAME_INDEX_QUERIES = {
+    "Dish": "SELECT Id, Name FROM Dish ORDER BY Name",
+    "Exercise": "SELECT Id, Name FROM Exercise ORDER BY Name",
+}
+NAME_SEARCH_PAGE_SIZE = 25
+
+# With SHARED_CATALOG=1, reads go to the catalog file published by
+# publish_catalog.py (see services/shared_catalog.py) instead of SQLite
+USE_SHARED_CATALOG = os.environ.get("SHARED_CATALOG") == "1"
+
+_engine = None
+
+
+def get_engine():
+    """
+    Return the process-wide SQLAlchemy engine for the app database
+    """
+    global _engine
+    if _engine is None:
+        # Imported here, so entry points only pay for SQLAlchemy once they query
+        import sqlalchemy
+
+        from services.query_log import query_log
+
+        _engine = sqlalchemy.create_engine(DATABASE_URL)
+        query_log.install(_engine)
+    return _engine
+
+
+def shared_catalog():
+    """
+    The shared catalog this process is attached to, or None when the option
+    is off or nothing was published for the current database
+    """
+    if not USE_SHARED_CATALOG:
+        return None
+    from services.shared_catalog import attach_shared_catalog
+
+    return attach_shared_catalog(database_stamp())
+
+
+def dish_from_row(row):
+    """
+    Build a Dish from a DISH_COLUMNS row, with its image loaded on first access
+    """
+    from services.dish_images import load_dish_image
+
+    id, name, nutrition, recipe, steps = row
+    return Dish(id, name, None, nutrition, recipe, steps, image_loader=load_dish_image)
+
+
+def fetch_dish(conn, dish_id):
+    """
+    Fetch a single dish by primary key, or None if it does not exist
+    """
+    shared = shared_catalog()
+    if shared is not None:
+        result = shared.lookup("Dish", dish_id, DISH_FIELDS)
+        return None if result is None else dish_from_row(result)
+
+    result = conn.execute(
+        f"SELECT {DISH_COLUMNS} FROM Dish WHERE Id = :id", {"id": dish_id}
+    ).fetchone()
+    return None if result is None else dish_from_row(result)
+
+
+def fetch_exercise(conn, exercise_id):
+    """
+    Fetch a single exercise by primary key, or None if it does not exist
+    """
+    shared = shared_catalog()
+    if shared is not None:
+        result = shared.lookup("Exercise", exercise_id)
+        return None if result is None else Exercise(*result)
+
+    result = conn.execute(
+        "SELECT * FROM Exercise WHERE Id = :id", {"id": exercise_id}
+    ).fetchone()
+    return None if result is None else Exercise(*result)
+
+
+def database_stamp():
+    """
+    Cheap fingerprint of the database file, used to refresh derived caches
+    """
+    stat = os.stat(DATABASE_PATH)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class NameIndex():
+    """
+    In-memory (Id, Name) list of a table with a paginated, case-insensitive
+    typeahead search. Names starting with the query rank before names that
+    only contain it.
+    """
+
+    def __init__(self, rows):
+        self.ids = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        self._folded_names = [name.casefold() for name in self.names]
+        self._name_by_id = dict(zip(self.ids, self.names))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def name_of(self, id):
+        return self._name_by_id.get(id)
+
+    def search(self, query, page=0, page_size=NAME_SEARCH_PAGE_SIZE):
+        """
+        Return (matches, total) where matches is the requested page of
+        (id, name) pairs and total is the number of matches over all pages
+        """
+        query = query.strip().casefold()
+        if query == "":
+            positions = range(len(self.ids))
+        else:
+            prefix = []
+            contains = []
+            for position, name in enumerate(self._folded_names):
+                if name.startswith(query):
+                    prefix.append(position)
+                elif query in name:
+                    contains.append(position)
+            positions = prefix + contains
+
+        start = max(page, 0) * page_size
+        matches = [
+            (self.ids[position], self.names[position])
+            for position in positions[start : start + page_size]
+        ]
+        return matches, len(positions)
+
+
+@lru_cache(maxsize=8)
+def _load_name_index(table, stamp):
+    shared = shared_catalog()
+    if shared is not None:
+        return NameIndex(
+            sorted(shared.rows(table, ("Id", "Name")), key=lambda row: row[1])
+        )
+    with get_engine().connect() as conn:
+        return NameIndex(conn.execute(NAME_INDEX_QUERIES[table]).fetchall())
+
+
+def get_name_index(table):
+    """
+    Return the cached NameIndex of "Dish" or "Exercise", rebuilt only when the
+    database file changes
+    """
+    return _load_name_index(table, database_stamp())
+
+
+def invalidate_name_indexes():
+    _load_name_index.cache_clear()
+
+
+# Tables with a 'cal;carbs;fat;protein' Nutrition column, keyed by their Id
+NUTRITION_QUERIES = {
+    "Dish": "SELECT Id, Nutrition FROM Dish ORDER BY rowid",
+    "LowCarb": "SELECT Calories, Nutrition FROM LowCarb ORDER BY Calories",
+    "ModerateCarb": "SELECT Calories, Nutrition FROM ModerateCarb ORDER BY Calories",
+    "HighCarb": "SELECT Calories, Nutrition FROM HighCarb ORDER BY Calories",
+}
+
+
+@lru_cache(maxsize=8)
+def _load_nutrition_matrix(table, stamp):
+    # Imported here, so pages that never filter by nutrition do not load numpy
+    from algorithm.nutrition_matrix import NutritionMatrix
+
+    shared = shared_catalog()
+    if shared is not None and table == "Dish":
+        # The published array is already in Dish row order: no parsing
+        ids = [row[0] for row in shared.rows("Dish", ("Id",))]
+        return NutritionMatrix(ids, shared.nutrition_array())
+    with get_engine().connect() as conn:
+        return NutritionMatrix.from_rows(
+            conn.execute(NUTRITION_QUERIES[table]).fetchall()
+        )
+
+
+def get_nutrition_matrix(table):
+    """
+    Return the cached NutritionMatrix of "Dish" or of a diet plan table, keyed
+    by Id (or Calories for plans), rebuilt only when the database file changes
+    """
+    return _load_nutrition_matrix(table, database_stamp())
+
+
+@lru_cache(maxsize=2)
+def _load_substitute_index(stamp):
+    from algorithm.substitutes import SubstituteIndex, parse_ingredients
+
+    matrix = _load_nutrition_matrix("Dish", stamp)
+    shared = shared_catalog()
+    if shared is not None:
+        recipes = [row[0] for row in shared.rows("Dish", ("Recipe",))]
+    else:
+        with get_engine().connect() as conn:
+            recipes = [
+                row[0]
+                for row in conn.execute("SELECT Recipe FROM Dish ORDER BY rowid")
+            ]
+    return SubstituteIndex(matrix, [parse_ingredients(recipe) for recipe in recipes])
+
+
+def get_substitute_index():
+    """
+    Return the cached SubstituteIndex over every dish, rebuilt only when the
+    database file changes
+    """
+    return _load_substitute_index(database_stamp())
+
+
+def invalidate_nutrition_matrices():
+    _load_nutrition_matrix.cache_clear()
+    _load_substitute_index.cache_clear()
@@ -0,0 +1,207 @@
+import io
+import math
+from functools import lru_cache
+
+from models.eat import NutritionDetail
+from services.metrics import span
+
+MACRO_LABELS = ["Carbs", "Fat", "Protein"]
+MACRO_COLORS = ["#F7D300", "#38BC56", "#D35454"]
+
+# Each style reproduces one of the pies the pages used to draw inline
+CHART_STYLES = {
+    # Diet plan tabs on the main page
+    "plan": {
+        "font_size": 8,
+        "figsize": (3, 3),
+        "explode": (0.1, 0.05, 0.05),
+        "title": "Calorie Distribution",
+        "textprops": None,
+        "autotext_color": None,
+    },
+    # Dish detail on the food browser
+    "dish": {
+        "font_size": 10,
+        "figsize": (4, 4),
+        "explode": (0.05, 0.05, 0.05),
+        "title": None,
+        "textprops": {"fontweight": "bold", "fontsize": 10},
+        "autotext_color": "white",
+    },
+}
+
+CHART_CACHE_SIZE = 256
+
+# Geometry of the SVG renderer, in user units with a pie radius of 100.
+# The values mirror matplotlib's pie(): labels at 1.1 r, percentages at 0.6 r.
+SVG_RADIUS = 100
+SVG_LABEL_DISTANCE = 1.1
+SVG_PCT_DISTANCE = 0.6
+SVG_VIEWBOX = (-175, -165, 350, 310)
+# Converts a matplotlib font size in points to SVG user units
+SVG_POINTS_TO_UNITS = 1.6
+SVG_PIXELS_PER_INCH = 100
+
+
+def render_macro_pie(nutrition_detail, style="plan", renderer="svg"):
+    """
+    Return the Carbs/Fat/Protein pie for a NutritionDetail, cached by
+    (carbs, fat, protein, style, renderer) so a repeat view is only a lookup.
+    The default renderer returns an SVG string; renderer="matplotlib" returns
+    PNG bytes from the legacy matplotlib renderer.
+    """
+    key = (
+        float(nutrition_detail.carbs),
+        float(nutrition_detail.fat),
+        float(nutrition_detail.protein),
+        style,
+    )
+    if renderer not in ("svg", "matplotlib"):
+        raise ValueError(f"Unknown chart renderer: {renderer}")
+    with span("chart"):
+        if renderer == "svg":
+            return _render_macro_pie_svg(*key)
+        return _render_macro_pie_png(*key)
+
+
+def get_macro_percentages(nutrition_detail):
+    return list(nutrition_detail.get_macro_percentages())
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _render_macro_pie_svg(carbs, fat, protein, style):
+    return render_macro_pie_svg(
+        get_macro_percentages(NutritionDetail(0, carbs, fat, protein)), style
+    )
+
+
+def render_macro_pie_svg(percentages, style="plan"):
+    """
+    Draw the macro pie as standalone SVG, in pure Python.
+    `percentages` is the [carbs, fat, protein] output of the
+    NutritionDetail.get_*_percentage methods.
+    """
+    options = CHART_STYLES[style]
+    total = sum(percentages)
+    textprops = options["textprops"] or {}
+    label_size = textprops.get("fontsize", options["font_size"]) * SVG_POINTS_TO_UNITS
+    font_weight = textprops.get("fontweight", "normal")
+    pct_color = options["autotext_color"] or "#000000"
+    pct_weight = "bold" if options["autotext_color"] is not None else font_weight
+
+    width = options["figsize"][0] * SVG_PIXELS_PER_INCH
+    height = round(width * SVG_VIEWBOX[3] / SVG_VIEWBOX[2])
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="{" ".join(str(v) for v in SVG_VIEWBOX)}" style="max-width: 100%" '
+        f'font-family="DejaVu Sans, Arial, sans-serif" role="img" '
+        f'aria-label="Calorie distribution">'
+    ]
+
+    if options["title"] is not None:
+        parts.append(
+            f'<text x="0" y="-140" text-anchor="middle" '
+            f'font-size="{12 * SVG_POINTS_TO_UNITS:g}">{options["title"]}</text>'
+        )
+
+    # Wedges go counterclockwise from 12 o'clock, like startangle=90 in matplotlib.
+    # SVG's y axis points down, so every y coordinate is negated.
+    theta1 = 90.0
+    for fraction, label, color, explode in zip(
+        percentages, MACRO_LABELS, MACRO_COLORS, options["explode"]
+    ):
+        share = fraction / total if total else 0.0
+        theta2 = theta1 + 360.0 * share
+        middle = math.radians((theta1 + theta2) / 2)
+        offset_x = explode * SVG_RADIUS * math.cos(middle)
+        offset_y = explode * SVG_RADIUS * math.sin(middle)
+
+        if share >= 1.0:
+            parts.append(
+                f'<circle cx="{offset_x:.2f}" cy="{-offset_y:.2f}" r="{SVG_RADIUS}" '
+                f'fill="{color}"/>'
+            )
+        elif share > 0.0:
+            start_x = offset_x + SVG_RADIUS * math.cos(math.radians(theta1))
+            start_y = offset_y + SVG_RADIUS * math.sin(math.radians(theta1))
+            end_x = offset_x + SVG_RADIUS * math.cos(math.radians(theta2))
+            end_y = offset_y + SVG_RADIUS * math.sin(math.radians(theta2))
+            large_arc = 1 if share > 0.5 else 0
+            parts.append(
+                f'<path d="M {offset_x:.2f} {-offset_y:.2f} '
+                f"L {start_x:.2f} {-start_y:.2f} "
+                f"A {SVG_RADIUS} {SVG_RADIUS} 0 {large_arc} 0 {end_x:.2f} {-end_y:.2f} "
+                f'Z" fill="{color}"/>'
+            )
+
+        label_x = offset_x + SVG_LABEL_DISTANCE * SVG_RADIUS * math.cos(middle)
+        label_y = offset_y + SVG_LABEL_DISTANCE * SVG_RADIUS * math.sin(middle)
+        anchor = "start" if label_x > 0 else "end"
+        parts.append(
+            f'<text x="{label_x:.2f}" y="{-label_y:.2f}" text-anchor="{anchor}" '
+            f'dominant-baseline="middle" font-size="{label_size:g}" '
+            f'font-weight="{font_weight}">{label}</text>'
+        )
+
+        pct_x = offset_x + SVG_PCT_DISTANCE * SVG_RADIUS * math.cos(middle)
+        pct_y = offset_y + SVG_PCT_DISTANCE * SVG_RADIUS * math.sin(middle)
+        parts.append(
+            f'<text x="{pct_x:.2f}" y="{-pct_y:.2f}" text-anchor="middle" '
+            f'dominant-baseline="middle" font-size="{label_size:g}" '
+            f'font-weight="{pct_weight}" fill="{pct_color}">{share * 100:.1f}%</text>'
+        )
+
+        theta1 = theta2
+
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _render_macro_pie_png(carbs, fat, protein, style):
+    # Legacy renderer: matplotlib is only imported when someone asks for it
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    options = CHART_STYLES[style]
+    data = get_macro_percentages(NutritionDetail(0, carbs, fat, protein))
+
+    with matplotlib.rc_context({"font.size": options["font_size"]}):
+        fig, ax = plt.subplots(figsize=options["figsize"])
+        try:
+            wedges, texts, autotexts = ax.pie(
+                data,
+                labels=MACRO_LABELS,
+                colors=MACRO_COLORS,
+                explode=options["explode"],
+                autopct="%1.1f%%",
+                startangle=90,
+                textprops=options["textprops"],
+            )
+
+            if options["autotext_color"] is not None:
+                for autotext in autotexts:
+                    autotext.set_color(options["autotext_color"])
+                    autotext.set_fontweight("bold")
+
+            if options["title"] is not None:
+                ax.set_title(options["title"], fontsize=12, pad=20)
+
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", bbox_inches="tight")
+            return buffer.getvalue()
+        finally:
+            # Never leave the figure in the pyplot registry
+            plt.close(fig)
+
+
+def clear_chart_cache():
+    _render_macro_pie_svg.cache_clear()
+    _render_macro_pie_png.cache_clear()
+
+
+def chart_cache_info():
+    return {
+        "svg": _render_macro_pie_svg.cache_info(),
+        "matplotlib": _render_macro_pie_png.cache_info(),
+    }
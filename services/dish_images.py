@@ -0,0 +1,42 @@
+from services.catalog import get_engine, shared_catalog
+
+# Dish images are read here rather than in catalog.py, so the memory guard
+# charges their bytes to "images" and not to "db"
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+
+def iter_dish_image(dish_id, chunk_size=IMAGE_CHUNK_SIZE):
+    """
+    Stream the Image blob of a dish in chunks using SQLite incremental BLOB I/O.
+    Yields nothing when the dish has no stored image.
+    """
+    raw_conn = get_engine().raw_connection()
+    try:
+        sqlite_conn = raw_conn.driver_connection
+        result = sqlite_conn.execute(
+            "SELECT rowid, length(Image) FROM Dish WHERE Id = ?", (dish_id,)
+        ).fetchone()
+        if result is None or not result[1]:
+            return
+
+        with sqlite_conn.blobopen("Dish", "Image", result[0], readonly=True) as blob:
+            while True:
+                chunk = blob.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        raw_conn.close()
+
+
+def load_dish_image(dish_id):
+    """
+    Read the whole Image blob of a dish, or None if there is none
+    """
+    shared = shared_catalog()
+    if shared is not None and shared.has_images:
+        result = shared.lookup("Dish", dish_id, ("Image",))
+        return None if result is None or not result[0] else result[0]
+
+    image = b"".join(iter_dish_image(dish_id))
+    return image if len(image) > 0 else None
@@ -0,0 +1,111 @@
+import re
+import urllib.request
+from functools import lru_cache
+from pathlib import Path
+
+from models.fit import Exercise
+from services import rendering
+from services.catalog import database_stamp, get_engine, shared_catalog
+
+# Poster frames of the exercise videos, fetched once by fetch_posters.py so
+# the page never has to reach the video host before the user presses play
+LOCAL_POSTER_DIR = Path("images/exercises")
+POSTER_SOURCE_URL = "https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
+
+_VIDEO_ID_PATTERN = re.compile(r"(?:embed/|watch\?v=|youtu\.be/)([\w-]{11})")
+
+
+def youtube_video_id(link):
+    """
+    The video id of a YouTube embed or watch link, or None for anything else
+    """
+    match = _VIDEO_ID_PATTERN.search(link or "")
+    return None if match is None else match.group(1)
+
+
+def autoplay_link(link):
+    separator = "&" if "?" in link else "?"
+    return f"{link}{separator}autoplay=1"
+
+
+def render_exercise_page(exercise):
+    """
+    Everything the Exercise Browser shows for one exercise, with the text
+    escaped once here rather than on every selection
+    """
+    return {
+        "id": exercise.id,
+        "name": exercise.name,
+        "link": exercise.link,
+        "title_html": f'<h2 style="text-align: center">{rendering.escape(exercise.name)}</h2>',
+        "body_html": rendering.heading("I. Overview", level=3)
+        + rendering.paragraphs(
+            exercise.get_overview_paragraph(), style="padding-left: 22px"
+        )
+        + rendering.heading("II. Instructions", level=3)
+        + rendering.ordered_list(
+            exercise.get_introductions_detail(), style="padding-left: 22px"
+        ),
+    }
+
+
+@lru_cache(maxsize=2)
+def _load_exercise_pages(stamp):
+    shared = shared_catalog()
+    if shared is not None:
+        rows = shared.rows("Exercise")
+    else:
+        with get_engine().connect() as conn:
+            rows = conn.execute("SELECT * FROM Exercise").fetchall()
+    return {row[0]: render_exercise_page(Exercise(*row)) for row in rows}
+
+
+def get_exercise_page(exercise_id):
+    """
+    The rendered page of an exercise, or None if it does not exist. Every
+    exercise is rendered on first use and again only when the database changes.
+    """
+    return _load_exercise_pages(database_stamp()).get(exercise_id)
+
+
+def local_poster_path(exercise_id):
+    return LOCAL_POSTER_DIR / f"{exercise_id}.jpg"
+
+
+def load_local_poster(exercise_id):
+    path = local_poster_path(exercise_id)
+    if not path.exists():
+        return None
+    return path.read_bytes()
+
+
+def fetch_exercise_posters(force=False, timeout=10):
+    """
+    Download the poster of every exercise video into LOCAL_POSTER_DIR.
+    Returns {exercise id: "fetched", "cached", "no video" or an error}.
+    """
+    LOCAL_POSTER_DIR.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for exercise_id, page in sorted(_load_exercise_pages(database_stamp()).items()):
+        path = local_poster_path(exercise_id)
+        video_id = youtube_video_id(page["link"])
+        if video_id is None:
+            results[exercise_id] = "no video"
+            continue
+        if path.exists() and not force:
+            results[exercise_id] = "cached"
+            continue
+        try:
+            with urllib.request.urlopen(
+                POSTER_SOURCE_URL.format(video_id=video_id), timeout=timeout
+            ) as response:
+                data = response.read()
+        except OSError as e:
+            results[exercise_id] = f"failed: {e}"
+            continue
+        # Written next to the target first, so a reader never sees half a file
+        temporary = path.with_suffix(".tmp")
+        temporary.write_bytes(data)
+        temporary.replace(path)
+        results[exercise_id] = "fetched"
+    return results
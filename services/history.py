@@ -0,0 +1,242 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# A file of its own: writing to the catalog database would change its stamp
+# and throw away every cache derived from it
+HISTORY_DATABASE_PATH = os.environ.get("HISTORY_DATABASE", "database/history.db")
+# Appends are buffered and written in one transaction once this many are
+# pending, or by a timer HISTORY_FLUSH_SECONDS after the first of a batch
+HISTORY_BATCH_SIZE = 64
+HISTORY_FLUSH_SECONDS = 2.0
+# Points sent to a chart, however long the history is
+HISTORY_CHART_POINTS = 200
+# PBKDF2 rounds of member_key: slow enough that keys cannot be guessed from
+# common names and passphrases, paid once per submit
+HISTORY_KEY_ITERATIONS = 200_000
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS Measurement (
+        -- member_key() of the member, never their name
+        Member TEXT NOT NULL,
+        Time REAL NOT NULL,
+        Height REAL NOT NULL,
+        Weight REAL NOT NULL,
+        Sex INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS MeasurementByMemberTime ON Measurement (Member, Time)",
+    # Append-only: rows are never rewritten or removed
+    """
+    CREATE TRIGGER IF NOT EXISTS MeasurementNoUpdate BEFORE UPDATE ON Measurement
+    BEGIN SELECT RAISE(ABORT, 'Measurement is append-only'); END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS MeasurementNoDelete BEFORE DELETE ON Measurement
+    BEGIN SELECT RAISE(ABORT, 'Measurement is append-only'); END
+    """,
+)
+
+
+def member_key(name, passphrase):
+    """
+    The key a member's measurements are stored under, derived from their name
+    and a passphrase only they know: a name alone does not open a history
+    """
+    salt = f"history:{name.strip().casefold()}".encode("utf-8")
+    return hashlib.pbkdf2_hmac(
+        "sha256", passphrase.encode("utf-8"), salt, HISTORY_KEY_ITERATIONS
+    ).hex()
+
+
+class MeasurementSeries(namedtuple("MeasurementSeries", "times heights weights sexes")):
+    """
+    A member's measurements as parallel numpy arrays, oldest first. Times are
+    Unix timestamps in seconds.
+    """
+
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.times)
+
+    def bmi(self):
+        return self.weights / (self.heights / 100) ** 2
+
+    def body_categories(self):
+        """
+        The fuzzy body category of every measurement, in one batch
+        """
+        from algorithm.fuzzy_logic import classify_bodies
+
+        return classify_bodies(self.heights, self.weights, self.sexes)
+
+
+def rolling_average(times, values, window_seconds):
+    """
+    Mean of the values within the trailing `window_seconds` of each point,
+    for sorted times, in O(n) with a cumulative sum
+    """
+    import numpy as np
+
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    starts = np.searchsorted(times, times - window_seconds, side="left")
+    ends = np.arange(1, len(values) + 1)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def downsample(times, values, points=HISTORY_CHART_POINTS):
+    """
+    (times, values) averaged into at most `points` equal time buckets, empty
+    buckets dropped, for a chart that stays light however long the history
+    """
+    import numpy as np
+
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(times) <= points:
+        return times, values
+    edges = np.linspace(times[0], times[-1], points + 1)
+    buckets = np.clip(np.searchsorted(edges, times, side="right") - 1, 0, points - 1)
+    counts = np.bincount(buckets, minlength=points)
+    filled = counts > 0
+    mean_times = np.bincount(buckets, weights=times, minlength=points)[filled]
+    mean_values = np.bincount(buckets, weights=values, minlength=points)[filled]
+    return mean_times / counts[filled], mean_values / counts[filled]
+
+
+class HistoryStore():
+    """
+    Append-only body measurements per member key (see member_key), in a
+    SQLite file in WAL mode so readers in other processes never wait for the
+    writer. Appends are batched; one connection is shared by every thread.
+    """
+
+    def __init__(
+        self,
+        path=HISTORY_DATABASE_PATH,
+        batch_size=HISTORY_BATCH_SIZE,
+        flush_seconds=HISTORY_FLUSH_SECONDS,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        # Guards the queue; _conn_lock guards the connection
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+        self._conn_lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        # Called with _conn_lock held
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Safe with WAL: a crash loses at most the last commits, never the file
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def append(self, member, height, weight, sex, at=None):
+        """
+        Queue one measurement; it is written with the next batch
+        """
+        row = (
+            str(member),
+            time.time() if at is None else float(at),
+            float(height),
+            float(weight),
+            int(sex),
+        )
+        with self._lock:
+            self._pending.append(row)
+            due = len(self._pending) >= self.batch_size
+            if not due and self._timer is None:
+                # A lone measurement is written within flush_seconds too
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Write every queued measurement in one transaction
+        """
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not rows:
+            return 0
+        with self._conn_lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO Measurement (Member, Time, Height, Weight, Sex) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        return len(rows)
+
+    def series(self, member, start=None, end=None):
+        """
+        The MeasurementSeries of a member between start and end (inclusive
+        Unix times, None for open), through the (Member, Time) index
+        """
+        import numpy as np
+
+        member = str(member)
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        with self._conn_lock:
+            rows = self._connect().execute(
+                "SELECT Time, Height, Weight, Sex FROM Measurement "
+                "WHERE Member = ? AND Time >= ? AND Time <= ? ORDER BY Time",
+                (member, start, end),
+            ).fetchall()
+        # Queued measurements are merged in rather than flushed, so a member
+        # sees their own log and the batch still fills up
+        with self._lock:
+            queued = [
+                row[1:]
+                for row in self._pending
+                if row[0] == member and start <= row[1] <= end
+            ]
+        if queued:
+            rows = sorted(rows + queued, key=lambda row: row[0])
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        return MeasurementSeries(
+            columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3].astype(np.int64)
+        )
+
+    def members(self):
+        """
+        Every member key with a measurement, written or queued
+        """
+        with self._conn_lock:
+            stored = {
+                row[0]
+                for row in self._connect().execute("SELECT DISTINCT Member FROM Measurement")
+            }
+        with self._lock:
+            stored.update(row[0] for row in self._pending)
+        return sorted(stored)
+
+
+history_store = HistoryStore()
+# Queued measurements are not lost when the server stops
+atexit.register(history_store.flush)
@@ -0,0 +1,379 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from services.catalog import database_stamp
+from services.dish_images import load_dish_image
+from services.exercise_pages import load_local_poster
+from services.metrics import registry
+
+# Loopback only by default; set IMAGE_SERVER_HOST=0.0.0.0 to serve the network
+IMAGE_SERVER_HOST = os.environ.get("IMAGE_SERVER_HOST", "127.0.0.1")
+IMAGE_SERVER_PORT = int(os.environ.get("IMAGE_SERVER_PORT", "8600"))
+# URL prefix the browser uses to reach the server, e.g. a reverse-proxy route
+# on the app's own origin. Unset, no URL is handed out and pages send the image
+# bytes through Streamlit: a localhost URL would point at the visitor's machine.
+IMAGE_SERVER_URL = os.environ.get("IMAGE_SERVER_URL", "").rstrip("/")
+
+IMAGE_ROUTE = "/dish-images/"
+# Process-wide rerun timings, for a Prometheus scraper or a quick look.
+# Only served with IMAGE_SERVER_METRICS=1: they describe the whole app.
+METRICS_ENABLED = os.environ.get("IMAGE_SERVER_METRICS") == "1"
+METRICS_ROUTES = {
+    "/metrics": (registry.to_prometheus, "text/plain; version=0.0.4"),
+    "/metrics.json": (registry.to_json, "application/json"),
+}
+IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+LOCAL_IMAGE_DIR = Path("images/dishes")
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def load_local_image(dish_id):
+    """
+    Try to load image from local file system
+    """
+    try:
+        # Possible image paths and formats
+        image_paths = [
+            LOCAL_IMAGE_DIR / f"{dish_id.zfill(2)}.jpg",
+            LOCAL_IMAGE_DIR / f"{dish_id}.jpg",
+            LOCAL_IMAGE_DIR / f"{dish_id.zfill(2)}.png",
+            LOCAL_IMAGE_DIR / f"{dish_id}.png",
+            LOCAL_IMAGE_DIR / f"{dish_id.zfill(2)}.jpeg",
+            LOCAL_IMAGE_DIR / f"{dish_id}.jpeg",
+        ]
+
+        for image_path in image_paths:
+            if image_path.exists():
+                with open(image_path, "rb") as img_file:
+                    return img_file.read()
+
+        return None
+
+    except Exception as e:
+        print(f"Error loading local image for dish {dish_id}: {e}")
+        return None
+
+
+def get_dish_image_data(dish):
+    """
+    Return the image bytes of a dish, from the database first and the local files second
+    """
+    return _resolve_image_data(dish.image, dish.id)
+
+
+def load_dish_image_data(dish_id):
+    """
+    Same as get_dish_image_data(), but without keeping a Dish object alive
+    """
+    return _resolve_image_data(load_dish_image(dish_id), dish_id)
+
+
+def _resolve_image_data(image_data, dish_id):
+    if image_data is None or (isinstance(image_data, bytes) and len(image_data) == 0):
+        image_data = load_local_image(dish_id)
+
+    if image_data is None or len(image_data) == 0:
+        return None
+    return image_data
+
+
+def guess_content_type(data):
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data.startswith(b"RIFF") and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class ImageStore():
+    """
+    Content-addressed image registry. Bytes are kept in a bounded LRU cache and
+    re-read through the registered loader when they have been evicted.
+    """
+
+    def __init__(self, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._lock = threading.Lock()
+        self._loaders = {}
+        self._hash_by_key = {}
+        self._cache = OrderedDict()
+
+    def register(self, key, loader):
+        """
+        Register an image under a stable key (e.g. the dish id) and return its
+        content hash, or None when the loader has no image
+        """
+        with self._lock:
+            if key in self._hash_by_key:
+                return self._hash_by_key[key]
+
+        data = loader()
+        if data is None:
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._hash_by_key[key] = digest
+            self._loaders[digest] = loader
+            self._put(digest, data)
+        return digest
+
+    def has(self, digest):
+        with self._lock:
+            return digest in self._loaders
+
+    def get(self, digest):
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+            loader = self._loaders.get(digest)
+
+        if loader is None:
+            return None
+
+        data = loader()
+        if data is None or hashlib.sha256(data).hexdigest() != digest:
+            # The source changed since it was registered, so the old URL is
+            # gone; the next register() of its key reads the new bytes
+            self._forget(digest)
+            return None
+        with self._lock:
+            self._put(digest, data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.current_bytes = 0
+
+    def invalidate(self):
+        """
+        Forget every registration, e.g. after the catalog has been reloaded
+        """
+        with self._lock:
+            self._cache.clear()
+            self._loaders.clear()
+            self._hash_by_key.clear()
+            self.current_bytes = 0
+
+    def _forget(self, digest):
+        with self._lock:
+            self._loaders.pop(digest, None)
+            for key in [key for key, value in self._hash_by_key.items() if value == digest]:
+                del self._hash_by_key[key]
+
+    def _put(self, digest, data):
+        if digest in self._cache:
+            self._cache.move_to_end(digest)
+            return
+        if len(data) > self.max_bytes:
+            return
+        self._cache[digest] = data
+        self.current_bytes += len(data)
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self.current_bytes -= len(evicted)
+
+
+image_store = ImageStore()
+
+
+class ImageRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves images by content hash. Since the URL changes whenever the content
+    does, responses are immutable and the hash doubles as a strong ETag.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_metrics(self, path, send_body):
+        export, content_type = METRICS_ROUTES[path]
+        body = export().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _serve(self, send_body):
+        path = self.path.split("?", 1)[0]
+        if METRICS_ENABLED and path in METRICS_ROUTES:
+            self._send_metrics(path, send_body)
+            return
+
+        if not path.startswith(IMAGE_ROUTE):
+            self._send_empty(404)
+            return
+
+        digest = path[len(IMAGE_ROUTE) :]
+        if not image_store.has(digest):
+            self._send_empty(404)
+            return
+
+        # Revalidation never needs the bytes themselves
+        etag = f'"{digest}"'
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None and (
+            if_none_match.strip() == "*"
+            or etag in [tag.strip() for tag in if_none_match.split(",")]
+        ):
+            self.send_response(304)
+            self._send_cache_headers(etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        data = image_store.get(digest)
+        if data is None:
+            self._send_empty(404)
+            return
+
+        total = len(data)
+        start, end = 0, total - 1
+        status = 200
+
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header is not None and (if_range is None or if_range.strip() == etag):
+            byte_range = self._parse_range(range_header, total)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{total}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = byte_range
+            status = 206
+
+        self.send_response(status)
+        self._send_cache_headers(etag)
+        self.send_header("Content-Type", guess_content_type(data))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        if send_body:
+            self.wfile.write(data[start : end + 1])
+
+    def _send_cache_headers(self, etag):
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+
+    def _send_empty(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    @staticmethod
+    def _parse_range(range_header, total):
+        # Only single ranges are supported, which is all an <img> tag ever asks for
+        match = _RANGE_PATTERN.match(range_header.strip())
+        if match is None or total == 0:
+            return None
+
+        first, last = match.groups()
+        if first == "" and last == "":
+            return None
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                return None
+            return max(total - length, 0), total - 1
+
+        start = int(first)
+        end = total - 1 if last == "" else min(int(last), total - 1)
+        if start >= total or start > end:
+            return None
+        return start, end
+
+
+_server = None
+# Set once binding has failed, e.g. when another worker holds the port
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+def start_image_server():
+    """
+    Start the image server in a daemon thread, once per process.
+    Returns False when it cannot be started (e.g. the port is taken); the
+    bind is not tried again in this process.
+    """
+    global _server, _server_failed
+    if _server_failed:
+        return False
+    with _server_lock:
+        if _server is not None:
+            return True
+        if _server_failed:
+            return False
+        try:
+            _server = ThreadingHTTPServer(
+                (IMAGE_SERVER_HOST, IMAGE_SERVER_PORT), ImageRequestHandler
+            )
+        except OSError as e:
+            _server_failed = True
+            print(f"Image server could not start on port {IMAGE_SERVER_PORT}: {e}")
+            return False
+
+        _server.daemon_threads = True
+        threading.Thread(
+            target=_server.serve_forever, name="image-server", daemon=True
+        ).start()
+        return True
+
+
+def _image_url(key, loader):
+    # Only with a configured URL, and only once the server is up
+    if not IMAGE_SERVER_URL or not start_image_server():
+        return None
+
+    digest = image_store.register(key, loader)
+    if digest is None:
+        return None
+    return f"{IMAGE_SERVER_URL}{IMAGE_ROUTE}{digest}"
+
+
+def dish_image_url(dish):
+    """
+    Return a cacheable URL for the image of a dish, or None if it has no image
+    or the image server is not configured or not running
+    """
+    return _image_url(
+        f"dish:{dish.id}:{database_stamp()}", partial(load_dish_image_data, dish.id)
+    )
+
+
+def exercise_poster_url(exercise_id):
+    """
+    Return a cacheable URL for the locally cached video poster of an exercise,
+    or None if it has none or the image server is not configured or not running
+    """
+    return _image_url(f"exercise:{exercise_id}", partial(load_local_poster, exercise_id))
@@ -0,0 +1,278 @@
+import gc
+import os
+import resource
+import threading
+import time
+import tracemalloc
+
+from services.metrics import registry
+
+# Opt-in: tracing every allocation costs CPU and memory of its own
+MEMORY_GUARD_ENABLED = os.environ.get("MEMORY_GUARD") == "1"
+MEMORY_GUARD_INTERVAL = float(os.environ.get("MEMORY_GUARD_INTERVAL", "30"))
+# Whole-process RSS budget in MB, 0 for none
+MEMORY_BUDGET_MB = float(os.environ.get("MEMORY_BUDGET_MB", "0"))
+# Per-subsystem budgets in MB of traced allocations, e.g. "charts=16,images=64"
+MEMORY_BUDGETS = os.environ.get("MEMORY_BUDGETS", "")
+# RSS seldom shrinks right after caches are freed, so a subsystem cleared for
+# the RSS budget is left alone for this many seconds
+MEMORY_EVICTION_COOLDOWN = float(os.environ.get("MEMORY_EVICTION_COOLDOWN", "300"))
+
+TRACEMALLOC_FRAMES = 16
+TOP_GROWTH_SITES = 10
+EVICTION_COUNTER = "dietexercise_memory_evictions_total"
+
+# Allocations are charged to the innermost frame that matches one of these
+# path fragments; anything else (Streamlit, the interpreter) is "other".
+# A subsystem of PRIORITY_SUBSYSTEMS anywhere in the traceback wins, e.g.
+# image bytes read through the shared catalog are "images", not "db".
+SUBSYSTEMS = {
+    "charts": ("services/charts.py", "/matplotlib/"),
+    "images": ("services/image_server.py", "services/dish_images.py", "/PIL/"),
+    "db": (
+        "services/catalog.py",
+        "services/shared_catalog.py",
+        "services/recommendation.py",
+        "services/query_log.py",
+        "/sqlalchemy/",
+        "/sqlite3/",
+    ),
+    "models": ("/models/", "/algorithm/"),
+    "pages": (
+        "services/recommendation_pages.py",
+        "services/exercise_pages.py",
+        "services/rendering.py",
+    ),
+}
+PRIORITY_SUBSYSTEMS = ("images",)
+
+
+def current_rss_bytes():
+    """
+    Resident set size of this process, falling back to the peak RSS where
+    /proc is not available
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def parse_budgets(text):
+    budgets = {}
+    for item in text.split(","):
+        if "=" not in item:
+            continue
+        name, megabytes = item.split("=", 1)
+        budgets[name.strip()] = float(megabytes)
+    return budgets
+
+
+def _evict_charts():
+    from services.charts import clear_chart_cache
+
+    clear_chart_cache()
+
+
+def _evict_images():
+    from services.image_server import image_store
+
+    # Registrations are kept, so image URLs stay valid and reload on demand
+    image_store.clear()
+
+
+def _evict_db():
+    from services.catalog import invalidate_name_indexes, invalidate_nutrition_matrices
+    from services.recommendation import recommendation_service
+
+    invalidate_name_indexes()
+    invalidate_nutrition_matrices()
+    recommendation_service.invalidate()
+
+
+def _evict_models():
+    from algorithm.fuzzy_logic import classify_body
+
+    classify_body.cache_clear()
+
+
+def _evict_pages():
+    from services.exercise_pages import _load_exercise_pages
+    from services.recommendation_pages import (
+        _load_ingredient_table,
+        _load_meal_swapper,
+        _read_artifact,
+    )
+
+    _read_artifact.cache_clear()
+    _load_meal_swapper.cache_clear()
+    _load_ingredient_table.cache_clear()
+    _load_exercise_pages.cache_clear()
+
+
+EVICTORS = {
+    "charts": _evict_charts,
+    "images": _evict_images,
+    "db": _evict_db,
+    "models": _evict_models,
+    "pages": _evict_pages,
+}
+
+
+def _subsystem_of(traceback):
+    filenames = [frame.filename.replace(os.sep, "/") for frame in traceback]
+    for subsystem in PRIORITY_SUBSYSTEMS:
+        fragments = SUBSYSTEMS[subsystem]
+        if any(fragment in filename for filename in filenames for fragment in fragments):
+            return subsystem
+    for frame in reversed(traceback):
+        filename = frame.filename.replace(os.sep, "/")
+        for subsystem, fragments in SUBSYSTEMS.items():
+            if any(fragment in filename for fragment in fragments):
+                return subsystem
+    return "other"
+
+
+class MemoryGuard():
+    """
+    Samples RSS and traced allocations on a background thread, charges the
+    allocations to subsystems, and clears a subsystem's caches when it goes
+    over its budget, or the largest ones when the process goes over its own
+    """
+
+    def __init__(
+        self,
+        interval=MEMORY_GUARD_INTERVAL,
+        budget_mb=MEMORY_BUDGET_MB,
+        budgets_mb=None,
+        cooldown=MEMORY_EVICTION_COOLDOWN,
+    ):
+        self.interval = interval
+        self.budget_mb = budget_mb
+        self.cooldown = cooldown
+        self.budgets_mb = parse_budgets(MEMORY_BUDGETS) if budgets_mb is None else budgets_mb
+        self.evictions = {}
+        # subsystem -> monotonic time of its last eviction for the RSS budget
+        self._evicted_at = {}
+        self._baseline = None
+        self._last_report = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._baseline = self._snapshot()
+            self._thread = threading.Thread(
+                target=self._run, name="memory-guard", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Memory guard sample failed: {e}")
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            )
+        )
+
+    def sample(self):
+        """
+        Take a snapshot, enforce the budgets and return the report
+        """
+        snapshot = self._snapshot()
+        usage = {subsystem: 0 for subsystem in list(SUBSYSTEMS) + ["other"]}
+        for statistic in snapshot.statistics("traceback"):
+            usage[_subsystem_of(statistic.traceback)] += statistic.size
+
+        growth = []
+        if self._baseline is not None:
+            for statistic in snapshot.compare_to(self._baseline, "lineno")[
+                :TOP_GROWTH_SITES
+            ]:
+                frame = statistic.traceback[0]
+                growth.append(
+                    {
+                        "site": f"{frame.filename}:{frame.lineno}",
+                        "size_diff_kb": statistic.size_diff / 1024,
+                        "count_diff": statistic.count_diff,
+                    }
+                )
+
+        rss = current_rss_bytes()
+        evicted = self.enforce(usage, rss)
+
+        report = {
+            "time": time.time(),
+            "rss_mb": rss / 2**20,
+            "traced_mb": {name: size / 2**20 for name, size in usage.items()},
+            "top_growth": growth,
+            "evicted": evicted,
+            "evictions": dict(self.evictions),
+        }
+        with self._lock:
+            self._last_report = report
+        return report
+
+    def enforce(self, usage, rss):
+        """
+        One round per sample: clear the caches of every subsystem over its
+        budget, then, if the process is over its RSS budget, of the largest
+        subsystem not cleared for it within the cooldown
+        """
+        over = [
+            subsystem
+            for subsystem, budget in self.budgets_mb.items()
+            if subsystem in EVICTORS and usage.get(subsystem, 0) > budget * 2**20
+        ]
+        if self.budget_mb > 0 and rss > self.budget_mb * 2**20:
+            now = time.monotonic()
+            cooled = [
+                subsystem
+                for subsystem in EVICTORS
+                if subsystem not in over
+                and usage.get(subsystem, 0) > 0
+                and now - self._evicted_at.get(subsystem, float("-inf")) >= self.cooldown
+            ]
+            if cooled:
+                largest = max(cooled, key=lambda subsystem: usage[subsystem])
+                self._evicted_at[largest] = now
+                over.append(largest)
+
+        for subsystem in over:
+            EVICTORS[subsystem]()
+            self.evictions[subsystem] = self.evictions.get(subsystem, 0) + 1
+            registry.increment(EVICTION_COUNTER, {"subsystem": subsystem})
+        if over:
+            gc.collect()
+        return over
+
+    def report(self):
+        with self._lock:
+            return self._last_report
+
+
+memory_guard = MemoryGuard()
+
+
+def start_memory_guard():
+    """
+    Start the watchdog when MEMORY_GUARD=1; returns whether it is running
+    """
+    if not MEMORY_GUARD_ENABLED:
+        return False
+    memory_guard.start()
+    return True
@@ -0,0 +1,202 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Stages every page reports, in the order they happen during a rerun
+STAGES = ("fuzzy", "sql", "parse", "chart", "emit")
+
+# Upper bounds in seconds, Prometheus style (the +Inf bucket is implicit)
+HISTOGRAM_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+METRIC_NAME = "dietexercise_stage_seconds"
+
+
+class Histogram():
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def cumulative_counts(self):
+        counts = []
+        running = 0
+        for bucket_count in self.bucket_counts:
+            running += bucket_count
+            counts.append(running)
+        return counts
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(self.buckets, self.cumulative_counts())),
+        }
+
+
+class MetricsRegistry():
+    """
+    Process-wide latency histograms per (page, stage), shared by all sessions
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, page, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get((page, stage))
+            if histogram is None:
+                histogram = self._histograms[(page, stage)] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, labels, amount=1):
+        """
+        Add to the counter `name` with the given {label: value} pairs
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counters(self):
+        """
+        {(name, ((label, value), ...)): count} of every counter
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {
+                f"{page}/{stage}": histogram.to_dict()
+                for (page, stage), histogram in sorted(self._histograms.items())
+            }
+            for (name, labels), value in sorted(self._counters.items()):
+                label_text = ",".join(f"{label}={text}" for label, text in labels)
+                snapshot[f"{name}{{{label_text}}}"] = value
+            return snapshot
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent per page and stage of a rerun.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for (page, stage), histogram in items:
+                labels = f'page="{page}",stage="{stage}"'
+                for bound, count in zip(
+                    histogram.buckets, histogram.cumulative_counts()
+                ):
+                    lines.append(
+                        f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f"{METRIC_NAME}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{METRIC_NAME}_count{{{labels}}} {histogram.count}")
+
+            counter_names = sorted({name for name, _ in self._counters})
+            for name in counter_names:
+                lines.append(f"# TYPE {name} counter")
+                for (counter_name, labels), value in sorted(self._counters.items()):
+                    if counter_name != name:
+                        continue
+                    label_text = ",".join(f'{label}="{text}"' for label, text in labels)
+                    lines.append(f"{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RerunTimer():
+    """
+    Collects the spans of one script rerun and feeds them to the registry
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def record(self, stage, seconds):
+        self.spans.append((stage, seconds))
+        registry.observe(self.page, stage, seconds)
+
+    def breakdown(self):
+        totals = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+_current_timer = contextvars.ContextVar("rerun_timer", default=None)
+
+
+def start_rerun(page):
+    """
+    Start timing a rerun of `page`; spans opened afterwards on this thread
+    are attributed to it
+    """
+    timer = RerunTimer(page)
+    _current_timer.set(timer)
+    return timer
+
+
+def current_timer():
+    return _current_timer.get()
+
+
+@contextmanager
+def span(stage):
+    """
+    Time a block as one stage of the current rerun. Outside of a rerun the
+    time still goes to the process-wide histograms, under page "-".
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.record(stage, seconds)
+        else:
+            registry.observe("-", stage, seconds)
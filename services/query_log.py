@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+
+from services.metrics import current_timer, registry
+
+# Statements slower than this are printed with their parameters and plan
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "50"))
+SLOW_QUERY_HISTORY_SIZE = 100
+
+STATEMENT_COUNTER = "dietexercise_sql_statements_total"
+SECONDS_COUNTER = "dietexercise_sql_seconds_total"
+
+# "IN (:id0, :id1, ...)" lists grow with the number of ids, but are one
+# statement, whether they hold one id or many
+_PLACEHOLDER = r"(?:\?|:\w+)"
+_PLACEHOLDER_LIST = re.compile(
+    rf"\bIN\s*\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)", re.IGNORECASE
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement):
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _PLACEHOLDER_LIST.sub("IN (...)", statement)
+
+
+class StatementStats():
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class QueryLog():
+    """
+    Times every statement run through an engine, aggregates count and latency
+    per (page, statement) and keeps the slow ones with their query plans
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._slow = deque(maxlen=SLOW_QUERY_HISTORY_SIZE)
+
+    def install(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        timer = current_timer()
+        page = "-" if timer is None else timer.page
+        normalized = normalize_statement(statement)
+
+        with self._lock:
+            stats = self._stats.get((page, normalized))
+            if stats is None:
+                stats = self._stats[(page, normalized)] = StatementStats()
+            stats.add(seconds)
+        registry.increment(STATEMENT_COUNTER, {"page": page})
+        registry.increment(SECONDS_COUNTER, {"page": page}, seconds)
+
+        if seconds * 1000 >= self.slow_query_ms:
+            plan = None if executemany else self._explain(conn, statement, parameters)
+            entry = {
+                "page": page,
+                "ms": seconds * 1000,
+                "statement": normalized,
+                "parameters": parameters,
+                "plan": plan,
+            }
+            with self._lock:
+                self._slow.append(entry)
+            print(format_slow_query(entry))
+
+    def _explain(self, conn, statement, parameters):
+        # A separate DBAPI cursor, so the rows of the timed statement are left
+        # untouched and the EXPLAIN does not go through these hooks again
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            cursor.close()
+
+    def stats(self, page=None):
+        """
+        {(page, statement): {count, total_ms, mean_ms, max_ms}}, for one page
+        or all of them, slowest in total first
+        """
+        with self._lock:
+            items = [
+                (key, stats.to_dict())
+                for key, stats in self._stats.items()
+                if page is None or key[0] == page
+            ]
+        return dict(sorted(items, key=lambda item: item[1]["total_ms"], reverse=True))
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self._slow)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+
+
+def format_slow_query(entry):
+    lines = [
+        f"Slow query ({entry['ms']:.1f} ms on {entry['page']}): {entry['statement']}",
+        f"  parameters: {entry['parameters']}",
+    ]
+    for step in entry["plan"] or []:
+        lines.append(f"  plan: {step}")
+    return "\n".join(lines)
+
+
+query_log = QueryLog()
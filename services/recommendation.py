@@ -0,0 +1,250 @@
+import threading
+from collections import namedtuple
+
+from models.eat import Diet, NutritionDetail
+from services.catalog import database_stamp, get_engine
+from services.metrics import span
+from services.render_pool import get_executor, submit
+from services.singleflight import SingleFlight
+
+# In the order of PROFILE_QUERY's columns and of the tabs on the main page
+DIET_KINDS = ("low_carb", "moderate_carb", "high_carb")
+
+# Standard calories, the three diets and cardio for a profile in a single row
+PROFILE_QUERY = """
+    SELECT sc.LowCarb, sc.ModerateCarb, sc.HighCarb,
+           lc.Calories, lc.Nutrition, lc.Breakfast, lc.Lunch, lc.Dinner,
+           mc.Calories, mc.Nutrition, mc.Breakfast, mc.Lunch, mc.Dinner,
+           hc.Calories, hc.Nutrition, hc.Breakfast, hc.Lunch, hc.Dinner,
+           c.Sessions, c.Time
+    FROM StandardCalories sc
+    LEFT JOIN LowCarb lc ON lc.Calories = sc.LowCarb
+    LEFT JOIN ModerateCarb mc ON mc.Calories = sc.ModerateCarb
+    LEFT JOIN HighCarb hc ON hc.Calories = sc.HighCarb
+    LEFT JOIN Cardio c ON c.Stage = sc.Stage AND c.Body = sc.Body AND c.Sex = sc.Sex
+    WHERE sc.Stage = :stage AND sc.Body = :body AND sc.Sex = :sex
+"""
+
+GYM_QUERY = """
+    SELECT g.Day, g.Exercise, COALESCE(e.Name, g.Exercise), g.Sets, g.Reps
+    FROM Gym g
+    LEFT JOIN Exercise e ON e.Id = g.Exercise
+    ORDER BY g.rowid
+"""
+
+
+class PlannedDish(namedtuple("PlannedDish", "id name amount nutrition")):
+    __slots__ = ()
+
+
+class MealPlan(namedtuple("MealPlan", "name calories dishes")):
+    __slots__ = ()
+
+
+class DietPlan(namedtuple("DietPlan", "kind calories nutrition meals")):
+    """
+    One of the three diets of a plan. `nutrition` is the raw
+    'cal;carbs;fat;protein' string, or None when the diet row is missing.
+    """
+
+    __slots__ = ()
+
+    @property
+    def found(self):
+        return self.nutrition is not None
+
+    def get_nutrition_detail(self):
+        tmp = self.nutrition.split(";")
+        return NutritionDetail(
+            float(tmp[0]), float(tmp[1]), float(tmp[2]), float(tmp[3])
+        )
+
+
+class GymEntry(namedtuple("GymEntry", "day exercise_id exercise sets reps")):
+    __slots__ = ()
+
+
+class CardioPlan(namedtuple("CardioPlan", "sessions time")):
+    __slots__ = ()
+
+
+class RecommendationPlan(
+    namedtuple(
+        "RecommendationPlan",
+        "stage body sex has_plan diets cardio gym_lower gym_upper",
+    )
+):
+    """
+    Everything the main page shows for one (stage, body, sex) profile.
+    Immutable, so a single instance can be shared between sessions.
+    """
+
+    __slots__ = ()
+
+    @property
+    def key(self):
+        return (self.stage, self.body, self.sex)
+
+    def progression_program(self):
+        """
+        The gym plan as a ProgressionProgram, to project loads and volume
+        week by week; lower-day exercises first
+        """
+        from algorithm.progression import ProgressionProgram
+
+        return ProgressionProgram.from_gym_entries(self.gym_lower + self.gym_upper)
+
+
+class RecommendationService():
+    """
+    Computes recommendation plans with one connection and three queries, and
+    memoizes them per profile key until invalidate() is called or the
+    database stamp changes. Concurrent misses on the same key share a single
+    load.
+    """
+
+    def __init__(self, engine_factory=get_engine, stamp_factory=database_stamp):
+        self._engine_factory = engine_factory
+        self._stamp_factory = stamp_factory
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._stamp = None
+        self._flight = SingleFlight("plan")
+
+    def compute(self, stage, body, sex):
+        key = (int(stage), int(body), int(sex))
+        stamp = self._stamp_factory()
+        with self._lock:
+            if stamp != self._stamp:
+                # The catalog changed: every memoized plan may be stale
+                self._plans.clear()
+                self._stamp = stamp
+            plan = self._plans.get(key)
+        if plan is not None:
+            return plan
+
+        plan = self._flight.do((*key, stamp), self._load, *key)
+        with self._lock:
+            if stamp != self._stamp:
+                return plan
+            # Keep the first plan stored if an invalidate() let a second load in
+            return self._plans.setdefault(key, plan)
+
+    def invalidate(self, stage=None, body=None, sex=None):
+        """
+        Drop the memoized plan of one profile, or of every profile when called
+        without arguments (e.g. after the catalog has changed)
+        """
+        with self._lock:
+            if stage is None and body is None and sex is None:
+                self._plans.clear()
+            else:
+                self._plans.pop((int(stage), int(body), int(sex)), None)
+
+    def cached_keys(self):
+        with self._lock:
+            return list(self._plans.keys())
+
+    def _load_gym(self):
+        with span("sql"):
+            with self._engine_factory().connect() as conn:
+                return conn.execute(GYM_QUERY).fetchall()
+
+    def _load(self, stage, body, sex):
+        # The gym rows do not depend on the profile, so with a render pool they
+        # are fetched on their own connection while the profile and its dishes
+        # are queried here
+        gym_future = None
+        if body >= 2 and get_executor() is not None:
+            gym_future = submit(self._load_gym)
+
+        with self._engine_factory().connect() as conn:
+            profile = None
+            if body >= 2:
+                with span("sql"):
+                    profile = conn.execute(
+                        PROFILE_QUERY, {"stage": stage, "body": body, "sex": sex}
+                    ).fetchone()
+            if profile is None:
+                return RecommendationPlan(stage, body, sex, False, (), None, (), ())
+
+            diet_rows = []
+            dish_ids = set()
+            with span("parse"):
+                for index, kind in enumerate(DIET_KINDS):
+                    standard_calories = profile[index]
+                    diet_row = profile[3 + index * 5 : 8 + index * 5]
+                    if diet_row[0] is None:
+                        diet_rows.append((kind, standard_calories, None))
+                        continue
+                    diet = Diet(*diet_row)
+                    details = [
+                        ("Breakfast", diet.get_breakfast_detail()),
+                        ("Lunch", diet.get_lunch_detail()),
+                        ("Dinner", diet.get_dinner_detail()),
+                    ]
+                    for _, detail in details:
+                        dish_ids.update((detail.id1, detail.id2))
+                    diet_rows.append((kind, standard_calories, (diet, details)))
+
+            dishes = {}
+            with span("sql"):
+                if dish_ids:
+                    ids = sorted(dish_ids)
+                    placeholders = ", ".join(f":id{i}" for i in range(len(ids)))
+                    for row in conn.execute(
+                        f"SELECT Id, Name, Nutrition FROM Dish WHERE Id IN ({placeholders})",
+                        {f"id{i}": dish_id for i, dish_id in enumerate(ids)},
+                    ).fetchall():
+                        dishes[row[0]] = row
+
+                if gym_future is None:
+                    gym_rows = conn.execute(GYM_QUERY).fetchall()
+
+        if gym_future is not None:
+            gym_rows = gym_future.result()
+
+        with span("parse"):
+            return self._assemble(stage, body, sex, profile, diet_rows, dishes, gym_rows)
+
+    def _assemble(self, stage, body, sex, profile, diet_rows, dishes, gym_rows):
+        diets = []
+        for kind, standard_calories, parsed in diet_rows:
+            if parsed is None:
+                diets.append(DietPlan(kind, standard_calories, None, ()))
+                continue
+            diet, details = parsed
+            meals = []
+            for meal_name, detail in details:
+                planned = []
+                for dish_id, amount in [
+                    (detail.id1, detail.amount1),
+                    (detail.id2, detail.amount2),
+                ]:
+                    # Every planned dish exists: plans are only served once
+                    # check_plan_data has passed (see checked_plan)
+                    row = dishes[dish_id]
+                    planned.append(PlannedDish(dish_id, row[1], amount, row[2]))
+                meals.append(MealPlan(meal_name, detail.calories, tuple(planned)))
+            diets.append(
+                DietPlan(kind, standard_calories, diet.nutrition, tuple(meals))
+            )
+
+        cardio = None
+        if profile[18] is not None:
+            cardio = CardioPlan(profile[18], profile[19])
+
+        gym = [GymEntry(*row) for row in gym_rows]
+        return RecommendationPlan(
+            stage,
+            body,
+            sex,
+            True,
+            tuple(diets),
+            cardio,
+            tuple(entry for entry in gym if entry.day == "lower"),
+            tuple(entry for entry in gym if entry.day == "upper"),
+        )
+
+
+recommendation_service = RecommendationService()
@@ -0,0 +1,518 @@
+import hashlib
+import json
+from functools import lru_cache, partial
+from pathlib import Path
+
+from algorithm.fuzzy_logic import classify_body
+from services import rendering
+from services.catalog import (
+    database_stamp,
+    get_engine,
+    get_name_index,
+    get_nutrition_matrix,
+    get_substitute_index,
+    shared_catalog,
+)
+from services.charts import render_macro_pie
+from services.metrics import span
+from services.recommendation import recommendation_service
+from services.render_pool import render_sections
+from services.singleflight import SingleFlight
+
+# Bump whenever the layout of a rendered page changes, so stale artifacts are ignored
+PAGE_FORMAT_VERSION = 4
+
+BUILD_DIR = Path("database/build/recommendations")
+MANIFEST_NAME = "manifest.json"
+# Meal swap buckets and the parsed recipes, built next to the pages since
+# they change with the catalog
+SWAP_BUCKETS_NAME = "swap-buckets"
+INGREDIENTS_NAME = "ingredients"
+
+# Days per week on each diet, as explained on the main page
+WEEKLY_DIET_DAYS = {"low_carb": 3, "moderate_carb": 3, "high_carb": 1}
+
+STAGES = (0, 1)
+BODIES = (0, 1, 2, 3, 4)
+SEXES = (0, 1)
+
+BODY_NAMES = {2: "overweight", 3: "pre-obese", 4: "obese"}
+
+# Similar dishes listed under each diet, per dish
+SUBSTITUTES_PER_DISH = 3
+
+# Plan kind -> (tab label, plan name, serving text format)
+DIET_TABS = {
+    "low_carb": ("🥗 Low Carb Diet", "Low carb", "Serving: {amount}"),
+    "moderate_carb": ("🍽️ Moderate Carb Diet", "Moderate carb", "{amount} serving"),
+    "high_carb": ("🍕 High Carb Diet", "High carb", "{amount} serving"),
+}
+
+GYM_INTRO_HTML = """
+<h3 style="padding-left: 27px">2. Gym</h3>
+<p style="padding-left: 55px">You will be using an upper/lower workout every week. Rep schemes are merely guidelines.</p>
+<p style="padding-left: 55px">When a weight becomes manageable using the given set and rep schemes, add weight to the bar. For sake of convenience, use the same weight for each of the sets for a given exercise.</p>
+<ul style="padding-left: 100px">
+<li><b>Day 1</b> - Upper</li>
+<li><b>Day 2</b> - Lower</li>
+<li><b>Day 3</b> - <i>Off</i></li>
+<li><b>Day 4</b> - Upper</li>
+<li><b>Day 5</b> - Lower</li>
+<li><b>Day 6</b> - <i>Off</i></li>
+<li><b>Day 7</b> - <i>Off</i></li>
+</ul>
+"""
+
+# Weeks of the gym plan's projected progression shown on the page, assuming
+# one more rep every session
+PROGRESSION_WEEKS = (1, 2, 4, 8, 12)
+
+# Everything a rendered page is derived from. Any change here changes the version.
+CATALOG_QUERIES = [
+    "SELECT * FROM StandardCalories ORDER BY Stage, Body, Sex",
+    "SELECT * FROM LowCarb ORDER BY Calories",
+    "SELECT * FROM ModerateCarb ORDER BY Calories",
+    "SELECT * FROM HighCarb ORDER BY Calories",
+    "SELECT Id, Name, Nutrition, Recipe FROM Dish ORDER BY Id",
+    "SELECT * FROM Cardio ORDER BY Stage, Body, Sex",
+    "SELECT * FROM Gym ORDER BY Day, Exercise",
+    "SELECT Id, Name FROM Exercise ORDER BY Id",
+]
+
+
+def all_profile_keys():
+    return [(stage, body, sex) for stage in STAGES for body in BODIES for sex in SEXES]
+
+
+def profile_key_name(stage, body, sex):
+    return f"{stage}-{body}-{sex}"
+
+
+def compute_catalog_version(conn):
+    """
+    Hash every table a recommendation page depends on, plus the page format
+    """
+    digest = hashlib.sha256(f"format:{PAGE_FORMAT_VERSION}".encode("utf-8"))
+    for query in CATALOG_QUERIES:
+        digest.update(query.encode("utf-8"))
+        for row in conn.execute(query).fetchall():
+            digest.update(repr(tuple(row)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+@lru_cache(maxsize=4)
+def _catalog_version_for_stamp(stamp):
+    with get_engine().connect() as conn:
+        return compute_catalog_version(conn)
+
+
+def current_catalog_version():
+    """
+    Catalog version of the live database, only re-hashed when the file
+    changes; read from the shared catalog when this process is attached
+    """
+    shared = shared_catalog()
+    if shared is not None and shared.catalog_version is not None:
+        return shared.catalog_version
+    return _catalog_version_for_stamp(database_stamp())
+
+
+def _headline(body):
+    if body == 0:
+        return "You are thin! You should gain weight instead of losing weight!"
+    if body == 1:
+        return "You are in shape! Keep going! :sunglasses:"
+    return f"You are {BODY_NAMES[body]}! To lose weight, you can follow this guide:"
+
+
+def _render_diet_section(diet):
+    tab_label, plan_name, serving_format = DIET_TABS[diet.kind]
+
+    if not diet.found:
+        return {
+            "tab": tab_label,
+            "error": f"❌ {plan_name} diet plan not found for {diet.calories} calories",
+        }
+
+    nutrition_detail = diet.get_nutrition_detail()
+
+    meals = []
+    for meal in diet.meals:
+        dishes = []
+        for planned in meal.dishes:
+            dishes.append(
+                {
+                    "id": planned.id,
+                    "name": planned.name,
+                    "amount": planned.amount,
+                    "serving": serving_format.format(amount=planned.amount),
+                }
+            )
+        meals.append({"name": meal.name, "calories": meal.calories, "dishes": dishes})
+
+    return {
+        "tab": tab_label,
+        "calories": diet.calories,
+        "summary_html": rendering.heading("📈 Nutrition Summary")
+        + rendering.labelled_lines(
+            [
+                ("Calories", f"{round(nutrition_detail.calories)} cal"),
+                ("Carbs", f"{nutrition_detail.carbs} g"),
+                ("Fat", f"{nutrition_detail.fat} g"),
+                ("Protein", f"{nutrition_detail.protein} g"),
+            ]
+        ),
+        "chart_svg": render_macro_pie(nutrition_detail, "plan"),
+        "meal_plan_html": rendering.meal_plan_block(meals),
+        "meals": meals,
+    }
+
+
+def _render_cardio_section(cardio):
+    return f"""
+<h3 style="padding-left: 27px">1. Cardio</h3>
+<p style="padding-left: 55px">It doesn't matter which form of cardio you use. Pick something that gets your heart moving, be it treadmill, elliptical, or swimming.</p>
+<p style="padding-left: 55px">Based on your current state, you should do {rendering.escape(cardio.sessions)} sessions a week: {rendering.escape(cardio.time.removesuffix(" minutes"))} minutes, respectively.</p>
+"""
+
+
+def _render_progression_section(plan):
+    """
+    The load to add to the starting weight, and the reps, of each exercise at
+    the end of some weeks of double progression
+    """
+    program = plan.progression_program()
+    if not len(program):
+        return ""
+    projection = program.simulate([[0.0] * len(program)], max(PROGRESSION_WEEKS))
+    names = [entry.exercise for entry in plan.gym_lower + plan.gym_upper]
+    rows = [
+        (
+            name,
+            [
+                (projection.load[0, column, week - 1], projection.reps[0, column, week - 1])
+                for week in PROGRESSION_WEEKS
+            ],
+        )
+        for column, name in enumerate(names)
+    ]
+    return rendering.progression_table(rows, PROGRESSION_WEEKS)
+
+
+def build_recommendation_page(plan):
+    """
+    Render the whole result section of the main page for a RecommendationPlan
+    into a JSON-serialisable dict of markdown, HTML and SVG strings. The diet
+    tabs, the cardio block and the gym tables are rendered side by side when
+    the render pool is enabled (RENDER_POOL_WORKERS), inline otherwise.
+    """
+    page = {
+        "key": list(plan.key),
+        "headline": _headline(plan.body),
+        "has_plan": plan.has_plan,
+        "diets": [],
+    }
+    if not plan.has_plan:
+        return page
+
+    sections = [(diet.kind, partial(_render_diet_section, diet)) for diet in plan.diets]
+    sections += [
+        ("cardio", partial(_render_cardio_section, plan.cardio)),
+        ("gym_lower", partial(rendering.gym_table, plan.gym_lower, "Lower")),
+        ("gym_upper", partial(rendering.gym_table, plan.gym_upper, "Upper")),
+        ("progression", partial(_render_progression_section, plan)),
+    ]
+    rendered = render_sections(sections)
+
+    page["diets"] = [rendered[diet.kind] for diet in plan.diets]
+    page["workout_html"] = (
+        rendering.heading("B. Workout", level=2)
+        + rendered["cardio"]
+        + GYM_INTRO_HTML
+        + rendering.side_by_side(rendered["gym_lower"], rendered["gym_upper"])
+        + rendered["progression"]
+    )
+    return page
+
+
+def check_plan_data(conn=None):
+    """
+    [PlanIssue] of the diet tables against the dishes: unknown dish ids, and
+    meal calories or plan Nutrition that the dishes do not add up to
+    """
+    from algorithm.plan_integrity import PLAN_TABLES, check_plans
+
+    if conn is None:
+        with get_engine().connect() as conn:
+            return check_plan_data(conn)
+    plans = {
+        table: conn.execute(
+            f"SELECT Calories, Nutrition, Breakfast, Lunch, Dinner FROM {table} "
+            "ORDER BY Calories"
+        ).fetchall()
+        for table in PLAN_TABLES
+    }
+    standard_calories = conn.execute(
+        "SELECT Stage, Body, Sex, LowCarb, ModerateCarb, HighCarb FROM StandardCalories"
+    ).fetchall()
+    return check_plans(get_nutrition_matrix("Dish"), plans, standard_calories)
+
+
+@lru_cache(maxsize=4)
+def _plan_data_issues(version):
+    return tuple(check_plan_data())
+
+
+def checked_plan(stage, body, sex):
+    """
+    recommendation_service.compute for a catalog whose plan data passed
+    check_plan_data. The check runs once per catalog version; the plans rely
+    on every planned dish existing, so PlanDataError is raised rather than
+    serving a plan that would not render.
+    """
+    from algorithm.plan_integrity import PlanDataError
+
+    if shared_catalog() is not None:
+        # publish_shared_catalog only publishes plan data that passed
+        issues = ()
+    else:
+        issues = _plan_data_issues(current_catalog_version())
+    if issues:
+        raise PlanDataError(issues)
+    return recommendation_service.compute(stage, body, sex)
+
+
+def build_all_recommendation_pages(build_dir=BUILD_DIR, force=False):
+    """
+    Render every (stage, body, sex) page into build_dir/<catalog version>/.
+    Nothing is rebuilt when the current catalog version already has artifacts.
+    Returns (version, built) where built is False when the build was skipped.
+    Raises PlanDataError, before writing anything, when check_plan_data fails:
+    the pages rely on every planned dish existing.
+    """
+    from algorithm.plan_integrity import PlanDataError
+
+    build_dir = Path(build_dir)
+    with get_engine().connect() as conn:
+        version = compute_catalog_version(conn)
+        version_dir = build_dir / version
+
+        if not force and (version_dir / MANIFEST_NAME).exists():
+            return version, False
+
+        issues = check_plan_data(conn)
+        if issues:
+            raise PlanDataError(issues)
+
+        version_dir.mkdir(parents=True, exist_ok=True)
+    # Build from fresh plans rather than whatever this process has memoized
+    recommendation_service.invalidate()
+    pages = {}
+    for stage, body, sex in all_profile_keys():
+        name = profile_key_name(stage, body, sex)
+        page = build_recommendation_page(
+            recommendation_service.compute(stage, body, sex)
+        )
+        with open(version_dir / f"{name}.json", "w", encoding="utf-8") as f:
+            json.dump(page, f, ensure_ascii=False)
+        pages[name] = page["has_plan"]
+
+    from algorithm.meal_swap import build_swap_buckets
+
+    with open(version_dir / f"{SWAP_BUCKETS_NAME}.json", "w", encoding="utf-8") as f:
+        json.dump(build_swap_buckets(get_nutrition_matrix("Dish")), f)
+    with open(version_dir / f"{INGREDIENTS_NAME}.json", "w", encoding="utf-8") as f:
+        json.dump(build_ingredient_table().to_dict(), f, ensure_ascii=False)
+
+    # The manifest is written last, so a half-written build is never served
+    with open(version_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": version,
+                "format": PAGE_FORMAT_VERSION,
+                "pages": pages,
+            },
+            f,
+            indent=2,
+        )
+    return version, True
+
+
+def manifest_stamp(version):
+    """
+    mtime of the build manifest of a catalog version, or None when it has not
+    been built. Part of every artifact cache key, so a build that finishes
+    while the server runs is picked up without a restart.
+    """
+    try:
+        return (BUILD_DIR / version / MANIFEST_NAME).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=64)
+def _read_artifact(version, manifest, name):
+    try:
+        with open(BUILD_DIR / version / f"{name}.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_artifact(version, name):
+    # Misses are not cached: the manifest is checked on every call
+    manifest = manifest_stamp(version)
+    if manifest is None:
+        return None
+    return _read_artifact(version, manifest, name)
+
+
+def load_recommendation_page(stage, body, sex):
+    """
+    Return the rendered page for a profile: the prebuilt artifact when one
+    exists for the current catalog, otherwise a page rendered on the fly.
+    Raises PlanDataError when there is no artifact and the plan data fails
+    check_plan_data.
+    """
+    shared = shared_catalog()
+    if shared is not None:
+        page = shared.page(profile_key_name(stage, body, sex))
+        if page is not None:
+            return page
+
+    version = current_catalog_version()
+    page = _load_artifact(version, profile_key_name(stage, body, sex))
+    if page is not None:
+        return page
+
+    # Rendered from the live database, which no build has checked yet
+    return build_recommendation_page(checked_plan(stage, body, sex))
+
+
+# Sessions submitting the same profile at once (e.g. everyone keeping the
+# sidebar defaults) share one classify + load instead of each running it
+recommendation_flight = SingleFlight("recommendation")
+
+
+def normalize_profile(stage, height, weight, sex):
+    return (int(stage), round(float(height), 2), round(float(weight), 2), int(sex))
+
+
+def _recommend(stage, height, weight, sex):
+    with span("fuzzy"):
+        body = classify_body(height, weight, sex)
+    return body, load_recommendation_page(stage, body, sex)
+
+
+def recommend(stage, height, weight, sex):
+    """
+    Classify a profile and return (body, rendered page). Identical profiles
+    requested concurrently are computed once.
+    """
+    key = normalize_profile(stage, height, weight, sex)
+    return recommendation_flight.do(key, _recommend, *key)
+
+
+def plan_substitutes(diet, exclude_ingredients=(), k=SUBSTITUTES_PER_DISH):
+    """
+    {dish id: [(id, name), ...]} with the k nearest substitutes of every dish
+    of a rendered diet, skipping dishes the diet already has and any dish
+    with one of exclude_ingredients. Cheap enough to run on every render.
+    """
+    ids = list(
+        dict.fromkeys(dish["id"] for meal in diet["meals"] for dish in meal["dishes"])
+    )
+    names = get_name_index("Dish")
+    neighbours = get_substitute_index().nearest(
+        ids, k, exclude_ingredients=exclude_ingredients, exclude_ids=ids
+    )
+    return {
+        id: [(substitute, names.name_of(substitute)) for substitute, _ in found]
+        for id, found in zip(ids, neighbours)
+    }
+
+
+@lru_cache(maxsize=2)
+def _load_meal_swapper(version, manifest):
+    from algorithm.meal_swap import MealSwapper, build_swap_buckets
+
+    matrix = get_nutrition_matrix("Dish")
+    buckets = _load_artifact(version, SWAP_BUCKETS_NAME)
+    if buckets is None:
+        buckets = build_swap_buckets(matrix)
+    return MealSwapper(matrix, buckets)
+
+
+def get_meal_swapper():
+    """
+    Return the MealSwapper of the current catalog, on the prebuilt buckets
+    when build_recommendations.py has run, otherwise on buckets built here
+    """
+    version = current_catalog_version()
+    return _load_meal_swapper(version, manifest_stamp(version))
+
+
+def swap_meal_dish(meal, slot, dish_id=None, limit=5):
+    """
+    Options for swapping the dish in `slot` of a diet meal string such as
+    '452:62x2.5;02x1', with the servings re-solved; see MealSwapper.swap
+    """
+    return get_meal_swapper().swap(meal, slot, dish_id=dish_id, limit=limit)
+
+
+def build_ingredient_table():
+    """
+    Parse the recipe of every dish into an IngredientTable
+    """
+    from algorithm.shopping import IngredientTable
+
+    shared = shared_catalog()
+    if shared is not None:
+        return IngredientTable.from_recipes(
+            sorted(shared.rows("Dish", ("Id", "Recipe")))
+        )
+    with get_engine().connect() as conn:
+        return IngredientTable.from_recipes(
+            conn.execute("SELECT Id, Recipe FROM Dish ORDER BY Id").fetchall()
+        )
+
+
+@lru_cache(maxsize=2)
+def _load_ingredient_table(version, manifest):
+    from algorithm.shopping import IngredientTable
+
+    data = _load_artifact(version, INGREDIENTS_NAME)
+    if data is None:
+        return build_ingredient_table()
+    return IngredientTable.from_dict(data)
+
+
+def get_ingredient_table():
+    """
+    The parsed recipes of the current catalog, prebuilt by
+    build_recommendations.py when it has run
+    """
+    version = current_catalog_version()
+    return _load_ingredient_table(version, manifest_stamp(version))
+
+
+def weekly_servings(plan, household=1):
+    """
+    {dish id: servings} eaten in a week of a RecommendationPlan, following
+    WEEKLY_DIET_DAYS, for a household of that many people
+    """
+    servings = {}
+    for diet in plan.diets:
+        days = WEEKLY_DIET_DAYS.get(diet.kind, 0) * household
+        for meal in diet.meals:
+            for dish in meal.dishes:
+                servings[dish.id] = servings.get(dish.id, 0) + float(dish.amount) * days
+    return servings
+
+
+def weekly_shopping_list(stage, body, sex, household=1):
+    """
+    [(ingredient, unit, quantity)] to buy for a week of a profile's plan
+    """
+    plan = checked_plan(stage, body, sex)
+    return get_ingredient_table().aggregate(weekly_servings(plan, household))
@@ -0,0 +1,65 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Sections of a page are independent, so they can be prepared side by side
+# while the script thread only emits the results. Off by default, which makes
+# this module inert: every section then runs inline on the script thread,
+# including on the interactive path. With the bundled SQLite file a page
+# rendered on the fly took 2.1 ms inline and 2.9 ms on 4 workers, as the
+# sections are CPU-bound and share the GIL. Enable it (e.g. 4) when queries
+# have real latency, such as a database on another host: the gym rows are
+# then fetched on their own connection while the profile is queried.
+RENDER_POOL_WORKERS = int(os.environ.get("RENDER_POOL_WORKERS", "0"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the process-wide render pool, created on first use.
+    Returns None when RENDER_POOL_WORKERS is 0 or less.
+    """
+    global _executor
+    if RENDER_POOL_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=RENDER_POOL_WORKERS, thread_name_prefix="render"
+            )
+        return _executor
+
+
+def submit(function, *args):
+    """
+    Start function(*args) on the render pool, in a copy of the caller's
+    context. Returns a future; without a pool the call runs right away.
+    """
+    executor = get_executor()
+    if executor is None:
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return executor.submit(contextvars.copy_context().run, function, *args)
+
+
+def render_sections(sections):
+    """
+    Run every (name, function) of `sections` at once on the render pool and
+    return {name: result} once the slowest is done. The first exception is
+    re-raised. Each section runs in a copy of the caller's context, so its
+    spans are still attributed to the current rerun.
+    """
+    sections = list(sections)
+    executor = get_executor()
+    if executor is None or len(sections) < 2:
+        return {name: function() for name, function in sections}
+
+    futures = [(name, submit(function)) for name, function in sections]
+    return {name: future.result() for name, future in futures}
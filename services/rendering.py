@@ -0,0 +1,145 @@
+import html
+
+# Each helper returns one HTML string for a whole section, so a page sends a
+# single st.markdown(..., unsafe_allow_html=True) per section instead of one
+# element per line. Every value coming from the database is escaped here.
+
+
+def escape(value):
+    return html.escape(str(value))
+
+
+def heading(text, level=4, style=None):
+    style_attribute = f' style="{style}"' if style else ""
+    return f"<h{level}{style_attribute}>{escape(text)}</h{level}>"
+
+
+def labelled_lines(pairs):
+    """
+    '<b>label:</b> value' lines, e.g. the ingredients of a recipe or the
+    nutrition summary of a diet
+    """
+    return "".join(
+        f"<p style='margin: 0 0 0.25rem'><b>{escape(label)}:</b> {escape(value)}</p>"
+        for label, value in pairs
+    )
+
+
+def ingredients_block(ingredients):
+    return heading("🛒 Ingredients") + labelled_lines(ingredients.items())
+
+
+def steps_block(steps):
+    """
+    Numbered cooking steps; the keys of StepsDetail.steps are already 'Step N:'
+    """
+    return heading("👨‍🍳 Cooking Instructions") + labelled_lines(
+        (label.rstrip(":"), detail.strip()) for label, detail in steps.items()
+    )
+
+
+def paragraphs(items, style=None):
+    style_attribute = f" style='{style}'" if style else ""
+    return "".join(f"<p{style_attribute}>{escape(item)}</p>" for item in items)
+
+
+def ordered_list(items, style=None):
+    style_attribute = f" style='{style}'" if style else ""
+    rows = "".join(f"<li>{escape(item)}</li>" for item in items)
+    return f"<ol{style_attribute}>{rows}</ol>"
+
+
+def dish_cell(name, serving_text):
+    return f"<div style='flex: 1'><b>{escape(name)}</b><br/>{escape(serving_text)}</div>"
+
+
+def meal_plan_block(meals):
+    """
+    The 'Daily Meal Plan' of one diet: a title per meal, its dishes side by
+    side and a divider, as one block. `meals` are dicts with "name",
+    "calories" and "dishes" (each with "name" and "serving").
+    """
+    parts = [heading("🍽️ Daily Meal Plan")]
+    for meal in meals:
+        parts.append(
+            f"<p style='margin-bottom: 0.5rem'><b>{escape(meal['name'])}</b> - "
+            f"{escape(meal['calories'])} calories</p>"
+        )
+        parts.append("<div style='display: flex; gap: 1rem'>")
+        parts.extend(dish_cell(dish["name"], dish["serving"]) for dish in meal["dishes"])
+        parts.append("</div><hr/>")
+    return "".join(parts)
+
+
+def substitutes_block(meals, substitutes):
+    """
+    'Similar Dishes' of a diet: for each of its dishes, the names of the
+    dishes it can be swapped for. `substitutes` is {dish id: [(id, name)]}.
+    """
+    seen = set()
+    pairs = []
+    for meal in meals:
+        for dish in meal["dishes"]:
+            found = substitutes.get(dish["id"])
+            if dish["id"] in seen or not found:
+                continue
+            seen.add(dish["id"])
+            pairs.append((dish["name"], ", ".join(name for _, name in found)))
+    if not pairs:
+        return ""
+    return heading("🔄 Similar Dishes") + labelled_lines(pairs)
+
+
+def shopping_list_block(items):
+    """
+    A week's shopping list from [(ingredient, unit, quantity)]
+    """
+    from algorithm.shopping import format_quantity
+
+    if not items:
+        return ""
+    return heading("🛒 Shopping List") + labelled_lines(
+        [(name, format_quantity(quantity, unit)) for name, unit, quantity in items]
+    )
+
+
+def gym_table(entries, title):
+    rows = "".join(
+        f"<tr><td>{escape(entry.exercise)}</td><td>{escape(entry.sets)}</td>"
+        f"<td>{escape(entry.reps)}</td></tr>"
+        for entry in entries
+    )
+    return (
+        f'<h3 style="text-align: center">{escape(title)}</h3>'
+        '<table style="width: 100%;">'
+        "<tr><th>Exercise</th><th>Sets</th><th>Reps</th></tr>"
+        f"{rows}</table>"
+    )
+
+
+def progression_table(rows, weeks):
+    """
+    'Progression' of the gym plan: one row per exercise of (exercise,
+    [(load added in kg, reps)] for each of `weeks`)
+    """
+    header = "".join(f"<th>Week {escape(week)}</th>" for week in weeks)
+    body = "".join(
+        f"<tr><td>{escape(exercise)}</td>"
+        + "".join(f"<td>+{load:g} kg × {escape(reps)}</td>" for load, reps in cells)
+        + "</tr>"
+        for exercise, cells in rows
+    )
+    return (
+        heading("3. Progression", level=3, style="padding-left: 27px")
+        + "<p style=\"padding-left: 55px\">Weight to add to the bar and reps of the "
+        "last session of the week, if you manage one more rep every session.</p>"
+        f'<table style="width: 100%;"><tr><th>Exercise</th>{header}</tr>{body}</table>'
+    )
+
+
+def side_by_side(*blocks):
+    """
+    Lay blocks out in equal columns, like st.columns, but as a single element
+    """
+    cells = "".join(f"<div style='flex: 1; min-width: 0'>{block}</div>" for block in blocks)
+    return f"<div style='display: flex; gap: 1rem'>{cells}</div>"
@@ -0,0 +1,445 @@
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import secrets
+import struct
+import threading
+from pathlib import Path
+
+from services.catalog import database_stamp, get_engine
+
+# A published catalog is one immutable file that every worker on the host maps
+# read-only, so its pages live once in the OS page cache however many
+# processes attach to it. Layout:
+#
+#   MAGIC | header length (uint64) | JSON header | padding | sections...
+#
+# Offsets are relative to the start of the sections, i.e. the end of the
+# header rounded up to 8 bytes. Each table is a cell array (CELL_FORMAT per
+# cell, row-major) pointing into a heap of UTF-8 text and blobs, plus, for
+# tables looked up by Id, the row numbers sorted by Id. Dish nutrition is also
+# stored as float32 columns of calories, carbs, fat and protein (column-major,
+# the layout NutritionMatrix works in, so it maps without a copy), and every
+# profile's recommendation page as JSON. The pages are only valid for the
+# PAGE_FORMAT_VERSION they were rendered with, which the header and the
+# pointer both record.
+
+SHARED_CATALOG_DIR = Path("database/build/catalog")
+POINTER_NAME = "current.json"
+MAGIC = b"DXCAT001"
+FORMAT_VERSION = 2
+
+# (int64 value or heap offset, uint32 length, uint8 type tag), 16 bytes
+CELL_FORMAT = "<qIB3x"
+CELL_SIZE = struct.calcsize(CELL_FORMAT)
+NULL, INTEGER, REAL, TEXT, BLOB = range(5)
+
+SHARED_TABLES = (
+    "Dish",
+    "Exercise",
+    "StandardCalories",
+    "LowCarb",
+    "ModerateCarb",
+    "HighCarb",
+    "Cardio",
+    "Gym",
+)
+# Tables with an Id primary key, indexed for lookup()
+INDEXED_TABLES = ("Dish", "Exercise")
+NUTRITION_FIELDS = 4
+
+
+def _align(buffer, alignment=8):
+    buffer.extend(b"\0" * (-len(buffer) % alignment))
+
+
+def _pack_table(rows, data):
+    """
+    Append the heap and the cells of `rows` to `data`.
+    Returns (cells offset, heap offset).
+    """
+    heap_offset = len(data)
+    cells = []
+    for row in rows:
+        for value in row:
+            if value is None:
+                cells.append((0, 0, NULL))
+            elif isinstance(value, int):
+                cells.append((value, 0, INTEGER))
+            else:
+                if isinstance(value, float):
+                    tag, encoded = REAL, repr(value).encode("utf-8")
+                elif isinstance(value, str):
+                    tag, encoded = TEXT, value.encode("utf-8")
+                else:
+                    tag, encoded = BLOB, bytes(value)
+                cells.append((len(data), len(encoded), tag))
+                data.extend(encoded)
+    _align(data)
+
+    cells_offset = len(data)
+    for cell in cells:
+        data.extend(struct.pack(CELL_FORMAT, *cell))
+    return cells_offset, heap_offset
+
+
+def _nutrition_row(nutrition):
+    try:
+        values = [float(value) for value in nutrition.split(";")]
+    except (AttributeError, ValueError):
+        values = []
+    if len(values) != NUTRITION_FIELDS:
+        values = [float("nan")] * NUTRITION_FIELDS
+    return values
+
+
+def _write_atomically(path, content):
+    """
+    Write `content` to a temporary file of this process only, then rename it
+    over `path`: workers publishing at once never write into the same file,
+    and a file another worker has mapped is replaced rather than truncated
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+    try:
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def publish_shared_catalog(build_dir=SHARED_CATALOG_DIR, images=True):
+    """
+    Pack the catalog tables, the dish nutrition array and every recommendation
+    page into build_dir/<content hash>.bin, then point current.json at it.
+    Pass images=False to leave the Dish images out of the file.
+    Returns the path of the published file. Raises PlanDataError when the
+    plan data fails check_plan_data.
+    """
+    from services.recommendation_pages import (
+        PAGE_FORMAT_VERSION,
+        all_profile_keys,
+        build_recommendation_page,
+        checked_plan,
+        current_catalog_version,
+        profile_key_name,
+    )
+    from services.recommendation import recommendation_service
+
+    build_dir = Path(build_dir)
+    build_dir.mkdir(parents=True, exist_ok=True)
+    stamp = database_stamp()
+
+    tables = {}
+    with get_engine().connect() as conn:
+        for table in SHARED_TABLES:
+            result = conn.execute(f"SELECT * FROM {table} ORDER BY rowid")
+            columns = list(result.keys())
+            rows = [tuple(row) for row in result.fetchall()]
+            if table == "Dish" and not images:
+                image_column = columns.index("Image")
+                rows = [
+                    row[:image_column] + (None,) + row[image_column + 1 :] for row in rows
+                ]
+            tables[table] = (columns, rows)
+
+    recommendation_service.invalidate()
+    pages = {
+        profile_key_name(*key): json.dumps(
+            build_recommendation_page(checked_plan(*key)),
+            ensure_ascii=False,
+        ).encode("utf-8")
+        for key in all_profile_keys()
+    }
+
+    data = bytearray()
+    header = {
+        "format": FORMAT_VERSION,
+        "page_format": PAGE_FORMAT_VERSION,
+        "stamp": list(stamp),
+        "catalog_version": current_catalog_version(),
+        "images": images,
+        "tables": {},
+        "pages": {},
+    }
+    for table, (columns, rows) in tables.items():
+        cells_offset, heap_offset = _pack_table(rows, data)
+        entry = {
+            "columns": columns,
+            "rows": len(rows),
+            "cells": cells_offset,
+            "heap": heap_offset,
+        }
+        if table in INDEXED_TABLES:
+            _align(data)
+            entry["index"] = len(data)
+            order = sorted(range(len(rows)), key=lambda position: rows[position][0])
+            data.extend(struct.pack(f"<{len(order)}I", *order))
+        header["tables"][table] = entry
+
+    _align(data)
+    dish_columns, dish_rows = tables["Dish"]
+    nutrition_column = dish_columns.index("Nutrition")
+    header["nutrition"] = {"offset": len(data), "rows": len(dish_rows)}
+    nutrition_rows = [_nutrition_row(row[nutrition_column]) for row in dish_rows]
+    for field in range(NUTRITION_FIELDS):
+        data.extend(
+            struct.pack(
+                f"<{len(nutrition_rows)}f", *(values[field] for values in nutrition_rows)
+            )
+        )
+
+    for name, page in pages.items():
+        header["pages"][name] = [len(data), len(page)]
+        data.extend(page)
+
+    prefix = bytearray(MAGIC)
+    header_bytes = json.dumps(header).encode("utf-8")
+    prefix.extend(struct.pack("<Q", len(header_bytes)))
+    prefix.extend(header_bytes)
+    _align(prefix)
+
+    content = bytes(prefix) + data
+    name = hashlib.sha256(content).hexdigest()[:16] + ".bin"
+    path = build_dir / name
+    if not path.exists():
+        _write_atomically(path, content)
+
+    # Workers follow the pointer, so it is only swapped once the file is complete
+    _write_atomically(
+        build_dir / POINTER_NAME,
+        json.dumps(
+            {"file": name, "stamp": list(stamp), "page_format": PAGE_FORMAT_VERSION}
+        ).encode("utf-8"),
+    )
+
+    for old in build_dir.glob("*.bin"):
+        if old.name != name:
+            try:
+                # Workers still mapping it keep their pages until they detach
+                old.unlink()
+            except OSError:
+                pass
+    return path
+
+
+class SharedCatalog():
+    """
+    Read-only view of a published catalog file. Values are decoded from the
+    mapping on access, so attaching costs the header parse and nothing more.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC or len(self._map) < len(MAGIC) + 8:
+            self._map.close()
+            raise ValueError(f"{self.path} is not a shared catalog")
+        (header_length,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(bytes(self._map[start : start + header_length]))
+        self._base = start + header_length + (-(start + header_length) % 8)
+        self.stamp = tuple(self.header["stamp"])
+        self.page_format = self.header.get("page_format")
+        # current_catalog_version() of the database the file was built from
+        self.catalog_version = self.header.get("catalog_version")
+        self.has_images = self.header["images"]
+        self._tables = self.header["tables"]
+
+    def close(self):
+        """
+        Unmap the file now; only for a catalog no other caller holds
+        """
+        self._map.close()
+
+    def columns(self, table):
+        return self._tables[table]["columns"]
+
+    def row_count(self, table):
+        return self._tables[table]["rows"]
+
+    def _value(self, entry, position, column):
+        value, length, tag = struct.unpack_from(
+            CELL_FORMAT,
+            self._map,
+            self._base
+            + entry["cells"]
+            + (position * len(entry["columns"]) + column) * CELL_SIZE,
+        )
+        if tag == NULL:
+            return None
+        if tag == INTEGER:
+            return value
+        raw = self._map[self._base + value : self._base + value + length]
+        if tag == BLOB:
+            return raw
+        text = raw.decode("utf-8")
+        return float(text) if tag == REAL else text
+
+    def row(self, table, position, columns=None):
+        """
+        Row `position` of a table, restricted to `columns` (names) if given
+        """
+        entry = self._tables[table]
+        if columns is None:
+            indexes = range(len(entry["columns"]))
+        else:
+            indexes = [entry["columns"].index(column) for column in columns]
+        return tuple(self._value(entry, position, index) for index in indexes)
+
+    def rows(self, table, columns=None):
+        for position in range(self.row_count(table)):
+            yield self.row(table, position, columns)
+
+    def lookup(self, table, id, columns=None):
+        """
+        The row whose Id is `id` in an indexed table, or None
+        """
+        entry = self._tables[table]
+        count = entry["rows"]
+        start = self._base + entry["index"]
+        order = memoryview(self._map)[start : start + 4 * count].cast("I")
+        try:
+            # Binary search over the Ids, decoded only at the probed positions
+            keys = _KeyView(self, entry, order)
+            i = bisect.bisect_left(keys, id)
+            if i < count and keys[i] == id:
+                return self.row(table, order[i], columns)
+            return None
+        finally:
+            order.release()
+
+    def nutrition(self):
+        """
+        Flat float32 memoryview of the calories of every dish, then the
+        carbs, fat and protein, each in the row order of the Dish table
+        """
+        section = self.header["nutrition"]
+        start = self._base + section["offset"]
+        length = section["rows"] * NUTRITION_FIELDS * 4
+        return memoryview(self._map)[start : start + length].cast("f")
+
+    def nutrition_array(self):
+        """
+        The nutrition section as a read-only, column-major (dishes, 4) numpy
+        array that shares the mapping
+        """
+        import numpy as np
+
+        section = self.header["nutrition"]
+        return np.frombuffer(
+            self._map,
+            dtype="<f4",
+            count=section["rows"] * NUTRITION_FIELDS,
+            offset=self._base + section["offset"],
+        ).reshape(NUTRITION_FIELDS, section["rows"]).T
+
+    def page(self, name):
+        """
+        The prebuilt recommendation page of a profile, or None
+        """
+        location = self.header["pages"].get(name)
+        if location is None:
+            return None
+        start = self._base + location[0]
+        return json.loads(self._map[start : start + location[1]].decode("utf-8"))
+
+
+class _KeyView():
+    """
+    Sequence of the Ids of an indexed table in sorted order, for bisect
+    """
+
+    def __init__(self, catalog, entry, order):
+        self.catalog = catalog
+        self.entry = entry
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.catalog._value(self.entry, self.order[i], 0)
+
+
+_attach_lock = threading.Lock()
+_attached = {}
+# stamp -> mtime of the pointer when nothing usable was published for it
+_missing = {}
+
+
+def _pointer_mtime(build_dir):
+    try:
+        return (Path(build_dir) / POINTER_NAME).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _retire_catalogs(keep):
+    # Only the references are dropped. A session thread may still be reading
+    # an older catalog, or a numpy array may view it: its mapping is unmapped
+    # when the last of them lets go, never under a reader's feet.
+    for stamp in [stamp for stamp in _attached if stamp != keep]:
+        del _attached[stamp]
+
+
+def attach_shared_catalog(stamp=None, build_dir=SHARED_CATALOG_DIR):
+    """
+    Map the published catalog read-only, once per process. Returns None when
+    nothing is published, or when it was built from another version of the
+    database than `stamp` (the current one by default) or with another page
+    format. A miss is remembered until the pointer changes. Attaching another
+    stamp releases the older catalogs, which are unmapped once no caller
+    holds them any more.
+    """
+    if stamp is None:
+        stamp = database_stamp()
+    stamp = tuple(stamp)
+
+    with _attach_lock:
+        catalog = _attached.get(stamp)
+        if catalog is not None:
+            return catalog
+        pointer_mtime = _pointer_mtime(build_dir)
+        if stamp in _missing and _missing[stamp] == pointer_mtime:
+            return None
+
+        catalog = _open_published(stamp, build_dir)
+        if catalog is None:
+            # Only the current stamp is asked for again
+            _missing.clear()
+            _missing[stamp] = pointer_mtime
+            return None
+        _missing.pop(stamp, None)
+        _retire_catalogs(keep=stamp)
+        _attached[stamp] = catalog
+        return catalog
+
+
+def _open_published(stamp, build_dir):
+    from services.recommendation_pages import PAGE_FORMAT_VERSION
+
+    try:
+        pointer = json.loads((Path(build_dir) / POINTER_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+    if (
+        tuple(pointer["stamp"]) != stamp
+        or pointer.get("page_format") != PAGE_FORMAT_VERSION
+    ):
+        return None
+    try:
+        catalog = SharedCatalog(Path(build_dir) / pointer["file"])
+    except (OSError, ValueError):
+        return None
+    if (
+        catalog.header.get("format") != FORMAT_VERSION
+        or catalog.stamp != stamp
+        or catalog.page_format != PAGE_FORMAT_VERSION
+    ):
+        catalog.close()
+        return None
+    return catalog
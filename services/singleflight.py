@@ -0,0 +1,67 @@
+import threading
+
+from services.metrics import registry
+
+COUNTER_NAME = "dietexercise_singleflight_total"
+
+
+class _Call():
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    """
+    Runs a function at most once at a time per key: callers that arrive while
+    a call for their key is in flight wait for it and share its result (or its
+    exception) instead of repeating the work. Nothing is kept once the call
+    returns; memoization is left to the caller.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        registry.increment(
+            COUNTER_NAME,
+            {"flight": self.name, "outcome": "executed" if leader else "coalesced"},
+        )
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,205 @@
+import math
+import os
+from collections import deque
+
+import streamlit as st
+
+from services import rendering
+from services.catalog import NAME_SEARCH_PAGE_SIZE, get_name_index
+from services.metrics import STAGES, registry
+from services.singleflight import COUNTER_NAME as SINGLEFLIGHT_COUNTER
+
+TIMING_HISTORY_SIZE = 50
+SQL_PANEL_STATEMENTS = 5
+
+BODY_CATEGORY_NAMES = ("Thin", "In shape", "Overweight", "Pre-obese", "Obese")
+# Window of the weight trend line
+HISTORY_AVERAGE_DAYS = 7
+
+
+def catalog_search(table, key, label="**Search**", page_size=NAME_SEARCH_PAGE_SIZE):
+    """
+    Typeahead over the cached name index of a table. Only one page of matches
+    is sent to the browser, however large the catalog is.
+    Returns the Id of the selected row, or None.
+    """
+    index = get_name_index(table)
+
+    query = st.text_input(label, key=f"{key}_query", placeholder="Type a name...")
+    matches, total = index.search(query, 0, page_size)
+
+    page_count = max(1, math.ceil(total / page_size))
+    if page_count > 1:
+        page = st.selectbox(
+            f"Page ({total} matches)",
+            range(page_count),
+            format_func=lambda p: f"{p + 1} of {page_count}",
+            key=f"{key}_page",
+        )
+        if page > 0:
+            matches, total = index.search(query, page, page_size)
+
+    if total == 0:
+        st.caption("No matches.")
+
+    return st.selectbox(
+        "**Results**",
+        [None] + [id for id, _ in matches],
+        format_func=lambda id: "" if id is None else index.name_of(id),
+        key=f"{key}_selected",
+    )
+
+
+def history_panel(member, name):
+    """
+    A member's logged weight with its trend, and every change of body
+    category over their whole history. `member` is the member_key the
+    history is stored under, `name` is only shown.
+    """
+    import pandas as pd
+
+    from services.history import downsample, history_store, rolling_average
+    from services.metrics import span
+
+    with span("sql"):
+        series = history_store.series(member)
+    if len(series) == 0:
+        return
+
+    with span("parse"):
+        categories = series.body_categories()
+        trend = rolling_average(
+            series.times, series.weights, HISTORY_AVERAGE_DAYS * 86400
+        )
+        times, weights = downsample(series.times, series.weights)
+        _, trend = downsample(series.times, trend)
+        changes = [
+            (series.times[i], categories[i])
+            for i in range(len(categories))
+            if i == 0 or categories[i] != categories[i - 1]
+        ]
+
+    st.markdown(
+        rendering.heading(f"📈 Progress of {name}", level=3), unsafe_allow_html=True
+    )
+    st.line_chart(
+        pd.DataFrame(
+            {
+                "Weight (kg)": weights,
+                f"{HISTORY_AVERAGE_DAYS}-day average": trend,
+            },
+            index=pd.to_datetime(times, unit="s"),
+        )
+    )
+    st.caption(
+        f"{len(series)} measurements. Body category: "
+        + " → ".join(
+            f"{BODY_CATEGORY_NAMES[category]} ({pd.to_datetime(at, unit='s'):%Y-%m-%d})"
+            for at, category in changes
+        )
+    )
+
+
+def debug_enabled():
+    """
+    The timing panel is shown with DEBUG_TIMINGS=1 only: it exposes SQL,
+    query plans and memory of the whole process, so a visitor cannot turn
+    it on from the URL
+    """
+    return os.environ.get("DEBUG_TIMINGS") == "1"
+
+
+def timing_panel(timer):
+    """
+    Store the breakdown of this rerun in the session and, in debug mode,
+    show it in the sidebar. Call it last, so it sees every span of the rerun.
+    """
+    breakdown = timer.breakdown()
+    history = st.session_state.setdefault(
+        "rerun_timings", deque(maxlen=TIMING_HISTORY_SIZE)
+    )
+    history.append({"page": timer.page, "total": timer.total(), **breakdown})
+
+    if not debug_enabled():
+        return
+
+    page_history = [entry for entry in history if entry["page"] == timer.page]
+    stages = list(STAGES) + sorted(set(breakdown) - set(STAGES))
+    rows = ["| Stage | This rerun (ms) | Session mean (ms) |", "|---|---:|---:|"]
+    for stage in stages + ["total"]:
+        mean = sum(entry.get(stage, 0.0) for entry in page_history) / len(page_history)
+        current = timer.total() if stage == "total" else breakdown.get(stage, 0.0)
+        rows.append(f"| {stage} | {current * 1000:.1f} | {mean * 1000:.1f} |")
+
+    with st.sidebar.expander("⏱️ Rerun timings", expanded=True):
+        st.markdown("\n".join(rows))
+        st.caption(f"{len(page_history)} reruns of this page in this session")
+        flights = {}
+        for (name, labels), count in registry.counters().items():
+            if name == SINGLEFLIGHT_COUNTER:
+                labels = dict(labels)
+                flights.setdefault(labels["flight"], {})[labels["outcome"]] = count
+        for flight, outcomes in sorted(flights.items()):
+            st.caption(
+                f"Single-flight {flight}: {outcomes.get('executed', 0)} executed, "
+                f"{outcomes.get('coalesced', 0)} coalesced"
+            )
+        sql_panel(timer.page)
+        memory_panel()
+        st.download_button(
+            "Export JSON",
+            registry.to_json(),
+            file_name="metrics.json",
+            mime="application/json",
+        )
+        st.download_button(
+            "Export Prometheus",
+            registry.to_prometheus(),
+            file_name="metrics.prom",
+            mime="text/plain",
+        )
+
+
+def sql_panel(page):
+    """
+    The statements this page spent the most time in, process-wide
+    """
+    # Imported here, since it pulls in SQLAlchemy
+    from services.query_log import query_log
+
+    stats = query_log.stats(page)
+    if not stats:
+        return
+    rows = ["| Statement | Count | Mean (ms) | Max (ms) |", "|---|---:|---:|---:|"]
+    for (_, statement), entry in list(stats.items())[:SQL_PANEL_STATEMENTS]:
+        shortened = statement if len(statement) <= 60 else statement[:57] + "..."
+        rows.append(
+            f"| `{shortened}` | {entry['count']} | {entry['mean_ms']:.2f} | "
+            f"{entry['max_ms']:.2f} |"
+        )
+    st.markdown("\n".join(rows))
+    slow = [entry for entry in query_log.slow_queries() if entry["page"] == page]
+    if slow:
+        st.caption(
+            f"{len(slow)} statements over {query_log.slow_query_ms:g} ms, "
+            "printed with their plans in the server log"
+        )
+
+
+def memory_panel():
+    """
+    The last sample of the memory guard, when it is running
+    """
+    from services.memory_guard import memory_guard
+
+    report = memory_guard.report()
+    if report is None:
+        return
+    rows = ["| Subsystem | Traced (MB) | Evictions |", "|---|---:|---:|"]
+    for subsystem, megabytes in sorted(
+        report["traced_mb"].items(), key=lambda item: item[1], reverse=True
+    ):
+        evictions = report["evictions"].get(subsystem, 0)
+        rows.append(f"| {subsystem} | {megabytes:.1f} | {evictions} |")
+    st.markdown("\n".join(rows))
+    st.caption(f"RSS {report['rss_mb']:.0f} MB at the last memory guard sample")
@@ -0,0 +1,111 @@
+import threading
+import time
+
+from services.catalog import (
+    DISH_COLUMNS,
+    dish_from_row,
+    get_engine,
+    get_name_index,
+    get_substitute_index,
+)
+from services.charts import CHART_CACHE_SIZE, render_macro_pie
+from services.metrics import start_rerun
+from services.recommendation_pages import all_profile_keys, load_recommendation_page
+
+_warmup_lock = threading.Lock()
+_warmup_report = None
+
+
+def _warm_classifier():
+    from algorithm.fuzzy_logic import FuzzyLogic
+
+    # Builds the rules table, which pulls in numpy
+    FuzzyLogic()
+
+
+def _warm_catalog():
+    get_name_index("Dish")
+    get_name_index("Exercise")
+    get_substitute_index()
+
+
+def _warm_recommendations():
+    for stage, body, sex in all_profile_keys():
+        load_recommendation_page(stage, body, sex)
+
+
+def _warm_exercise_pages():
+    from services.exercise_pages import get_exercise_page
+
+    get_exercise_page(None)
+
+
+def _warm_dish_charts():
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            f"SELECT {DISH_COLUMNS} FROM Dish LIMIT :limit",
+            {"limit": CHART_CACHE_SIZE},
+        ).fetchall()
+    for row in rows:
+        render_macro_pie(dish_from_row(row).get_nutrition_detail(), "dish")
+
+
+def _warm_image_server():
+    from services.image_server import IMAGE_SERVER_URL, start_image_server
+
+    # Pages only hand out image URLs when the browser has a way to reach them
+    if IMAGE_SERVER_URL:
+        start_image_server()
+
+
+def _start_memory_guard():
+    from services.memory_guard import start_memory_guard
+
+    # Last, so its baseline is the warmed-up process
+    start_memory_guard()
+
+
+WARMUP_STEPS = (
+    ("classifier", _warm_classifier),
+    ("catalog", _warm_catalog),
+    ("recommendations", _warm_recommendations),
+    ("exercise pages", _warm_exercise_pages),
+    ("dish charts", _warm_dish_charts),
+    ("image server", _warm_image_server),
+    ("memory guard", _start_memory_guard),
+)
+
+
+def warm_up():
+    """
+    Import the heavy modules and fill the name indexes, recommendation pages
+    and chart cache, once per process. Returns {step: seconds or error}.
+    A failing step is reported and skipped; the app then loads it on demand.
+    """
+    global _warmup_report
+    with _warmup_lock:
+        if _warmup_report is not None:
+            return _warmup_report
+
+        # Attribute the spans and queries of the warm-up to a page of its own
+        start_rerun("warmup")
+        report = {}
+        for name, step in WARMUP_STEPS:
+            started = time.perf_counter()
+            try:
+                step()
+                report[name] = time.perf_counter() - started
+            except Exception as e:
+                report[name] = f"failed: {e}"
+        _warmup_report = report
+        return report
+
+
+def start_warmup():
+    """
+    Run warm_up() in a daemon thread, so the page that triggers it does not
+    wait for it. Does nothing if a warm-up has already started.
+    """
+    if _warmup_report is not None or _warmup_lock.locked():
+        return
+    threading.Thread(target=warm_up, name="warmup", daemon=True).start()
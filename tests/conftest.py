@@ -0,0 +1,76 @@
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_DIR / "database" / "scripts"
+
+
+def _reset_caches():
+    from services import catalog, recommendation_pages, shared_catalog
+    from services.recommendation import recommendation_service
+
+    if catalog._engine is not None:
+        catalog._engine.dispose()
+        catalog._engine = None
+    for cached in (
+        catalog._load_name_index,
+        catalog._load_nutrition_matrix,
+        catalog._load_substitute_index,
+        recommendation_pages._catalog_version_for_stamp,
+        recommendation_pages._plan_data_issues,
+        recommendation_pages._read_artifact,
+        recommendation_pages._load_meal_swapper,
+        recommendation_pages._load_ingredient_table,
+    ):
+        cached.cache_clear()
+    recommendation_service.invalidate()
+    with shared_catalog._attach_lock:
+        shared_catalog._retire_catalogs(keep=None)
+        shared_catalog._missing.clear()
+
+
+@pytest.fixture(scope="session")
+def database_file(tmp_path_factory):
+    """
+    The catalog database built from database/scripts, once per session
+    """
+    path = tmp_path_factory.mktemp("database") / "dietexercise_companion.db"
+    conn = sqlite3.connect(path)
+    for script in sorted(SCRIPTS_DIR.glob("*.sql")):
+        conn.executescript(script.read_text(encoding="utf-8"))
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def project_dir(database_file, tmp_path, monkeypatch):
+    """
+    A working directory holding its own copy of the database, with every
+    module-level cache of the catalog reset around the test
+    """
+    (tmp_path / "database").mkdir()
+    shutil.copy(database_file, tmp_path / "database" / "dietexercise_companion.db")
+    monkeypatch.chdir(tmp_path)
+    _reset_caches()
+    yield tmp_path
+    _reset_caches()
+
+
+@pytest.fixture
+def run_sql(project_dir):
+    """
+    Run SQL statements against the database of project_dir
+    """
+
+    def run(*statements):
+        conn = sqlite3.connect(project_dir / "database" / "dietexercise_companion.db")
+        with conn:
+            for statement in statements:
+                conn.execute(statement)
+        conn.close()
+
+    return run
@@ -0,0 +1,44 @@
+from services.catalog import NameIndex, get_name_index
+
+ROWS = [
+    ("1", "Apple Pie"),
+    ("2", "Baked apple"),
+    ("3", "Banana bread"),
+    ("4", "APPLESAUCE"),
+    ("5", "Carrot cake"),
+]
+
+
+def test_search_ignores_case_and_ranks_prefixes_first():
+    index = NameIndex(ROWS)
+    matches, total = index.search("  aPpLe ")
+    assert total == 3
+    assert matches == [("1", "Apple Pie"), ("4", "APPLESAUCE"), ("2", "Baked apple")]
+    assert index.search("ÄPPLE") == ([], 0)
+    assert index.name_of("3") == "Banana bread"
+    assert index.name_of("9") is None
+
+
+def test_pages_cover_every_match_once():
+    index = NameIndex(ROWS)
+    pages = [index.search("", page, page_size=2) for page in range(3)]
+    assert [total for _, total in pages] == [5, 5, 5]
+    assert [len(matches) for matches, _ in pages] == [2, 2, 1]
+    assert [id for matches, _ in pages for id, _ in matches] == ["1", "2", "3", "4", "5"]
+
+    assert index.search("", 3, page_size=2) == ([], 5)
+    assert index.search("", -1, page_size=2) == index.search("", 0, page_size=2)
+    assert index.search("zzz", 0) == ([], 0)
+
+
+def test_index_is_rebuilt_when_the_database_changes(project_dir, run_sql):
+    index = get_name_index("Dish")
+    assert get_name_index("Dish") is index
+    assert index.search("Gluten-Free Pancakes")[1] == 1
+
+    run_sql("UPDATE Dish SET Name = 'Buckwheat Pancakes' WHERE Id = '01'")
+    rebuilt = get_name_index("Dish")
+    assert rebuilt is not index
+    assert rebuilt.name_of("01") == "Buckwheat Pancakes"
+    assert rebuilt.search("gluten-free pancakes")[1] == 0
+    assert len(rebuilt) == len(index)
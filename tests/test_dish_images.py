@@ -0,0 +1,37 @@
+import sqlite3
+
+from services.dish_images import iter_dish_image, load_dish_image
+
+
+def _store_image(project_dir, dish_id, data):
+    conn = sqlite3.connect(project_dir / "database" / "dietexercise_companion.db")
+    with conn:
+        conn.execute("UPDATE Dish SET Image = ? WHERE Id = ?", (data, dish_id))
+    conn.close()
+
+
+def test_image_is_read_in_chunks(project_dir):
+    image = bytes(range(256)) * 1000 + b"tail"
+    _store_image(project_dir, "01", image)
+
+    chunks = list(iter_dish_image("01", chunk_size=64 * 1024))
+    assert b"".join(chunks) == image
+    assert [len(chunk) for chunk in chunks[:-1]] == [64 * 1024] * (len(chunks) - 1)
+    assert 0 < len(chunks[-1]) <= 64 * 1024
+    assert len(chunks) == -(-len(image) // (64 * 1024))
+
+    assert load_dish_image("01") == image
+
+
+def test_chunk_size_exactly_divides_the_image(project_dir):
+    _store_image(project_dir, "01", b"x" * 300)
+    assert list(iter_dish_image("01", chunk_size=100)) == [b"x" * 100] * 3
+
+
+def test_no_image_yields_nothing(project_dir):
+    _store_image(project_dir, "01", None)
+    _store_image(project_dir, "02", b"")
+
+    for dish_id in ("01", "02", "no such dish"):
+        assert list(iter_dish_image(dish_id)) == []
+        assert load_dish_image(dish_id) is None
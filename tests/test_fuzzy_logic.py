@@ -0,0 +1,26 @@
+import numpy as np
+
+from algorithm.fuzzy_logic import classify_bodies, classify_body
+
+
+def test_classify_bodies_matches_classify_body(capsys):
+    # Every breakpoint, the values between them and both ends out of range
+    heights = np.arange(140, 186, 2.5)
+    weights = np.arange(35, 81, 2.5)
+    for sex in (0, 1):
+        grid_heights, grid_weights = np.meshgrid(heights, weights)
+        batch = classify_bodies(grid_heights.ravel(), grid_weights.ravel(), sex)
+        scalar = [
+            classify_body(height, weight, sex)
+            for height, weight in zip(grid_heights.ravel(), grid_weights.ravel())
+        ]
+        assert batch.tolist() == scalar
+    capsys.readouterr()
+
+
+def test_classify_bodies_takes_a_sex_per_row():
+    heights = [170, 170, 158, 158]
+    weights = [65, 65, 52, 52]
+    sexes = [0, 1, 0, 1]
+    expected = [classify_body(*row) for row in zip(heights, weights, sexes)]
+    assert classify_bodies(heights, weights, sexes).tolist() == expected
@@ -0,0 +1,66 @@
+import sqlite3
+import time
+
+import pytest
+
+from services.history import HistoryStore, member_key
+
+
+def _stored(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT Member, Weight FROM Measurement ORDER BY Time").fetchall()
+    finally:
+        conn.close()
+
+
+def _stored_or_empty(path):
+    try:
+        return _stored(path)
+    except sqlite3.OperationalError:
+        return []
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"), batch_size=3, flush_seconds=0.2)
+    yield store
+    store.flush()
+
+
+def test_a_lone_measurement_is_written_by_the_timer(store):
+    store.append("a", 170, 70, 0, at=1)
+    deadline = time.monotonic() + 5
+    while not _stored_or_empty(store.path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _stored(store.path) == [("a", 70.0)]
+
+
+def test_a_full_batch_is_written_at_once(store):
+    for at in range(3):
+        store.append("a", 170, 70 + at, 0, at=at)
+    assert [weight for _, weight in _stored(store.path)] == [70.0, 71.0, 72.0]
+
+
+def test_queued_measurements_are_read_back(store):
+    store.append("a", 170, 70, 0, at=10)
+    store.append("b", 160, 55, 1, at=5)
+    series = store.series("a")
+    assert series.times.tolist() == [10.0]
+    assert series.weights.tolist() == [70.0]
+    assert store.members() == ["a", "b"]
+
+
+def test_measurements_cannot_be_rewritten(store):
+    store.append("a", 170, 70, 0, at=1)
+    store.flush()
+    conn = sqlite3.connect(store.path)
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("UPDATE Measurement SET Weight = 1")
+    conn.close()
+
+
+def test_member_key_needs_the_passphrase():
+    assert member_key("Ann ", "secret") == member_key("ann", "secret")
+    assert member_key("ann", "secret") != member_key("ann", "other")
+    assert member_key("ann", "secret") != member_key("bob", "secret")
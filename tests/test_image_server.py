@@ -0,0 +1,163 @@
+import threading
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from services import image_server
+from services.image_server import IMAGE_ROUTE, ImageRequestHandler, image_store
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def digest():
+    image_store.invalidate()
+    yield image_store.register("test-image", lambda: IMAGE)
+    image_store.invalidate()
+
+
+def _get(server, path, headers=None, method="GET"):
+    conn = HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    try:
+        conn.request(method, path, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_full_response_carries_the_hash_as_etag(server, digest):
+    status, headers, body = _get(server, IMAGE_ROUTE + digest)
+    assert status == 200
+    assert body == IMAGE
+    assert headers["ETag"] == f'"{digest}"'
+    assert headers["Content-Type"] == "image/png"
+    assert headers["Accept-Ranges"] == "bytes"
+    assert "immutable" in headers["Cache-Control"]
+
+    status, headers, body = _get(server, IMAGE_ROUTE + digest, method="HEAD")
+    assert status == 200
+    assert headers["Content-Length"] == str(len(IMAGE))
+    assert body == b""
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", 'W/"other", {etag}', "*"])
+def test_matching_etag_is_not_modified(server, digest, if_none_match):
+    etag = f'"{digest}"'
+    status, headers, body = _get(
+        server,
+        IMAGE_ROUTE + digest,
+        {"If-None-Match": if_none_match.format(etag=etag)},
+    )
+    assert status == 304
+    assert headers["ETag"] == etag
+    assert body == b""
+
+
+def test_other_etag_gets_the_image(server, digest):
+    status, _, body = _get(server, IMAGE_ROUTE + digest, {"If-None-Match": '"stale"'})
+    assert status == 200
+    assert body == IMAGE
+
+
+@pytest.mark.parametrize(
+    "range_header, start, end",
+    [
+        ("bytes=0-9", 0, 9),
+        ("bytes=100-", 100, len(IMAGE) - 1),
+        ("bytes=-16", len(IMAGE) - 16, len(IMAGE) - 1),
+        ("bytes=1000-999999", 1000, len(IMAGE) - 1),
+    ],
+)
+def test_ranges(server, digest, range_header, start, end):
+    status, headers, body = _get(server, IMAGE_ROUTE + digest, {"Range": range_header})
+    assert status == 206
+    assert headers["Content-Range"] == f"bytes {start}-{end}/{len(IMAGE)}"
+    assert body == IMAGE[start : end + 1]
+
+
+@pytest.mark.parametrize("range_header", ["bytes=5000-", "bytes=9-3", "bytes=-0", "lines=1-2"])
+def test_unsatisfiable_ranges(server, digest, range_header):
+    status, headers, body = _get(server, IMAGE_ROUTE + digest, {"Range": range_header})
+    assert status == 416
+    assert headers["Content-Range"] == f"bytes */{len(IMAGE)}"
+    assert body == b""
+
+
+def test_if_range_with_another_etag_gets_the_whole_image(server, digest):
+    status, _, body = _get(
+        server, IMAGE_ROUTE + digest, {"Range": "bytes=0-9", "If-Range": '"stale"'}
+    )
+    assert status == 200
+    assert body == IMAGE
+
+
+def test_unknown_paths_are_not_found(server, digest, monkeypatch):
+    monkeypatch.setattr(image_server, "METRICS_ENABLED", False)
+    assert _get(server, IMAGE_ROUTE + "0" * 64)[0] == 404
+    assert _get(server, "/metrics")[0] == 404
+
+
+def test_no_url_without_a_configured_prefix(project_dir, monkeypatch):
+    monkeypatch.setattr(image_server, "IMAGE_SERVER_URL", "")
+    started = []
+    monkeypatch.setattr(image_server, "start_image_server", lambda: started.append(1))
+    assert image_server.exercise_poster_url("01") is None
+    assert started == []
+
+
+def test_urls_use_the_configured_prefix(project_dir, monkeypatch, digest):
+    monkeypatch.setattr(image_server, "IMAGE_SERVER_URL", "https://app.example/img")
+    monkeypatch.setattr(image_server, "start_image_server", lambda: True)
+    monkeypatch.setattr(image_server, "load_local_poster", lambda exercise_id: IMAGE)
+    assert image_server.exercise_poster_url("01") == (
+        f"https://app.example/img{IMAGE_ROUTE}{digest}"
+    )
+
+
+def test_changed_image_is_registered_again():
+    image_store.invalidate()
+    current = [b"first"]
+
+    def loader():
+        return current[0]
+
+    first = image_store.register("changing", loader)
+    image_store.clear()
+
+    current[0] = b"second"
+    # The old hash is gone for good, and its key no longer maps to it
+    assert image_store.get(first) is None
+    assert not image_store.has(first)
+    second = image_store.register("changing", loader)
+    assert second not in (None, first)
+    assert image_store.get(second) == b"second"
+    image_store.invalidate()
+
+
+def test_dish_urls_follow_the_database(project_dir, run_sql, monkeypatch):
+    from models.eat import Dish
+
+    monkeypatch.setattr(image_server, "IMAGE_SERVER_URL", "https://app.example/img")
+    monkeypatch.setattr(image_server, "start_image_server", lambda: True)
+    image_store.invalidate()
+    dish = Dish("01", "Pancakes", None, "176;26;6;8", "", "")
+
+    run_sql("UPDATE Dish SET Image = x'89504e470d0a1a0a01' WHERE Id = '01'")
+    first = image_server.dish_image_url(dish)
+    run_sql("UPDATE Dish SET Image = x'89504e470d0a1a0a02' WHERE Id = '01'")
+    second = image_server.dish_image_url(dish)
+    assert first is not None and second is not None and first != second
+    assert image_store.get(second.rsplit("/", 1)[1]) == bytes.fromhex("89504e470d0a1a0a02")
+    image_store.invalidate()
@@ -0,0 +1,50 @@
+import sqlite3
+
+from algorithm.meal_swap import CALORIE_TOLERANCE, CARB_TOLERANCE, parse_meal
+from services.catalog import get_nutrition_matrix
+from services.recommendation_pages import get_meal_swapper, swap_meal_dish
+
+
+def _meals(project_dir):
+    conn = sqlite3.connect(project_dir / "database" / "dietexercise_companion.db")
+    rows = conn.execute(
+        "SELECT Breakfast, Lunch, Dinner FROM LowCarb "
+        "UNION ALL SELECT Breakfast, Lunch, Dinner FROM HighCarb"
+    ).fetchall()
+    conn.close()
+    return [meal for row in rows for meal in row]
+
+
+def test_swaps_stay_within_the_calorie_bounds(project_dir):
+    matrix = get_nutrition_matrix("Dish")
+    swapper = get_meal_swapper()
+    swapped = 0
+    for meal in _meals(project_dir):
+        calories, dishes = parse_meal(meal)
+        original = swapper._carb_share(swapper._totals(dishes))
+        for slot, (replaced, _) in enumerate(dishes):
+            for option in swap_meal_dish(meal, slot):
+                swapped += 1
+                ids = [id for id, _ in option.dishes]
+                assert ids[:slot] + ids[slot + 1 :] == [
+                    id for position, (id, _) in enumerate(dishes) if position != slot
+                ]
+                assert ids[slot] != replaced
+                assert swapper.bucket_of(ids[slot]) == swapper.bucket_of(replaced)
+
+                # The reported totals are the dishes' at the new servings
+                totals = sum(matrix.row(id) * servings for id, servings in option.dishes)
+                assert abs(totals[0] - option.calories) < 1e-3 * calories
+                assert abs(option.calories - calories) <= CALORIE_TOLERANCE * calories
+                assert abs(option.carb_share - original) <= CARB_TOLERANCE + 1e-9
+    assert swapped > 0
+
+
+def test_a_dish_that_cannot_fit_gives_no_option(project_dir):
+    meal = "277:69x1;57x1"
+    assert swap_meal_dish(meal, 0, dish_id="no such dish") == []
+
+    options = swap_meal_dish(meal, 0, limit=2)
+    assert len(options) <= 2
+    for option in options:
+        assert swap_meal_dish(meal, 0, dish_id=option.dishes[0][0])
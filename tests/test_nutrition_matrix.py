@@ -0,0 +1,93 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from algorithm.nutrition_matrix import NutritionMatrix, parse_nutrition
+from services import catalog
+from services.catalog import get_nutrition_matrix
+from services.shared_catalog import publish_shared_catalog
+
+ROWS = [
+    ("a", "400;50;10;20"),
+    ("b", "200;5;10;30"),
+    ("c", "600;80;20;10"),
+    ("d", "n/a"),
+    ("e", "0;0;0;0"),
+]
+
+
+def test_parse_nutrition():
+    assert parse_nutrition("176;26;6;8") == [176.0, 26.0, 6.0, 8.0]
+    for broken in (None, "", "1;2;3", "1;2;x;4", "1;2;3;4;5"):
+        assert np.isnan(parse_nutrition(broken)).all()
+
+
+def test_shares_of_calories():
+    matrix = NutritionMatrix.from_rows(ROWS)
+    # b: 5 g carbs, 10 g fat, 30 g protein = 20 + 90 + 120 kcal
+    assert matrix.macro_percentages(["b"])[0] == pytest.approx(
+        [20 / 230, 90 / 230, 120 / 230]
+    )
+    assert np.isnan(matrix.macro_percentages(["d", "e"])).all()
+    assert matrix.row("c").tolist() == [600, 80, 20, 10]
+    assert "d" in matrix and "z" not in matrix
+
+
+def test_mask_and_where_match_a_row_by_row_filter():
+    matrix = NutritionMatrix.from_rows(ROWS)
+    assert matrix.where(calories=(None, 500)) == ["a", "b", "e"]
+    assert matrix.where(calories=(200, 600)) == ["a"]
+    assert matrix.where(protein_share=(0.35, None), calories=(None, 400)) == ["b"]
+    # NaN rows never pass a bound
+    assert "d" not in matrix.where(carbs=(None, None), fat_share=(-1, 2))
+    assert matrix.where() == ["a", "b", "c", "d", "e"]
+    with pytest.raises(ValueError):
+        matrix.mask(sodium=(0, 1))
+
+    rng = np.random.default_rng(7)
+    rows = [
+        (str(i), ";".join(f"{value:.1f}" for value in rng.uniform(0, 100, 4)))
+        for i in range(500)
+    ]
+    matrix = NutritionMatrix.from_rows(rows)
+    expected = []
+    for id, nutrition in rows:
+        calories, carbs, fat, protein = parse_nutrition(nutrition)
+        share = carbs * 4 / (carbs * 4 + fat * 9 + protein * 4)
+        if 20 < calories < 80 and fat > 10 and share < 0.5:
+            expected.append(id)
+    got = matrix.where(calories=(20, 80), fat=(10, None), carbs_share=(None, 0.5))
+    assert got == expected
+
+
+def test_values_are_float32_column_major():
+    matrix = NutritionMatrix.from_rows(ROWS)
+    assert matrix.values.dtype == np.float32
+    assert matrix.values.flags.f_contiguous
+    assert matrix.shares.flags.f_contiguous
+    with pytest.raises(ValueError):
+        NutritionMatrix(["a", "b"], [[1, 2, 3, 4]])
+
+
+def test_shared_array_is_used_without_a_copy(project_dir, monkeypatch):
+    publish_shared_catalog(images=False)
+    monkeypatch.setattr(catalog, "USE_SHARED_CATALOG", True)
+    # Publishing built the matrix from SQL; a worker starts without it
+    catalog.invalidate_nutrition_matrices()
+    shared = catalog.shared_catalog()
+    assert shared is not None
+
+    matrix = get_nutrition_matrix("Dish")
+    assert np.shares_memory(matrix.values, shared.nutrition_array())
+    assert not matrix.values.flags.writeable
+
+    conn = sqlite3.connect(project_dir / "database" / "dietexercise_companion.db")
+    rows = conn.execute("SELECT Id, Nutrition FROM Dish ORDER BY rowid").fetchall()
+    conn.close()
+    assert matrix.ids == [row[0] for row in rows]
+    expected = np.array([parse_nutrition(row[1]) for row in rows], dtype=np.float32)
+    np.testing.assert_array_equal(matrix.values, expected)
+    np.testing.assert_array_equal(
+        matrix.shares, NutritionMatrix.from_rows(rows).shares
+    )
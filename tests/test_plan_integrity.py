@@ -0,0 +1,51 @@
+import pytest
+
+from algorithm.plan_integrity import PlanDataError
+from services import recommendation_pages
+from services.recommendation_pages import (
+    build_all_recommendation_pages,
+    check_plan_data,
+    checked_plan,
+)
+
+
+def test_scripts_pass_the_check(project_dir):
+    assert check_plan_data() == []
+
+
+def test_corrupted_plans_are_reported(project_dir, run_sql):
+    run_sql(
+        # A meal naming a dish that does not exist
+        "UPDATE LowCarb SET Breakfast = '277:99x1;57x1' WHERE Calories = 800",
+        # Stored meal calories the dishes do not add up to
+        "UPDATE LowCarb SET Lunch = '400:21x1;70x2.5' WHERE Calories = 800",
+        # Plan carbs off by far more than the tolerance
+        "UPDATE LowCarb SET Nutrition = '1000;10;43.7;64.7' WHERE Calories = 1000",
+        # A dish whose nutrition cannot be read
+        "UPDATE Dish SET Nutrition = 'n/a' WHERE Id = '71'",
+        # A profile pointing at a plan that does not exist
+        "UPDATE StandardCalories SET HighCarb = 9999 WHERE Stage = 0 AND Body = 2 AND Sex = 0",
+    )
+
+    issues = check_plan_data()
+    found = {(issue.table, str(issue.plan), issue.field) for issue in issues}
+    messages = [str(issue) for issue in issues]
+
+    assert ("LowCarb", "800", "Breakfast") in found
+    assert any("'99' does not exist" in message for message in messages)
+    assert ("LowCarb", "800", "Lunch") in found
+    assert any(message.startswith("LowCarb 1000 Nutrition: stored 10 g of") for message in messages)
+    assert any("'71' has no nutrition" in message for message in messages)
+    assert ("StandardCalories", "(0, 2, 0)", "HighCarb") in found
+
+
+def test_corrupted_plans_are_not_built_or_served(project_dir, run_sql):
+    run_sql("UPDATE LowCarb SET Breakfast = '277:99x1;57x1' WHERE Calories = 800")
+
+    with pytest.raises(PlanDataError) as raised:
+        build_all_recommendation_pages()
+    assert raised.value.issues
+    assert not recommendation_pages.BUILD_DIR.exists()
+
+    with pytest.raises(PlanDataError):
+        checked_plan(1, 4, 0)
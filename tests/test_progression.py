@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from algorithm.progression import ProgressionProgram, parse_rep_range, sessions_per_week
+from services.recommendation_pages import build_recommendation_page, checked_plan
+
+
+def test_parse_rep_range():
+    assert parse_rep_range("8-10") == (8, 10)
+    assert parse_rep_range("12–15") == (12, 15)
+    assert parse_rep_range(10) == (10, 10)
+    with pytest.raises(ValueError):
+        parse_rep_range("10-8")
+
+
+def test_projection_follows_the_hand_computed_schedule():
+    assert sessions_per_week("upper") == sessions_per_week("lower") == 2
+    program = ProgressionProgram(
+        ["bench", "squat"], ["upper", "lower"], [3, 2], ["8-10", "10"]
+    )
+    projection = program.simulate([[40, 60], [40, 60]], 4, rep_gain=[1.0, 0.5])
+
+    # Bench, one rep a session: 3 sessions per load (8, 9, 10 reps), +2.5 kg.
+    # Sessions 0..7 are (40, 8) (40, 9) (40, 10) (42.5, 8) (42.5, 9)
+    # (42.5, 10) (45, 8) (45, 9); two a week
+    assert projection.load[0, 0].tolist() == [40, 42.5, 42.5, 45]
+    assert projection.reps[0, 0].tolist() == [9, 8, 10, 9]
+    assert projection.volume[0, 0].tolist() == pytest.approx(
+        [3 * (8 + 9) * 40, 3 * (10 * 40 + 8 * 42.5), 3 * (9 + 10) * 42.5, 3 * (8 + 9) * 45]
+    )
+    # Half a rep a session: 8, 8, 9, 9, 10, then +2.5 kg
+    assert projection.load[1, 0].tolist() == [40, 40, 42.5, 42.5]
+    assert projection.reps[1, 0].tolist() == [8, 9, 8, 9]
+
+    # Squat at a single rep count: two sessions per load, +5 kg a week
+    for member in range(2):
+        assert projection.load[member, 1].tolist() == [60, 65, 70, 75]
+        assert projection.reps[member, 1].tolist() == [10, 10, 10, 10]
+        assert projection.volume[member, 1].tolist() == pytest.approx(
+            [2 * 10 * load * 2 for load in (60, 65, 70, 75)]
+        )
+
+    np.testing.assert_allclose(
+        projection.weekly_volume(), projection.volume.sum(axis=1)
+    )
+    assert projection.member(0)[0] == {
+        "week": 1,
+        "exercise": "bench",
+        "load": 40.0,
+        "reps": 9,
+        "volume": 2040.0,
+    }
+
+
+def test_projection_rejects_bad_input():
+    program = ProgressionProgram(["bench"], ["upper"], [3], ["8-10"])
+    with pytest.raises(ValueError):
+        program.simulate([[40, 60]], 4)
+    with pytest.raises(ValueError):
+        program.simulate([[40]], 4, rep_gain=0)
+
+
+def test_gym_plan_shows_its_progression(project_dir):
+    plan = checked_plan(0, 2, 0)
+    page = build_recommendation_page(plan)
+    assert "3. Progression" in page["workout_html"]
+    # The first lower exercise adds its first increment in week 2
+    first = plan.gym_lower[0].exercise
+    assert f"<tr><td>{first}</td><td>+0 kg × 9</td><td>+5 kg × 8</td>" in page["workout_html"]
@@ -0,0 +1,80 @@
+import itertools
+
+import pytest
+import sqlalchemy
+
+from services import query_log as query_log_module
+from services.query_log import QueryLog, normalize_statement
+
+
+@pytest.fixture
+def engine():
+    engine = sqlalchemy.create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute("CREATE TABLE Dish (Id TEXT PRIMARY KEY, Name TEXT)")
+        conn.execute("INSERT INTO Dish VALUES ('01', 'Pancakes'), ('02', 'Salad')")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Every statement takes 125 ms: perf_counter advances 0.125 s per reading
+    ticks = itertools.count()
+    monkeypatch.setattr(query_log_module.time, "perf_counter", lambda: next(ticks) * 0.125)
+
+
+def _run(engine, log):
+    log.install(engine)
+    with engine.connect() as conn:
+        for ids in (["01"], ["01", "02"]):
+            placeholders = ", ".join(f":id{i}" for i in range(len(ids)))
+            conn.execute(
+                sqlalchemy.text(f"SELECT Name FROM Dish WHERE Id IN ({placeholders})"),
+                {f"id{i}": id for i, id in enumerate(ids)},
+            ).fetchall()
+        conn.execute(sqlalchemy.text("SELECT Name FROM Dish WHERE Id = :id"), {"id": "02"})
+
+
+def test_statements_are_timed_per_normalized_statement(engine, clock):
+    log = QueryLog(slow_query_ms=1000)
+    _run(engine, log)
+
+    stats = log.stats()
+    in_list = ("-", "SELECT Name FROM Dish WHERE Id IN (...)")
+    by_id = ("-", "SELECT Name FROM Dish WHERE Id = ?")
+    assert stats[in_list]["count"] == 2
+    assert stats[in_list]["total_ms"] == 250
+    assert stats[in_list]["max_ms"] == 125
+    assert stats[by_id]["count"] == 1
+    assert list(stats)[0] == in_list
+    assert log.slow_queries() == []
+
+
+def test_slow_statements_keep_their_query_plan(engine, clock, capsys):
+    log = QueryLog(slow_query_ms=125)
+    _run(engine, log)
+
+    slow = log.slow_queries()
+    assert len(slow) == 3
+    entry = slow[-1]
+    assert entry["statement"] == "SELECT Name FROM Dish WHERE Id = ?"
+    assert entry["ms"] == 125
+    assert entry["parameters"] == ("02",)
+    assert any("USING INDEX" in step for step in entry["plan"])
+    assert "Slow query (125.0 ms on -)" in capsys.readouterr().out
+
+    log.reset()
+    assert log.stats() == {} and log.slow_queries() == []
+
+
+def test_normalize_statement():
+    assert normalize_statement("SELECT *\n  FROM Dish\tWHERE Id IN (?, ?, ?)") == (
+        "SELECT * FROM Dish WHERE Id IN (...)"
+    )
+    assert normalize_statement("SELECT * FROM Dish WHERE Id in (:a)") == (
+        "SELECT * FROM Dish WHERE Id IN (...)"
+    )
+    assert normalize_statement("INSERT INTO Dish VALUES (?, ?)") == (
+        "INSERT INTO Dish VALUES (?, ?)"
+    )
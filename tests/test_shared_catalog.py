@@ -0,0 +1,126 @@
+import gc
+import json
+import threading
+import weakref
+
+from services import catalog, recommendation_pages, shared_catalog
+from services.catalog import database_stamp
+from services.recommendation_pages import current_catalog_version
+from services.shared_catalog import (
+    POINTER_NAME,
+    SHARED_CATALOG_DIR,
+    attach_shared_catalog,
+    publish_shared_catalog,
+)
+
+
+def _unmapped(reference):
+    gc.collect()
+    return reference() is None
+
+
+def test_attach_follows_a_republish(project_dir, run_sql):
+    path = publish_shared_catalog(images=False)
+    first = attach_shared_catalog()
+    assert first is not None
+    assert first.path == path
+    assert first.stamp == database_stamp()
+    assert attach_shared_catalog() is first
+    assert first.lookup("Dish", "71") is not None
+
+    run_sql("UPDATE Dish SET Name = 'Renamed' WHERE Id = '71'")
+    # Not published for the new stamp yet, and the miss is remembered
+    assert attach_shared_catalog() is None
+    assert attach_shared_catalog() is None
+
+    new_path = publish_shared_catalog(images=False)
+    assert new_path != path
+    assert not path.exists()
+    second = attach_shared_catalog()
+    assert second is not None and second is not first
+    assert second.stamp == database_stamp()
+    assert second.lookup("Dish", "71", columns=("Name",)) == ("Renamed",)
+    assert shared_catalog._attached == {second.stamp: second}
+
+    # The old catalog is released, but stays readable while it is held
+    assert first.lookup("Dish", "71", columns=("Name",)) != ("Renamed",)
+    mapping = weakref.ref(first._map)
+    del first
+    assert _unmapped(mapping)
+
+
+def test_exported_mapping_is_unmapped_once_released(project_dir, run_sql):
+    publish_shared_catalog(images=False)
+    first = attach_shared_catalog()
+    mapping = weakref.ref(first._map)
+    nutrition = first.nutrition_array()
+    assert nutrition.shape == (first.row_count("Dish"), 4)
+    del first
+
+    run_sql("UPDATE Dish SET Name = 'Renamed' WHERE Id = '71'")
+    publish_shared_catalog(images=False)
+    attach_shared_catalog()
+    # Still viewed by numpy, so still mapped
+    assert not _unmapped(mapping)
+    assert float(nutrition[0, 0]) > 0
+
+    del nutrition
+    assert _unmapped(mapping)
+
+
+def test_readers_survive_a_republish(project_dir, run_sql):
+    publish_shared_catalog(images=False)
+    errors = []
+    stop = threading.Event()
+
+    def reader(shared):
+        # Like a session that attached before the re-publish and keeps
+        # reading the catalog it got
+        while not stop.is_set():
+            try:
+                assert shared.page("0-2-0") is not None
+                assert shared.lookup("Dish", "71") is not None
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [
+        threading.Thread(target=reader, args=(attach_shared_catalog(),)) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for attempt in range(3):
+            run_sql(f"UPDATE Dish SET Name = 'Renamed {attempt}' WHERE Id = '71'")
+            publish_shared_catalog(images=False)
+            assert attach_shared_catalog() is not None
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=10)
+    assert errors == []
+
+
+def test_other_page_format_is_not_attached(project_dir):
+    publish_shared_catalog(images=False)
+    pointer_path = SHARED_CATALOG_DIR / POINTER_NAME
+    pointer = json.loads(pointer_path.read_text())
+    pointer["page_format"] -= 1
+    pointer_path.write_text(json.dumps(pointer))
+    assert attach_shared_catalog() is None
+
+
+def test_attached_workers_do_not_hash_the_catalog(project_dir, monkeypatch):
+    version = current_catalog_version()
+    publish_shared_catalog(images=False)
+    monkeypatch.setattr(catalog, "USE_SHARED_CATALOG", True)
+
+    def no_sql(stamp):
+        raise AssertionError("hashed through SQLite")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(recommendation_pages, "_catalog_version_for_stamp", no_sql)
+        patch.setattr(recommendation_pages, "_plan_data_issues", no_sql)
+        assert current_catalog_version() == version
+        assert recommendation_pages.load_recommendation_page(0, 2, 0)["has_plan"]
+        assert recommendation_pages.checked_plan(0, 2, 0).has_plan
@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+
+from algorithm.shopping import IngredientTable, parse_quantity
+from services.recommendation_pages import (
+    BUILD_DIR,
+    INGREDIENTS_NAME,
+    WEEKLY_DIET_DAYS,
+    build_all_recommendation_pages,
+    checked_plan,
+    weekly_servings,
+    weekly_shopping_list,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("1/2 cup", (236.5882365 / 2, "ml")),
+        ("1 1/2 cups", (236.5882365 * 1.5, "ml")),
+        ("0.5 oz", (28.349523125 / 2, "g")),
+        ("3g", (3.0, "g")),
+        ("2", (2.0, "piece")),
+        ("2 Slices.", (2.0, "slice")),
+        ("1/0 cup", None),
+        ("a pinch", None),
+    ],
+)
+def test_parse_quantity(text, expected):
+    parsed = parse_quantity(text)
+    if expected is None:
+        assert parsed is None
+    else:
+        assert parsed[0] == pytest.approx(expected[0])
+        assert parsed[1] == expected[1]
+
+
+def test_aggregate_sums_servings_per_ingredient_and_unit():
+    table = IngredientTable.from_recipes(
+        [
+            ("01", "Egg: 2 pieces; Milk: 1 cup; Salt: a pinch"),
+            ("02", "egg: 1; Milk: 100 ml; Flour: 50 g"),
+            ("03", "Egg: 6"),
+        ]
+    )
+    assert table.unparsed == [("01", "Salt", "a pinch")]
+    items = table.aggregate({"01": 2, "02": 0.5, "unknown": 3})
+    assert [(name, unit) for name, unit, _ in items] == [
+        ("Egg", "piece"),
+        ("Flour", "g"),
+        ("Milk", "ml"),
+    ]
+    quantities = {name: quantity for name, _, quantity in items}
+    assert quantities["Egg"] == pytest.approx(2 * 2 + 0.5 * 1)
+    assert quantities["Flour"] == pytest.approx(25)
+    assert quantities["Milk"] == pytest.approx(2 * 236.5882365 + 0.5 * 100)
+
+    restored = IngredientTable.from_dict(table.to_dict())
+    assert restored.aggregate({"01": 2, "02": 0.5}) == items
+
+
+def _expected_list(project_dir, servings):
+    conn = sqlite3.connect(project_dir / "database" / "dietexercise_companion.db")
+    recipes = dict(conn.execute("SELECT Id, Recipe FROM Dish").fetchall())
+    conn.close()
+    totals = {}
+    for dish_id, amount in servings.items():
+        for item in recipes[dish_id].split(";"):
+            name, _, text = item.partition(":")
+            parsed = parse_quantity(text)
+            if not name.strip() or parsed is None:
+                continue
+            quantity, unit = parsed
+            key = (name.strip().casefold(), unit)
+            totals[key] = totals.get(key, 0.0) + quantity * amount
+    return totals
+
+
+def test_weekly_shopping_list_adds_up_the_week(project_dir):
+    plan = checked_plan(0, 2, 0)
+    servings = weekly_servings(plan)
+    assert sum(WEEKLY_DIET_DAYS.values()) == 7
+    for diet in plan.diets:
+        for meal in diet.meals:
+            for dish in meal.dishes:
+                assert servings[dish.id] >= float(dish.amount) * WEEKLY_DIET_DAYS[diet.kind]
+
+    items = weekly_shopping_list(0, 2, 0)
+    expected = _expected_list(project_dir, servings)
+    assert {(name.casefold(), unit): quantity for name, unit, quantity in items} == (
+        pytest.approx(expected)
+    )
+    assert [name.casefold() for name, _, _ in items] == sorted(
+        name.casefold() for name, _, _ in items
+    )
+
+    household = weekly_shopping_list(0, 2, 0, household=3)
+    assert [quantity for _, _, quantity in household] == pytest.approx(
+        [quantity * 3 for _, _, quantity in items]
+    )
+
+
+def test_prebuilt_ingredients_give_the_same_list(project_dir):
+    computed = weekly_shopping_list(1, 3, 1)
+    version, built = build_all_recommendation_pages()
+    assert built
+    assert (BUILD_DIR / version / f"{INGREDIENTS_NAME}.json").exists()
+
+    prebuilt = weekly_shopping_list(1, 3, 1)
+    assert [(name, unit) for name, unit, _ in prebuilt] == [
+        (name, unit) for name, unit, _ in computed
+    ]
+    assert [quantity for _, _, quantity in prebuilt] == pytest.approx(
+        [quantity for _, _, quantity in computed]
+    )
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+CALLERS = 8
+
+
+def _run_together(flight, key, fn):
+    """
+    Call flight.do from CALLERS threads released by one barrier; returns
+    each caller's (result, error)
+    """
+    barrier = threading.Barrier(CALLERS)
+    outcomes = [None] * CALLERS
+
+    def caller(index):
+        barrier.wait()
+        try:
+            outcomes[index] = (flight.do(key, fn, index), None)
+        except Exception as e:
+            outcomes[index] = (None, e)
+
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return outcomes
+
+
+def _held_until_everyone_waits(flight, fn):
+    # The leader only finishes once every other caller has joined its flight
+    def held(*args):
+        deadline = time.monotonic() + 5
+        while flight.stats()["coalesced"] < CALLERS - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return fn(*args)
+
+    return held
+
+
+def test_identical_calls_run_once():
+    flight = SingleFlight("test")
+    runs = []
+
+    def load(index):
+        runs.append(index)
+        return {"plan": index}
+
+    outcomes = _run_together(flight, "key", _held_until_everyone_waits(flight, load))
+    assert len(runs) == 1
+    results = [result for result, _ in outcomes]
+    assert all(result is results[0] for result in results)
+    assert results[0] == {"plan": runs[0]}
+    assert flight.stats() == {"executed": 1, "coalesced": CALLERS - 1, "in_flight": 0}
+
+
+def test_an_error_reaches_every_waiter():
+    flight = SingleFlight("test")
+
+    def fail(index):
+        raise LookupError(f"failed in {index}")
+
+    outcomes = _run_together(flight, "key", _held_until_everyone_waits(flight, fail))
+    errors = [error for _, error in outcomes]
+    assert all(isinstance(error, LookupError) for error in errors)
+    assert len({str(error) for error in errors}) == 1
+    assert flight.stats()["in_flight"] == 0
+
+    # Nothing is kept: the next call runs again
+    assert flight.do("key", lambda: "fresh") == "fresh"
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight("test")
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats() == {"executed": 2, "coalesced": 0, "in_flight": 0}
+    with pytest.raises(ValueError):
+        flight.do("a", int, "not a number")
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from algorithm import substitutes
+from algorithm.nutrition_matrix import NutritionMatrix
+from algorithm.substitutes import SubstituteIndex, parse_ingredients
+
+# Same macro ratio everywhere, so the shares are equal and only calories
+# (scaled by their standard deviation) set the distances
+CALORIES = {"a": 100, "b": 110, "c": 130, "d": 170, "e": 250}
+RECIPES = {
+    "a": "Egg: 1 piece; Oatmeal: 1/2 cup",
+    "b": "Egg white: 2 pieces; Spinach: 1 cup",
+    "c": "Chicken breast: 100 g",
+    "d": "Oatmeal: 1 cup; Honey: 1 teaspoon",
+    "e": "Tofu: 150 g",
+    "broken": "Egg: 1 piece",
+}
+SCALE = np.std(list(CALORIES.values()))
+
+
+@pytest.fixture
+def index():
+    ids = list(CALORIES) + ["broken"]
+    nutrition = [f"{CALORIES[id]};10;2;5" for id in CALORIES] + ["n/a"]
+    matrix = NutritionMatrix.from_rows(zip(ids, nutrition))
+    return SubstituteIndex(matrix, [parse_ingredients(RECIPES[id]) for id in ids])
+
+
+def _distance(first, second):
+    return abs(CALORIES[first] - CALORIES[second]) / SCALE
+
+
+def test_parse_ingredients():
+    assert parse_ingredients(" Egg : 1 piece;; oatmeal: 1/2 cup; ") == {"egg", "oatmeal"}
+    assert parse_ingredients(None) == set()
+
+
+def test_neighbours_closest_first_without_the_dish_itself(index):
+    (neighbours,) = index.nearest(["c"], k=3)
+    assert [id for id, _ in neighbours] == ["b", "a", "d"]
+    for id, distance in neighbours:
+        assert distance == pytest.approx(_distance("c", id), rel=1e-4)
+
+    # Every other valid dish, however large k is; never the NaN one
+    (neighbours,) = index.nearest(["a"], k=10)
+    assert [id for id, _ in neighbours] == ["b", "c", "d", "e"]
+
+
+def test_avoided_ingredients_and_ids_are_filtered(index):
+    # "egg" also drops "egg white"
+    (neighbours,) = index.nearest(["c"], k=3, exclude_ingredients=["EGG "])
+    assert [id for id, _ in neighbours] == ["d", "e"]
+
+    (neighbours,) = index.nearest(["c"], k=2, exclude_ingredients=["honey"], exclude_ids=["b"])
+    assert [id for id, _ in neighbours] == ["a", "e"]
+
+    assert index.nearest(["c"], exclude_ingredients=["unknown"]) == index.nearest(["c"])
+
+
+def test_unknown_ids_and_blocks(index, monkeypatch):
+    unknown, known = index.nearest(["zzz", "c"], k=1)
+    assert unknown == []
+    assert known == [("b", pytest.approx(_distance("c", "b"), rel=1e-4))]
+    assert index.nearest(["c"], k=0) == [[]]
+
+    whole = index.nearest(list(CALORIES), k=2)
+    monkeypatch.setattr(substitutes, "SUBSTITUTE_BLOCK_SIZE", 2)
+    assert index.nearest(list(CALORIES), k=2) == whole